@@ -0,0 +1,388 @@
+"""
+API HTTP local de consulta sobre seguimiento_metas.db (solo biblioteca estándar).
+Sirve los datos de SQLite con filtros y paginación, ETag/304 calculado a partir
+de version_datos y respuestas gzip, usando un pool de conexiones de solo lectura.
+
+Rutas (GET):
+    /api/salud
+    /api/periodos
+    /api/regionales
+    /api/descripciones
+    /api/metas_fpi?periodo=&regional=&descripcion=&limit=&offset=
+    /api/metas_fpi_agregadas?periodo=&descripcion=&limit=&offset=
+
+Las colecciones responden con la misma forma que el procesador remoto
+(collection_name, total_records, returned_records, offset, limit, data).
+"""
+
+import argparse
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DB_FILE = "seguimiento_metas.db"
+HOST = "127.0.0.1"
+PUERTO = 8000
+CONEXIONES = 4
+
+# Respuestas más pequeñas que esto no se comprimen
+MINIMO_GZIP = 1024
+
+# Los agregados se sirven por defecto para el periodo más reciente importado
+PERIODO_VIGENTE = "(SELECT MAX(periodo) FROM agregado_fpi_descripcion)"
+
+# Colecciones: consulta base, columna de cada filtro admitido y orden
+COLECCIONES = {
+    "metas_fpi": {
+        "consulta": """
+    SELECT
+        mfpi.id,
+        mfpi.periodo,
+        dm.descripcion,
+        r.codigo_regional as regional,
+        mfpi.meta,
+        mfpi.ejecucion,
+        ROUND((mfpi.ejecucion * 100.0 / NULLIF(mfpi.meta, 0)), 2) as porcentaje,
+        es.estado as estadoSemaforo,
+        mfpi.es_subtotal as esSubtotal,
+        mfpi.es_total as esTotal,
+        mfpi.nivel_jerarquia as nivelJerarquia
+    FROM meta_formacion_profesional_integral mfpi
+    JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
+    JOIN regional r ON mfpi.id_regional = r.id
+    LEFT JOIN estado_semaforo es
+        ON es.periodo = mfpi.periodo
+        AND es.id_descripcion = mfpi.id_descripcion
+        AND es.id_regional = mfpi.id_regional
+    """,
+        "filtros": {
+            "periodo": "mfpi.periodo",
+            "regional": "r.codigo_regional",
+            "descripcion": "dm.descripcion",
+            "estado": "es.estado",
+        },
+        "orden": "r.codigo_regional, mfpi.nivel_jerarquia DESC, dm.descripcion",
+    },
+    "metas_fpi_agregadas": {
+        "consulta": """
+    SELECT
+        dm.id,
+        a.periodo,
+        dm.descripcion,
+        a.regionales,
+        a.meta as metaTotal,
+        a.ejecucion as ejecucionTotal,
+        a.porcentaje as porcentajeTotal,
+        es.estado as estadoSemaforo,
+        a.es_subtotal as esSubtotal,
+        a.es_total as esTotal,
+        a.nivel_jerarquia as nivelJerarquia
+    FROM agregado_fpi_descripcion a
+    JOIN descripcion_meta dm ON a.id_descripcion = dm.id
+    LEFT JOIN estado_semaforo es
+        ON es.periodo = a.periodo
+        AND es.id_descripcion = a.id_descripcion
+        AND es.id_regional IS NULL
+    """,
+        "filtros": {
+            "periodo": "a.periodo",
+            "descripcion": "dm.descripcion",
+            "estado": "es.estado",
+        },
+        "predeterminados": {"periodo": PERIODO_VIGENTE},
+        "orden": "a.nivel_jerarquia DESC, dm.descripcion",
+    },
+}
+
+# Listados sin filtros
+LISTADOS = {
+    "periodos": """
+    SELECT DISTINCT periodo FROM agregado_fpi_descripcion ORDER BY periodo
+    """,
+    "regionales": """
+    SELECT id, codigo_regional as codigo, nombre FROM regional ORDER BY codigo_regional
+    """,
+    "descripciones": """
+    SELECT id, descripcion FROM descripcion_meta ORDER BY descripcion
+    """,
+}
+
+# Filtros que el frontend envía pero que la base todavía no puede responder
+FILTROS_NO_DISPONIBLES = {"centro": "la base no tiene datos por centro de formación"}
+
+
+class ErrorConsulta(Exception):
+    """Error en los parámetros de una consulta; se responde con 400"""
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones de solo lectura compartidas entre los hilos del
+    servidor. Cada conexión guarda el inodo y la fecha de modificación del
+    archivo al abrirse: una importación con --reconstruir reemplaza el
+    archivo (os.replace) y una conexión abierta seguiría leyendo el anterior,
+    por lo que se vuelve a abrir al prestarla si el archivo cambió.
+    """
+
+    def __init__(self, db_file=DB_FILE, tamano=CONEXIONES):
+        self.db_file = db_file
+        self.conexiones = queue.Queue()
+        for _ in range(tamano):
+            self.conexiones.put(self.abrir())
+
+    def identidad(self):
+        """Inodo y fecha de modificación (ns) del archivo de la base"""
+        estado = os.stat(self.db_file)
+        return estado.st_ino, estado.st_mtime_ns
+
+    def abrir(self):
+        """Abre una conexión y retorna (conexión, identidad del archivo al abrirla)"""
+        identidad = self.identidad()
+        conn = sqlite3.connect(
+            f"file:{self.db_file}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        return conn, identidad
+
+    @contextlib.contextmanager
+    def conexion(self):
+        """Presta una conexión del pool durante el bloque, reabierta si el archivo cambió"""
+        conn, identidad = self.conexiones.get()
+        try:
+            if self.identidad() != identidad:
+                conn.close()
+                conn, identidad = self.abrir()
+            yield conn
+        finally:
+            self.conexiones.put((conn, identidad))
+
+    def cerrar(self):
+        """Cierra todas las conexiones del pool"""
+        while not self.conexiones.empty():
+            conn, _ = self.conexiones.get()
+            conn.close()
+
+
+def entero(parametros, nombre, predeterminado=None):
+    """Parámetro entero no negativo"""
+    valor = parametros.get(nombre)
+    if valor is None:
+        return predeterminado
+    if not valor.isdigit():
+        raise ErrorConsulta(f"{nombre} debe ser un entero no negativo")
+    return int(valor)
+
+
+def version_datos(conn):
+    """Huella de las versiones de todas las tablas (cambia con cada importación)"""
+    try:
+        filas = conn.execute("SELECT tabla, version FROM version_datos ORDER BY tabla")
+        versiones = [tuple(fila) for fila in filas]
+        return hashlib.sha256(repr(versiones).encode("utf-8")).hexdigest()
+    except sqlite3.OperationalError:
+        return None
+
+
+def consultar_coleccion(conn, nombre, parametros):
+    """Ejecuta una colección con sus filtros y paginación"""
+    coleccion = COLECCIONES[nombre]
+
+    for filtro, motivo in FILTROS_NO_DISPONIBLES.items():
+        if filtro in parametros:
+            raise ErrorConsulta(f"Filtro no disponible: {filtro} ({motivo})")
+    desconocidos = set(parametros) - set(coleccion["filtros"]) - {"limit", "offset"}
+    if desconocidos:
+        raise ErrorConsulta(f"Parámetros no admitidos: {', '.join(sorted(desconocidos))}")
+
+    limite = entero(parametros, "limit")
+    desplazamiento = entero(parametros, "offset", 0)
+
+    condiciones = []
+    valores = []
+    for filtro, columna in coleccion["filtros"].items():
+        if filtro in parametros:
+            condiciones.append(f"{columna} = ?")
+            valores.append(parametros[filtro])
+        elif filtro in coleccion.get("predeterminados", {}):
+            condiciones.append(f"{columna} = {coleccion['predeterminados'][filtro]}")
+    donde = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+    total = conn.execute(
+        f"SELECT COUNT(*) FROM ({coleccion['consulta']}{donde})", valores
+    ).fetchone()[0]
+    filas = conn.execute(
+        f"{coleccion['consulta']}{donde} ORDER BY {coleccion['orden']} LIMIT ? OFFSET ?",
+        valores + [-1 if limite is None else limite, desplazamiento],
+    ).fetchall()
+
+    return {
+        "collection_name": nombre,
+        "total_records": total,
+        "returned_records": len(filas),
+        "offset": desplazamiento,
+        "limit": limite,
+        "data": [dict(fila) for fila in filas],
+    }
+
+
+def nombre_ruta(ruta):
+    """Nombre del recurso de una ruta /api/<nombre>, o None si no existe"""
+    if not ruta.startswith("/api/"):
+        return None
+    nombre = ruta.removeprefix("/api/").strip("/")
+    if nombre == "salud" or nombre in LISTADOS or nombre in COLECCIONES:
+        return nombre
+    return None
+
+
+def resolver(conn, nombre, parametros):
+    """Retorna el documento de un recurso"""
+    if nombre == "salud":
+        return {"estado": "ok", "version": version_datos(conn)}
+    if nombre in LISTADOS:
+        if parametros:
+            raise ErrorConsulta(f"{nombre} no admite parámetros")
+        filas = conn.execute(LISTADOS[nombre]).fetchall()
+        if nombre == "periodos":
+            return [fila[0] for fila in filas]
+        return [dict(fila) for fila in filas]
+    return consultar_coleccion(conn, nombre, parametros)
+
+
+class ManejadorApi(BaseHTTPRequestHandler):
+    """Atiende las rutas GET de la API"""
+
+    pool = None
+    silencioso = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        nombre = nombre_ruta(url.path)
+        if nombre is None:
+            self.responder(404, {"error": f"Ruta no encontrada: {url.path}"})
+            return
+        parametros = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+
+        with self.pool.conexion() as conn:
+            # La versión y los datos se leen en la misma transacción
+            conn.execute("BEGIN")
+            try:
+                version = version_datos(conn)
+                # Con versión de datos el ETag se calcula sin ejecutar la consulta
+                etag = version and self.etag(version, url.path, parametros)
+                if etag and etag in self.etags_cliente():
+                    self.responder_no_modificado(etag)
+                    return
+                try:
+                    documento = resolver(conn, nombre, parametros)
+                except ErrorConsulta as error:
+                    self.responder(400, {"error": str(error)})
+                    return
+            finally:
+                conn.rollback()
+
+        self.responder(200, documento, etag)
+
+    @staticmethod
+    def etag(version, ruta, parametros):
+        """ETag débil de la ruta y sus parámetros para una versión de los datos"""
+        clave = json.dumps([version, ruta, sorted(parametros.items())])
+        return f'W/"{hashlib.sha256(clave.encode("utf-8")).hexdigest()[:32]}"'
+
+    def etags_cliente(self):
+        """ETags enviados en If-None-Match"""
+        cabecera = self.headers.get("If-None-Match", "")
+        return {etag.strip() for etag in cabecera.split(",") if etag.strip()}
+
+    def responder_no_modificado(self, etag):
+        """Responde 304 sin cuerpo"""
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+
+    def responder(self, estado, documento, etag=None):
+        """Envía el documento como JSON, comprimido con gzip si el cliente lo acepta"""
+        cuerpo = json.dumps(documento, ensure_ascii=False).encode("utf-8")
+        if etag is None and estado == 200:
+            etag = f'W/"{hashlib.sha256(cuerpo).hexdigest()[:32]}"'
+            if etag in self.etags_cliente():
+                self.responder_no_modificado(etag)
+                return
+
+        comprimir = (
+            len(cuerpo) >= MINIMO_GZIP
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        )
+        if comprimir:
+            cuerpo = gzip.compress(cuerpo, compresslevel=6)
+
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Cache-Control", "no-cache")
+        if comprimir:
+            self.send_header("Content-Encoding", "gzip")
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        if not self.silencioso:
+            super().log_message(formato, *args)
+
+
+def crear_servidor(
+    db_file=DB_FILE, host=HOST, puerto=PUERTO, conexiones=CONEXIONES, silencioso=False
+):
+    """Crea el servidor (sin iniciarlo) con su pool de conexiones"""
+    manejador = type(
+        "Manejador",
+        (ManejadorApi,),
+        {"pool": PoolConexiones(db_file, conexiones), "silencioso": silencioso},
+    )
+    return ThreadingHTTPServer((host, puerto), manejador)
+
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--db", default=DB_FILE, help="Base de datos SQLite")
+    parser.add_argument("--host", default=HOST, help=f"Interfaz (por defecto {HOST})")
+    parser.add_argument("--puerto", type=int, default=PUERTO, help="Puerto HTTP")
+    parser.add_argument(
+        "--conexiones",
+        type=int,
+        default=CONEXIONES,
+        help=f"Conexiones de solo lectura en el pool (por defecto {CONEXIONES})",
+    )
+    parser.add_argument(
+        "--silencioso", action="store_true", help="No registra cada petición"
+    )
+    args = parser.parse_args(argv)
+
+    servidor = crear_servidor(
+        args.db, args.host, args.puerto, args.conexiones, args.silencioso
+    )
+    print(f"[OK] API disponible en http://{args.host}:{args.puerto}/api/")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Servidor detenido")
+    finally:
+        servidor.server_close()
+        servidor.RequestHandlerClass.pool.cerrar()
+
+
+if __name__ == "__main__":
+    main()
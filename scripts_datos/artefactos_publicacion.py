@@ -0,0 +1,238 @@
+"""
+Artefactos de publicación de la exportación JSON.
+Copia cada archivo de datos_json/ (incluidos los subdirectorios de
+fragmentos) a publicado/ con el hash de su contenido
+en el nombre (metas_fpi.<hash>.json), junto con sus variantes precomprimidas
+.gz y .br, y escribe manifest.json con la correspondencia entre el nombre
+lógico y los archivos publicados. Un conjunto que no cambia conserva su
+nombre entre publicaciones, por lo que puede servirse con caché de larga
+duración; solo manifest.json debe revalidarse. Los archivos de la
+generación anterior se conservan hasta la publicación siguiente, para que un
+cliente que ya cargó el manifiesto anterior pueda seguir pidiéndolos.
+
+La variante brotli requiere el paquete `brotli` (ver Requisitos en el
+README); si no está instalado se publican solo .json y .gz y el reporte lo
+advierte.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+OUTPUT_DIR = "datos_json"
+DIRECTORIO_PUBLICADO = "publicado"
+MANIFIESTO = "manifest.json"
+
+# Extensiones de los archivos de datos que se publican
+EXTENSIONES = (".json", ".ndjson")
+
+# Caracteres hexadecimales del hash que van en el nombre del archivo
+LARGO_HASH = 12
+
+
+def comprimir_gzip(contenido):
+    """gzip de máxima compresión, reproducible (sin fecha en la cabecera)"""
+    return gzip.compress(contenido, compresslevel=9, mtime=0)
+
+
+def comprimir_brotli(contenido):
+    """brotli de máxima compresión"""
+    return brotli.compress(contenido, quality=11)
+
+
+COMPRESORES = {"gzip": (".gz", comprimir_gzip)}
+if brotli is not None:
+    COMPRESORES["br"] = (".br", comprimir_brotli)
+
+
+def nombre_con_hash(archivo, digest):
+    """metas_fpi.json -> metas_fpi.<hash>.json"""
+    base, extension = os.path.splitext(archivo)
+    return f"{base}.{digest[:LARGO_HASH]}{extension}"
+
+
+def escribir_si_no_existe(ruta, contenido):
+    """
+    Escribe el archivo salvo que ya exista: con el hash en el nombre, un
+    archivo existente tiene exactamente este contenido. Retorna True si se escribió.
+    """
+    if os.path.exists(ruta):
+        return False
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+    return True
+
+
+def listar_archivos(directorio, excluir=None):
+    """
+    Rutas relativas (con "/") de los archivos de datos bajo directorio,
+    recorriendo subdirectorios salvo `excluir`
+    """
+    excluir = excluir and os.path.abspath(excluir)
+    archivos = []
+    for raiz, subdirectorios, nombres in os.walk(directorio):
+        subdirectorios[:] = sorted(
+            nombre for nombre in subdirectorios
+            if os.path.abspath(os.path.join(raiz, nombre)) != excluir
+        )
+        relativo = os.path.relpath(raiz, directorio).replace(os.sep, "/")
+        # Los archivos ocultos (estado de la exportación) no se publican
+        archivos.extend(
+            nombre if relativo == "." else f"{relativo}/{nombre}"
+            for nombre in sorted(nombres)
+            if not nombre.startswith(".")
+        )
+    return archivos
+
+
+def publicar_archivo(ruta, relativo, destino):
+    """
+    Publica un archivo y sus variantes comprimidas en destino, en la misma
+    ruta relativa. Retorna (entrada del manifiesto, archivos escritos).
+    """
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+
+    digest = hashlib.sha256(contenido).hexdigest()
+    publicado = nombre_con_hash(relativo, digest)
+    os.makedirs(os.path.dirname(os.path.join(destino, publicado)), exist_ok=True)
+    entrada = {
+        "archivo": publicado,
+        "sha256": digest,
+        "bytes": len(contenido),
+    }
+
+    escritos = []
+    if escribir_si_no_existe(os.path.join(destino, publicado), contenido):
+        escritos.append(publicado)
+
+    for codificacion, (sufijo, comprimir) in COMPRESORES.items():
+        archivo = publicado + sufijo
+        ruta_comprimida = os.path.join(destino, archivo)
+        if not os.path.exists(ruta_comprimida):
+            escribir_si_no_existe(ruta_comprimida, comprimir(contenido))
+            escritos.append(archivo)
+        entrada[codificacion] = {
+            "archivo": archivo,
+            "bytes": os.path.getsize(ruta_comprimida),
+        }
+
+    return entrada, escritos
+
+
+def cargar_manifiesto(destino):
+    """Manifiesto publicado en destino, o None si no hay uno"""
+    try:
+        with open(os.path.join(destino, MANIFIESTO), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def archivos_del_manifiesto(manifiesto):
+    """Archivos publicados que referencia un manifiesto, con sus variantes comprimidas"""
+    archivos = set()
+    for entrada in manifiesto["archivos"].values():
+        archivos.add(entrada["archivo"])
+        archivos.update(
+            entrada[codificacion]["archivo"]
+            for codificacion in manifiesto["codificaciones"]
+            if codificacion in entrada
+        )
+    return archivos
+
+
+def publicar_artefactos(directorio=OUTPUT_DIR, destino=None):
+    """
+    Publica todos los archivos de datos de `directorio` en `destino` (por
+    defecto <directorio>/publicado) y escribe el manifiesto. Se eliminan los
+    archivos publicados que no figuran ni en el manifiesto nuevo ni en el
+    anterior: la generación anterior sigue disponible hasta la próxima
+    publicación.
+    Retorna (manifiesto, archivos escritos, archivos eliminados).
+    """
+    destino = destino or os.path.join(directorio, DIRECTORIO_PUBLICADO)
+    os.makedirs(destino, exist_ok=True)
+    anterior = cargar_manifiesto(destino)
+
+    archivos = {}
+    escritos = []
+    for archivo in listar_archivos(directorio, excluir=destino):
+        if archivo.endswith(EXTENSIONES):
+            ruta = os.path.join(directorio, archivo)
+            archivos[archivo], nuevos = publicar_archivo(ruta, archivo, destino)
+            escritos.extend(nuevos)
+
+    manifiesto = {
+        "version": 1,
+        "codificaciones": list(COMPRESORES),
+        "archivos": archivos,
+    }
+    temporal = os.path.join(destino, f"{MANIFIESTO}.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, os.path.join(destino, MANIFIESTO))
+
+    vigentes = {MANIFIESTO} | archivos_del_manifiesto(manifiesto)
+    if anterior is not None:
+        vigentes |= archivos_del_manifiesto(anterior)
+
+    eliminados = []
+    for archivo in listar_archivos(destino):
+        if archivo not in vigentes:
+            os.remove(os.path.join(destino, archivo))
+            eliminados.append(archivo)
+
+    return manifiesto, escritos, eliminados
+
+
+def reportar_publicacion(manifiesto, escritos, eliminados, destino):
+    """Imprime el resumen de la publicación"""
+    if brotli is None:
+        print("[WARN] Paquete brotli no instalado: se omiten las variantes .br")
+
+    archivos = manifiesto["archivos"]
+    sin_cambios = sum(
+        1 for entrada in archivos.values() if entrada["archivo"] not in escritos
+    )
+    print(
+        f"[OK] {len(archivos)} archivos publicados en {destino}/ "
+        f"({len(archivos) - sin_cambios} nuevos, {sin_cambios} sin cambios, "
+        f"{len(eliminados)} archivos de generaciones anteriores eliminados)"
+    )
+
+    original = sum(entrada["bytes"] for entrada in archivos.values())
+    for codificacion in manifiesto["codificaciones"]:
+        comprimido = sum(entrada[codificacion]["bytes"] for entrada in archivos.values())
+        print(
+            f"[INFO] {codificacion}: {original / 1024:.1f} KB -> {comprimido / 1024:.1f} KB "
+            f"({comprimido / original * 100 if original else 0:.1f}%)"
+        )
+
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--directorio", default=OUTPUT_DIR, help="Directorio con los JSON exportados"
+    )
+    parser.add_argument(
+        "--destino", help="Directorio de publicación (por defecto <directorio>/publicado)"
+    )
+    args = parser.parse_args(argv)
+
+    destino = args.destino or os.path.join(args.directorio, DIRECTORIO_PUBLICADO)
+    reportar_publicacion(*publicar_artefactos(args.directorio, destino), destino)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark del tiempo de lectura del libro ODS durante la importación.
+Compara la lectura hoja por hoja (un pd.read_excel por hoja) contra
+cargar_libro, que parsea el documento una sola vez, con el DOM de odfpy
+o con el lector por streaming de lector_ods.
+"""
+
+import contextlib
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import importar_a_sqlite as imp
+
+REPETICIONES = 3
+
+
+def leer_hoja_por_hoja(ods_file):
+    """Lectura original: cada hoja vuelve a descomprimir y parsear el ODS"""
+    return {
+        hoja: pd.read_excel(ods_file, sheet_name=hoja, engine="odf", **opciones)
+        for hoja, opciones in imp.HOJAS.items()
+    }
+
+
+def leer_libro_odf(ods_file):
+    """Libro parseado una sola vez con el DOM de odfpy"""
+    return imp.cargar_libro(ods_file, lector="odf")
+
+
+def leer_libro_stream(ods_file):
+    """Libro recorrido una sola vez con iterparse"""
+    return imp.cargar_libro(ods_file, lector="stream")
+
+
+LECTORES = {
+    "Hoja por hoja": leer_hoja_por_hoja,
+    "Libro unico (odf)": leer_libro_odf,
+    "Libro unico (stream)": leer_libro_stream,
+}
+
+
+def medir(funcion, *args):
+    """Retorna el mejor tiempo (segundos) de REPETICIONES ejecuciones"""
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def importar_en_memoria(lector, ods_file):
+    """Ejecuta la importación completa sobre una base de datos en memoria"""
+    libro = lector(ods_file)
+    conn = sqlite3.connect(":memory:")
+    imp.crear_esquema(conn)
+    imp.importar_formacion_regional(conn, libro["formacio_regional"])
+    imp.importar_semaforo(conn, libro["semaforo"])
+    imp.importar_formacion_por_nivel(conn, libro["profesional_integral_x_programa"])
+    imp.importar_programas_relevantes(conn, libro["nacional_seguimiento_relevantes"])
+    imp.importar_otras_metas(conn, libro["nacional_seguimiento_otras_meta"])
+    imp.generar_relaciones_jerarquicas(conn)
+    conn.close()
+
+
+def importar_a_archivo(modo, libro, ods_file, db_file):
+    """Importa el libro a una base nueva con el modo de escritura indicado"""
+    if os.path.exists(db_file):
+        os.remove(db_file)
+
+    archivo = os.path.basename(ods_file)
+    try:
+        periodo = imp.periodo_de_archivo(ods_file)
+    except ValueError:
+        periodo = imp.PERIODO
+
+    if modo == "reconstruir":
+        imp.construir_base([(archivo, periodo, libro)], db_file)
+        return
+
+    conn = sqlite3.connect(db_file)
+    imp.crear_esquema(conn)
+    imp.importar_libro(conn, libro, archivo, periodo, forzar=True)
+    imp.publicar_base(conn)
+
+
+MODOS_ESCRITURA = {
+    "Directo sobre archivo": "directo",
+    "Construccion rapida": "reconstruir",
+}
+
+
+def pico_memoria(lector, ods_file):
+    """Pico de memoria asignada (MB) durante la lectura, medido con tracemalloc"""
+    tracemalloc.start()
+    try:
+        lector(ods_file)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / (1024 * 1024)
+
+
+def main():
+    """Función principal"""
+    ods_file = sys.argv[1] if len(sys.argv) > 1 else imp.ODS_FILE
+
+    print("=" * 80)
+    print(f"BENCHMARK DE IMPORTACION: {ods_file}")
+    print(f"Mejor de {REPETICIONES} ejecuciones")
+    print("=" * 80)
+
+    resultados = {}
+    for nombre, lector in LECTORES.items():
+        lectura = medir(lector, ods_file)
+        # La importación completa imprime su progreso; se silencia durante la medición
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            total = medir(importar_en_memoria, lector, ods_file)
+        resultados[nombre] = (lectura, total, pico_memoria(lector, ods_file))
+
+    lectura_base, total_base, _ = resultados["Hoja por hoja"]
+
+    print(
+        f"{'Lector':<24}{'Lectura':>10}{'Importacion':>13}"
+        f"{'Aceleracion':>13}{'Pico memoria':>15}"
+    )
+    for nombre, (lectura, total, pico) in resultados.items():
+        print(
+            f"{nombre:<24}{lectura:>9.3f}s{total:>12.3f}s"
+            f"{total_base / total:>12.2f}x{pico:>12.1f} MB"
+        )
+
+    # Modos de escritura sobre una base nueva, con el libro ya leído
+    libro = imp.cargar_libro(ods_file)
+    tiempos = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        db_file = os.path.join(directorio, "benchmark.db")
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            for nombre, modo in MODOS_ESCRITURA.items():
+                tiempos[nombre] = medir(importar_a_archivo, modo, libro, ods_file, db_file)
+
+    base = tiempos["Directo sobre archivo"]
+    print(f"\n{'Modo de escritura':<24}{'Tiempo':>10}{'Aceleracion':>13}")
+    for nombre, segundos in tiempos.items():
+        print(f"{nombre:<24}{segundos:>9.3f}s{base / segundos:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Benchmark del pipeline completo sobre libros sintéticos de distintos tamaños.
+Para cada escenario genera los libros con generar_libros_sinteticos.py en un
+directorio temporal y ejecuta, cada etapa en su propio proceso, la
+importación en lote, las referencias y la exportación completa. Mide el
+tiempo, el rendimiento (filas de metas FPI por segundo) y el pico de memoria
+residente de cada etapa; el pico y el tiempo de las etapas internas se
+toman del reporte de instrumentacion.py que cada script escribe con
+--reporte. Compara contra las líneas base guardadas: una etapa más lenta o
+con más memoria que la tolerancia se reporta como regresión y el script
+termina con código 1.
+
+Uso:
+    python benchmark_pipeline.py                       # escenarios 1x y 10x
+    python benchmark_pipeline.py --escenario 100x
+    python benchmark_pipeline.py --guardar-linea-base  # guarda los resultados
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import generar_libros_sinteticos as sinteticos
+
+DIRECTORIO_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+
+# Junto al script, para que la comparación no dependa del directorio actual
+ARCHIVO_LINEAS_BASE = os.path.join(DIRECTORIO_SCRIPTS, "lineas_base_pipeline.json")
+
+# Volumen relativo a los datos reales (33 regionales, un mes): como el libro
+# no tiene dimensión de centros, el volumen crece con regionales y periodos
+ESCENARIOS = {
+    "1x": {"regionales": 33, "metas": 64, "categorias": 8, "metricas": 10, "periodos": 1},
+    "10x": {"regionales": 110, "metas": 64, "categorias": 16, "metricas": 10, "periodos": 3},
+    "100x": {"regionales": 330, "metas": 64, "categorias": 40, "metricas": 25, "periodos": 10},
+}
+
+ESCENARIOS_POR_DEFECTO = ("1x", "10x")
+
+# Cada etapa se ejecuta con el directorio del escenario como directorio de trabajo
+ETAPAS = {
+    "importacion": ["importar_lote.py", ".", "--reconstruir"],
+    "referencias": ["generar_referencias_json.py", "--sin-cache"],
+    "exportacion": ["exportar_a_json.py", "--completo", "--sin-cache", "--sin-publicar"],
+}
+
+# Aumento relativo admitido sobre la línea base antes de reportar una regresión
+TOLERANCIA = 0.25
+
+
+def ejecutar_etapa(etapa, directorio):
+    """
+    Ejecuta una etapa en un proceso hijo y retorna (segundos, pico de memoria
+    residente en MB, reporte de instrumentación). La salida de la etapa se
+    descarta salvo si falla.
+    """
+    script, *argumentos = ETAPAS[etapa]
+    reporte = os.path.join(directorio, f"reporte_{etapa}.json")
+    comando = [
+        sys.executable,
+        os.path.join(DIRECTORIO_SCRIPTS, script),
+        *argumentos,
+        "--reporte",
+        reporte,
+    ]
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        comando, cwd=directorio, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    segundos = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        print(proceso.stdout.decode("utf-8", errors="replace"))
+        raise RuntimeError(f"La etapa {etapa} terminó con código {proceso.returncode}")
+
+    with open(reporte, encoding="utf-8") as f:
+        reporte = json.load(f)
+    # El pico se toma del reporte de la etapa: el ru_maxrss del hijo que ve
+    # este proceso conserva, tras el exec, la memoria de este mismo benchmark
+    pico = max(reporte["pico_rss_mb"] or 0, reporte["pico_rss_hijos_mb"] or 0)
+    return segundos, pico, reporte
+
+
+def etapas_internas(reporte):
+    """Segundos por etapa de primer nivel del reporte (las repetidas se suman)"""
+    segundos = {}
+    for medida in reporte["etapas"]:
+        if medida["nivel"] == 0:
+            nombre = medida["nombre"].split(":")[0]
+            segundos[nombre] = round(segundos.get(nombre, 0) + medida["segundos"], 3)
+    return segundos
+
+
+def contar_filas(db_file):
+    """Filas de metas FPI por regional importadas, la medida de volumen del escenario"""
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM meta_formacion_profesional_integral"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def medir_escenario(nombre):
+    """Genera los libros del escenario y mide cada etapa del pipeline"""
+    with tempfile.TemporaryDirectory(prefix=f"benchmark_{nombre}_") as directorio:
+        # La generación imprime cada libro; se silencia durante la medición
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            libros = sinteticos.generar_libros(directorio, **ESCENARIOS[nombre])
+
+        etapas = {}
+        for etapa in ETAPAS:
+            etapas[etapa] = ejecutar_etapa(etapa, directorio)
+        filas = contar_filas(os.path.join(directorio, "seguimiento_metas.db"))
+
+    return {
+        "libros": len(libros),
+        "filas": filas,
+        "etapas": {
+            etapa: {
+                "segundos": round(segundos, 3),
+                "filas_por_segundo": round(filas / segundos, 1),
+                "pico_memoria_mb": round(pico, 1),
+                "internas": etapas_internas(reporte),
+            }
+            for etapa, (segundos, pico, reporte) in etapas.items()
+        },
+    }
+
+
+def cargar_lineas_base(ruta):
+    """Líneas base guardadas por escenario (vacío si no hay archivo)"""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def guardar_lineas_base(ruta, resultados):
+    """Guarda los resultados como líneas base, conservando los otros escenarios"""
+    lineas_base = cargar_lineas_base(ruta)
+    lineas_base.update(resultados)
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+        json.dump(lineas_base, f, ensure_ascii=False, indent=2)
+    os.replace(f"{ruta}.tmp", ruta)
+
+
+def buscar_regresiones(resultados, lineas_base, tolerancia):
+    """
+    Compara tiempo y pico de memoria de cada etapa con su línea base.
+    Retorna (escenario, etapa, métrica, base, actual) de las que la superan
+    en más de la tolerancia.
+    """
+    regresiones = []
+    for escenario, resultado in resultados.items():
+        base = lineas_base.get(escenario)
+        if base is None:
+            continue
+        for etapa, medidas in resultado["etapas"].items():
+            medidas_base = base["etapas"].get(etapa)
+            if medidas_base is None:
+                continue
+            for metrica in ("segundos", "pico_memoria_mb"):
+                if medidas[metrica] > medidas_base[metrica] * (1 + tolerancia):
+                    regresiones.append(
+                        (escenario, etapa, metrica, medidas_base[metrica], medidas[metrica])
+                    )
+    return regresiones
+
+
+def imprimir_resultados(resultados, lineas_base):
+    """
+    Tabla por escenario y etapa, con la variación de tiempo contra la línea
+    base y la etapa interna que más tiempo tomó
+    """
+    print(
+        f"\n{'Escenario':<11}{'Etapa':<14}{'Filas':>9}{'Tiempo':>10}"
+        f"{'Filas/s':>12}{'Pico memoria':>15}{'vs base':>10}  Etapa interna mas lenta"
+    )
+    for escenario, resultado in resultados.items():
+        base = lineas_base.get(escenario, {}).get("etapas", {})
+        for etapa, medidas in resultado["etapas"].items():
+            variacion = ""
+            if etapa in base:
+                variacion = f"{medidas['segundos'] / base[etapa]['segundos'] - 1:+.0%}"
+            internas = medidas["internas"]
+            lenta = max(internas, key=internas.get) if internas else ""
+            if lenta:
+                lenta = f"{lenta} ({internas[lenta]:.3f}s)"
+            print(
+                f"{escenario:<11}{etapa:<14}{resultado['filas']:>9}"
+                f"{medidas['segundos']:>9.3f}s{medidas['filas_por_segundo']:>12.0f}"
+                f"{medidas['pico_memoria_mb']:>12.1f} MB{variacion:>10}  {lenta}"
+            )
+
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--escenario",
+        action="append",
+        choices=sorted(ESCENARIOS),
+        help="Escenario a medir (puede repetirse; por defecto, "
+        f"{', '.join(ESCENARIOS_POR_DEFECTO)})",
+    )
+    parser.add_argument(
+        "--lineas-base",
+        default=ARCHIVO_LINEAS_BASE,
+        help="Archivo JSON con las líneas base por escenario",
+    )
+    parser.add_argument(
+        "--guardar-linea-base",
+        action="store_true",
+        help="Guarda los resultados como líneas base en lugar de compararlos",
+    )
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=TOLERANCIA,
+        help="Aumento relativo admitido de tiempo y memoria (0.25 = 25%%)",
+    )
+    args = parser.parse_args(argv)
+    escenarios = args.escenario or ESCENARIOS_POR_DEFECTO
+
+    print("=" * 80)
+    print(f"BENCHMARK DEL PIPELINE: {', '.join(escenarios)}")
+    print("=" * 80)
+
+    resultados = {}
+    for escenario in escenarios:
+        print(f"[INFO] Midiendo escenario {escenario}: {ESCENARIOS[escenario]}")
+        try:
+            resultados[escenario] = medir_escenario(escenario)
+        except RuntimeError as e:
+            print(f"[ERROR] Escenario {escenario}: {e}")
+            return 1
+
+    lineas_base = {} if args.guardar_linea_base else cargar_lineas_base(args.lineas_base)
+    imprimir_resultados(resultados, lineas_base)
+
+    if args.guardar_linea_base:
+        guardar_lineas_base(args.lineas_base, resultados)
+        print(f"\n[OK] Lineas base guardadas en {args.lineas_base}")
+        return 0
+
+    if not lineas_base:
+        print(f"\n[INFO] Sin lineas base en {args.lineas_base}: use --guardar-linea-base")
+        return 0
+
+    regresiones = buscar_regresiones(resultados, lineas_base, args.tolerancia)
+    for escenario, etapa, metrica, base, actual in regresiones:
+        print(f"[WARN] Regresion en {escenario}/{etapa}: {metrica} {base} -> {actual}")
+    if regresiones:
+        return 1
+
+    print(f"\n[OK] Sin regresiones (tolerancia {args.tolerancia:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
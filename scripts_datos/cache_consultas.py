@@ -0,0 +1,137 @@
+"""
+Cache de resultados de consultas para la exportación y las referencias.
+Cada resultado se guarda con la clave (texto SQL, parámetros) junto con las
+tablas que leyó la consulta y su versión en version_datos, que cambia con
+cada modificación de la tabla: un resultado solo se sirve si ninguna de esas
+tablas cambió desde que se guardó, de modo que una importación que modifica
+una tabla invalida únicamente las consultas que la leen. Al superar la
+capacidad se descarta el resultado usado hace más tiempo (LRU).
+
+El cache puede guardarse en un archivo junto a la base (ruta_cache) y
+cargarse en la siguiente ejecución, de modo que una exportación o unas
+referencias sobre datos sin cambios no vuelven a ejecutar sus consultas.
+"""
+
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+
+from motor_exportacion import anotar_tablas, iterar_filas, registrar_tablas
+
+# Sufijo del archivo de cache, compartido por exportar_a_json.py y
+# generar_referencias_json.py: seguimiento_metas.db ->
+# seguimiento_metas.cache_consultas.json, en el directorio de la base
+SUFIJO_CACHE = ".cache_consultas.json"
+
+CAPACIDAD = 256
+
+
+def ruta_cache(db_file):
+    """Archivo de cache de la base db_file, en su mismo directorio"""
+    return os.path.splitext(db_file)[0] + SUFIJO_CACHE
+
+
+def versiones_datos(conn):
+    """
+    Versión actual de cada tabla, o None si la base no tiene version_datos
+    (en ese caso no se usa el cache)
+    """
+    try:
+        return {
+            tabla: version
+            for tabla, version in conn.execute("SELECT tabla, version FROM version_datos")
+        }
+    except sqlite3.OperationalError:
+        return None
+
+
+class CacheConsultas:
+    """Resultados de consultas por (SQL, parámetros) y versión de sus tablas, con LRU"""
+
+    def __init__(self, capacidad=CAPACIDAD):
+        self.capacidad = capacidad
+        self.entradas = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+
+    @staticmethod
+    def clave(sql, parametros):
+        # Los espacios no cambian la consulta: se normalizan en la clave
+        return (" ".join(sql.split()), tuple(parametros))
+
+    def consultar(self, conn, sql, parametros=()):
+        """
+        Retorna las filas (diccionarios) de la consulta, del cache si ya se
+        ejecutó y las tablas que leyó no cambiaron desde entonces. Las tablas
+        se anotan también en los aciertos, para registrar_tablas.
+        """
+        versiones = versiones_datos(conn)
+        if versiones is None:
+            return list(iterar_filas(conn.execute(sql, parametros)))
+
+        clave = self.clave(sql, parametros)
+        entrada = self.entradas.get(clave)
+        if entrada is not None:
+            filas, tablas = entrada
+            # Las tablas sin versión (sin triggers) no permiten validar el resultado
+            if all(
+                version is not None and versiones.get(tabla) == version
+                for tabla, version in tablas.items()
+            ):
+                self.aciertos += 1
+                self.entradas.move_to_end(clave)
+                anotar_tablas(conn, tablas)
+                return [dict(fila) for fila in filas]
+
+        self.fallos += 1
+        with registrar_tablas(conn) as leidas:
+            filas = list(iterar_filas(conn.execute(sql, parametros)))
+        tablas = {tabla: versiones.get(tabla) for tabla in sorted(leidas)}
+        self.entradas[clave] = (filas, tablas)
+        self.entradas.move_to_end(clave)
+        while len(self.entradas) > self.capacidad:
+            self.entradas.popitem(last=False)
+            self.descartes += 1
+        return [dict(fila) for fila in filas]
+
+    def estadisticas(self):
+        """Contadores de aciertos, fallos, descartes y entradas"""
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "descartes": self.descartes,
+            "entradas": len(self.entradas),
+        }
+
+    def reportar(self):
+        """Imprime los contadores del cache"""
+        e = self.estadisticas()
+        print(
+            f"[INFO] Cache de consultas: {e['aciertos']} aciertos, {e['fallos']} fallos, "
+            f"{e['descartes']} descartes, {e['entradas']} entradas"
+        )
+
+    def guardar(self, ruta):
+        """Guarda las entradas (de la menos a la más reciente) en un archivo JSON"""
+        entradas = [
+            [sql, list(parametros), filas, tablas]
+            for (sql, parametros), (filas, tablas) in self.entradas.items()
+        ]
+        with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+            json.dump(entradas, f, ensure_ascii=False)
+        os.replace(f"{ruta}.tmp", ruta)
+
+    @classmethod
+    def cargar(cls, ruta, capacidad=CAPACIDAD):
+        """Cache con las entradas guardadas en ruta (vacío si no existe o no se puede leer)"""
+        cache = cls(capacidad)
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                entradas = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        for sql, parametros, filas, tablas in entradas[-capacidad:]:
+            cache.entradas[(sql, tuple(parametros))] = (filas, tablas)
+        return cache
@@ -0,0 +1,88 @@
+"""
+Cache en memoria de las claves de dimensiones (regional, descripcion_meta, ...)
+Carga una vez las claves existentes, asigna los ids sustitutos en memoria y
+escribe las claves nuevas en bloque, evitando el par INSERT OR IGNORE + SELECT
+por cada nombre que se resuelve a id.
+"""
+
+# Dimensiones conocidas: tabla -> (columna clave natural, columnas adicionales)
+# Para agregar una dimensión (por ejemplo centro o periodo) basta con
+# registrarla aquí una vez exista su tabla en el esquema.
+DIMENSIONES = {
+    "regional": ("codigo_regional", ("nombre",)),
+    "descripcion_meta": ("descripcion", ()),
+}
+
+
+class CacheDimension:
+    """Mapa clave natural -> id de una tabla de dimensión"""
+
+    def __init__(self, conn, tabla, clave, columnas=()):
+        self.conn = conn
+        self.tabla = tabla
+        self.clave = clave
+        self.columnas = tuple(columnas)
+        self.ids = {}
+        self.nuevos = []
+
+        for id_, valor in conn.execute(f"SELECT id, {clave} FROM {tabla}"):
+            self.ids[valor] = id_
+
+        # Con AUTOINCREMENT los ids nunca se reutilizan: se parte del mayor
+        # entre el último id existente y el registrado en sqlite_sequence
+        ultimo = max(self.ids.values(), default=0)
+        secuencia = conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,)
+        ).fetchone()
+        if secuencia:
+            ultimo = max(ultimo, secuencia[0])
+        self.siguiente_id = ultimo + 1
+
+    def obtener_id(self, valor, *atributos):
+        """
+        Retorna el id de la clave; si no existe le asigna uno nuevo en memoria.
+        Los atributos (en el orden de `columnas`) solo se usan al crearla.
+        """
+        id_ = self.ids.get(valor)
+        if id_ is None:
+            id_ = self.siguiente_id
+            self.siguiente_id += 1
+            self.ids[valor] = id_
+            self.nuevos.append((id_, valor, *atributos))
+        return id_
+
+    def volcar(self):
+        """Inserta en bloque las claves nuevas y retorna cuántas se escribieron"""
+        if not self.nuevos:
+            return 0
+
+        columnas = ("id", self.clave) + self.columnas
+        marcadores = ", ".join("?" for _ in columnas)
+        self.conn.executemany(
+            f"INSERT INTO {self.tabla} ({', '.join(columnas)}) VALUES ({marcadores})",
+            self.nuevos,
+        )
+        cantidad = len(self.nuevos)
+        self.nuevos = []
+        return cantidad
+
+
+class Dimensiones:
+    """
+    Caches de todas las dimensiones de una ejecución, compartidas por los
+    importadores. Cada cache se crea (y carga) la primera vez que se pide.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.caches = {}
+
+    def __getitem__(self, tabla):
+        if tabla not in self.caches:
+            clave, columnas = DIMENSIONES[tabla]
+            self.caches[tabla] = CacheDimension(self.conn, tabla, clave, columnas)
+        return self.caches[tabla]
+
+    def volcar(self):
+        """Escribe las claves nuevas de todas las dimensiones"""
+        return sum(cache.volcar() for cache in self.caches.values())
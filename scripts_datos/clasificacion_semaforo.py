@@ -0,0 +1,258 @@
+"""
+Clasificación por semáforo de las metas FPI según rangos_categorizacion.
+Cada meta (regional x descripción x periodo) y cada agregado nacional se
+asocia al rango de su indicador para el mes del periodo y todos los
+cumplimientos se clasifican a la vez, con operaciones vectorizadas sobre
+columnas, en bajo, vulnerable, buena o sobreejecucion. El resultado se
+materializa en estado_semaforo, que leen las exportaciones.
+"""
+
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+DB_FILE = "seguimiento_metas.db"
+
+MESES = (
+    "Enero",
+    "Febrero",
+    "Marzo",
+    "Abril",
+    "Mayo",
+    "Junio",
+    "Julio",
+    "Agosto",
+    "Septiembre",
+    "Octubre",
+    "Noviembre",
+    "Diciembre",
+)
+
+
+def numero_mes(mes):
+    """Número (1-12) de un mes por su nombre en español, o 0 si no se reconoce"""
+    nombre = str(mes).strip().capitalize()
+    return MESES.index(nombre) + 1 if nombre in MESES else 0
+
+
+def mes_de_periodo(periodo):
+    """Número de mes de un periodo YYYY_MM"""
+    return int(str(periodo).split("_")[1])
+
+
+def cargar_rangos(conn):
+    """Rangos de cada indicador y mes, con el número del mes"""
+    rangos = pd.read_sql_query(
+        """
+        SELECT id as id_rango, nombre_indicador, mes, min_vulnerable, min_buena,
+               sobreejecucion_superior_a
+        FROM rangos_categorizacion
+        """,
+        conn,
+    )
+    rangos["numero_mes"] = rangos["mes"].map(numero_mes)
+    return rangos
+
+
+def cargar_cumplimientos(conn, periodos):
+    """
+    Meta y ejecución de las metas por regional y de los agregados nacionales
+    (id_regional nulo) de los periodos indicados
+    """
+    marcadores = ", ".join("?" for _ in periodos)
+    return pd.read_sql_query(
+        f"""
+        SELECT m.periodo, m.id_descripcion, m.id_regional, dm.descripcion,
+               m.meta, m.ejecucion
+        FROM meta_formacion_profesional_integral m
+        JOIN descripcion_meta dm ON dm.id = m.id_descripcion
+        WHERE m.periodo IN ({marcadores})
+        UNION ALL
+        SELECT a.periodo, a.id_descripcion, NULL, dm.descripcion, a.meta, a.ejecucion
+        FROM agregado_fpi_descripcion a
+        JOIN descripcion_meta dm ON dm.id = a.id_descripcion
+        WHERE a.periodo IN ({marcadores})
+        """,
+        conn,
+        params=list(periodos) * 2,
+    )
+
+
+def asignar_rangos(cumplimientos, rangos):
+    """
+    Agrega a cada cumplimiento el rango de su indicador: el del mes del
+    periodo si está cargado y, si no, el del último mes anterior cargado
+    para ese indicador. Un rango de un mes posterior no se usa: los
+    indicadores sin rango hasta el mes del periodo quedan con umbrales
+    nulos (sin clasificar).
+    """
+    pares = cumplimientos[["descripcion", "periodo"]].drop_duplicates()
+    pares["mes_periodo"] = pares["periodo"].map(mes_de_periodo)
+    candidatos = pares.merge(rangos, left_on="descripcion", right_on="nombre_indicador")
+    candidatos = candidatos[
+        candidatos["numero_mes"].between(1, candidatos["mes_periodo"])
+    ]
+    elegidos = candidatos.sort_values(
+        ["numero_mes", "id_rango"], ascending=False
+    ).drop_duplicates(["descripcion", "periodo"])
+    columnas = ["descripcion", "periodo", "id_rango", "min_vulnerable", "min_buena",
+                "sobreejecucion_superior_a"]
+    return cumplimientos.merge(elegidos[columnas], on=["descripcion", "periodo"], how="left")
+
+
+def rangos_solo_posteriores(datos, rangos):
+    """
+    Indicadores que quedaron sin rango pero tienen rangos de meses
+    posteriores al del periodo, que asignar_rangos no usa.
+    Retorna (periodo, descripcion, meses) ordenados por periodo y descripción.
+    """
+    sin_rango = datos.loc[datos["id_rango"].isna(), ["periodo", "descripcion"]]
+    pares = sin_rango.drop_duplicates()
+    pares["mes_periodo"] = pares["periodo"].map(mes_de_periodo)
+    posteriores = pares.merge(rangos, left_on="descripcion", right_on="nombre_indicador")
+    posteriores = posteriores[posteriores["numero_mes"] > posteriores["mes_periodo"]]
+    return [
+        (periodo, descripcion, list(grupo.sort_values("numero_mes")["mes"].unique()))
+        for (periodo, descripcion), grupo in posteriores.groupby(["periodo", "descripcion"])
+    ]
+
+
+def clasificar(datos):
+    """
+    Cumplimiento (ejecución / meta) y estado de cada fila. Los umbrales se
+    evalúan en orden (sobreejecución, buena, vulnerable; si no, bajo) sobre
+    todas las filas a la vez; sin rango o sin meta el estado es nulo.
+    Cada fila tiene los umbrales de su propio rango, por lo que no hay un
+    único arreglo ordenado para np.searchsorted: np.select compara columna
+    contra columna en una sola pasada.
+    """
+    meta = datos["meta"].astype(float).replace(0, np.nan)
+    cumplimiento = (datos["ejecucion"].astype(float) / meta).to_numpy()
+    estados = np.select(
+        [
+            datos["id_rango"].isna().to_numpy() | np.isnan(meta.to_numpy()),
+            cumplimiento > datos["sobreejecucion_superior_a"].to_numpy(dtype=float),
+            cumplimiento >= datos["min_buena"].to_numpy(dtype=float),
+            cumplimiento >= datos["min_vulnerable"].to_numpy(dtype=float),
+        ],
+        [None, "sobreejecucion", "buena", "vulnerable"],
+        default="bajo",
+    )
+    return cumplimiento, estados
+
+
+def periodos_sin_estado(conn):
+    """Periodos con metas FPI pero sin estados de semáforo materializados"""
+    return [
+        periodo
+        for (periodo,) in conn.execute("""
+        SELECT DISTINCT periodo FROM meta_formacion_profesional_integral
+        WHERE periodo NOT IN (SELECT periodo FROM estado_semaforo)
+        """)
+    ]
+
+
+def periodos_con_metas(conn):
+    """Todos los periodos con metas FPI"""
+    return [
+        periodo
+        for (periodo,) in conn.execute(
+            "SELECT DISTINCT periodo FROM meta_formacion_profesional_integral"
+        )
+    ]
+
+
+def actualizar_estados_semaforo(conn, periodos):
+    """
+    Recalcula estado_semaforo para los periodos indicados: borra sus filas y
+    las vuelve a insertar clasificadas. Retorna la cantidad de filas escritas.
+    """
+    periodos = sorted(periodos)
+    if not periodos:
+        return 0
+
+    rangos = cargar_rangos(conn)
+    datos = asignar_rangos(cargar_cumplimientos(conn, periodos), rangos)
+    cumplimiento, estados = clasificar(datos)
+
+    filas = pd.DataFrame({
+        "periodo": datos["periodo"],
+        "id_descripcion": datos["id_descripcion"],
+        "id_regional": datos["id_regional"],
+        "id_rango": datos["id_rango"],
+        "cumplimiento": cumplimiento,
+        "estado": estados,
+    }).astype(object)
+    filas = filas.where(filas.notna(), None)
+
+    marcadores = ", ".join("?" for _ in periodos)
+    conn.execute(f"DELETE FROM estado_semaforo WHERE periodo IN ({marcadores})", periodos)
+    conn.executemany(
+        """
+        INSERT INTO estado_semaforo
+        (periodo, id_descripcion, id_regional, id_rango, cumplimiento, estado)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        filas.itertuples(index=False, name=None),
+    )
+    # La tabla no tiene triggers de versión: se renueva una vez por escritura
+    conn.execute("""
+        UPDATE version_datos
+        SET version = lower(hex(randomblob(8))),
+            fecha_modificacion = CURRENT_TIMESTAMP
+        WHERE tabla = 'estado_semaforo'
+    """)
+    for periodo, descripcion, meses in rangos_solo_posteriores(datos, rangos):
+        print(f"[WARN] {descripcion}: sin rango hasta el mes de {periodo} "
+              f"(solo {', '.join(meses)}), queda sin clasificar")
+
+    print(f"[OK] Estados de semaforo actualizados para {', '.join(periodos)}")
+    return len(filas)
+
+
+def reportar_estados(conn):
+    """Imprime la cantidad de filas por periodo y estado"""
+    print(f"\n{'Periodo':<10}{'Estado':<16}{'Regional':>10}{'Nacional':>10}")
+    for periodo, estado, regional, nacional in conn.execute("""
+        SELECT periodo, COALESCE(estado, 'sin estado'),
+               SUM(id_regional IS NOT NULL), SUM(id_regional IS NULL)
+        FROM estado_semaforo
+        GROUP BY periodo, estado
+        ORDER BY periodo, estado
+    """):
+        print(f"{periodo:<10}{estado:<16}{regional:>10}{nacional:>10}")
+
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=DB_FILE, help="Base de datos SQLite a clasificar")
+    parser.add_argument(
+        "--periodo",
+        action="append",
+        help="Periodo YYYY_MM a clasificar (puede repetirse; por defecto, todos)",
+    )
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        conn.execute("SELECT 1 FROM estado_semaforo LIMIT 1")
+    except sqlite3.OperationalError:
+        print("[ERROR] La base no tiene la tabla estado_semaforo: ejecute importar_a_sqlite.py")
+        conn.close()
+        return 1
+
+    inicio = time.perf_counter()
+    filas = actualizar_estados_semaforo(conn, args.periodo or periodos_con_metas(conn))
+    conn.commit()
+    print(f"[INFO] {filas} filas clasificadas en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    reportar_estados(conn)
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,198 @@
+"""
+Validación de la consolidación jerárquica de las metas FPI.
+Lee relacion_jerarquica una sola vez y suma la meta y la ejecución de los
+componentes de cada subtotal y total para todas las regionales y periodos
+a la vez, sobre una matriz nodo x (periodo, regional). Cada subtotal y
+total importado se compara con la suma de sus componentes importados (un
+solo nivel), de modo que un componente con error se reporta una vez y no
+en cada ancestro.
+"""
+
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+DB_FILE = "seguimiento_metas.db"
+
+CAMPOS = ("meta", "ejecucion")
+
+
+def cargar_jerarquia(conn):
+    """
+    Retorna las aristas padre -> hijos a nivel de descripcion_meta.
+    Las relaciones están enlazadas por registro (regional y periodo); aquí
+    se colapsan a pares de descripciones distintos.
+    """
+    aristas = {}
+    for id_padre, id_hijo in conn.execute("""
+        SELECT DISTINCT padre.id_descripcion, hijo.id_descripcion
+        FROM relacion_jerarquica r
+        JOIN meta_formacion_profesional_integral padre ON padre.id = r.id_padre
+        JOIN meta_formacion_profesional_integral hijo ON hijo.id = r.id_hijo
+        WHERE r.operacion = 'suma'
+    """):
+        aristas.setdefault(id_padre, set()).add(id_hijo)
+    return aristas
+
+
+def cargar_matriz(conn, periodos=None):
+    """
+    Lee las metas FPI y las pivota a un DataFrame con índice id_descripcion
+    y columnas (campo, periodo, id_regional)
+    """
+    consulta = """
+        SELECT id_descripcion, periodo, id_regional, meta, ejecucion
+        FROM meta_formacion_profesional_integral
+    """
+    parametros = []
+    if periodos:
+        consulta += f" WHERE periodo IN ({', '.join('?' for _ in periodos)})"
+        parametros = list(periodos)
+
+    datos = pd.read_sql_query(consulta, conn, params=parametros)
+    return datos.pivot_table(
+        index="id_descripcion",
+        columns=["periodo", "id_regional"],
+        values=list(CAMPOS),
+        aggfunc="sum",
+    )
+
+
+def sumar_hijos(aristas, matriz):
+    """
+    Suma para cada padre los valores importados de sus hijos directos (los
+    hijos sin dato cuentan como cero), sin recalcular los niveles
+    intermedios. Retorna un DataFrame con índice los padres y las columnas
+    de `matriz`.
+    """
+    padres = sorted(aristas)
+    hijos = sorted(set().union(*aristas.values()))
+    posicion = {hijo: i for i, hijo in enumerate(hijos)}
+
+    adyacencia = np.zeros((len(padres), len(hijos)))
+    for fila, padre in enumerate(padres):
+        adyacencia[fila, [posicion[hijo] for hijo in aristas[padre]]] = 1
+
+    valores = matriz.reindex(hijos).fillna(0).to_numpy(dtype=float)
+    return pd.DataFrame(adyacencia @ valores, index=padres, columns=matriz.columns)
+
+
+def validar_totales(conn, periodos=None, tolerancia=0.5):
+    """
+    Compara cada subtotal y total importado contra la suma de sus
+    componentes importados (sumar_hijos). Retorna un DataFrame con una
+    fila por diferencia: periodo, regional, descripcion, campo, importado,
+    calculado y diferencia.
+    """
+    aristas = cargar_jerarquia(conn)
+    columnas = [
+        "periodo", "regional", "descripcion", "campo", "importado", "calculado", "diferencia"
+    ]
+    if not aristas:
+        return pd.DataFrame(columns=columnas)
+
+    matriz = cargar_matriz(conn, periodos)
+    padres = [padre for padre in aristas if padre in matriz.index]
+    importado = matriz.loc[padres]
+    calculado = sumar_hijos(aristas, matriz).loc[padres]
+
+    diferencia = calculado - importado
+    # Solo se comparan los padres que existen en la hoja para esa regional
+    distinto = importado.notna().to_numpy() & (np.abs(diferencia.to_numpy()) > tolerancia)
+    filas, cols = np.nonzero(distinto)
+    if not len(filas):
+        return pd.DataFrame(columns=columnas)
+
+    etiquetas = importado.columns[cols]
+    resultado = pd.DataFrame({
+        "id_descripcion": importado.index[filas],
+        "campo": etiquetas.get_level_values(0),
+        "periodo": etiquetas.get_level_values(1),
+        "id_regional": etiquetas.get_level_values(2),
+        "importado": importado.to_numpy()[filas, cols],
+        "calculado": calculado.to_numpy()[filas, cols],
+        "diferencia": diferencia.to_numpy()[filas, cols],
+    })
+
+    descripciones = dict(conn.execute("SELECT id, descripcion FROM descripcion_meta"))
+    regionales = dict(conn.execute("SELECT id, nombre FROM regional"))
+    resultado["descripcion"] = resultado["id_descripcion"].map(descripciones)
+    resultado["regional"] = resultado["id_regional"].map(regionales)
+
+    return resultado.sort_values(["periodo", "regional", "descripcion", "campo"])[
+        columnas
+    ].reset_index(drop=True)
+
+
+def reportar_diferencias(diferencias, maximo=10):
+    """
+    Imprime un resumen de las diferencias encontradas: la cantidad por campo
+    y por descripción (las `maximo` con más diferencias) y el detalle de las
+    primeras `maximo`. El detalle completo queda en el CSV (--csv).
+    """
+    if diferencias.empty:
+        print("[OK] Subtotales y totales coinciden con la suma de sus componentes")
+        return
+
+    print(
+        f"[WARN] {len(diferencias)} totales no coinciden con la suma de sus componentes"
+    )
+    for campo, cantidad in diferencias["campo"].value_counts().sort_index().items():
+        print(f"  - {campo}: {cantidad} diferencias")
+
+    por_descripcion = diferencias["descripcion"].value_counts()
+    print(f"[INFO] Totales con diferencias ({len(por_descripcion)}):")
+    for descripcion, cantidad in por_descripcion.head(maximo).items():
+        print(f"  - {descripcion}: {cantidad}")
+    if len(por_descripcion) > maximo:
+        print(f"  ... y {len(por_descripcion) - maximo} totales mas")
+
+    print("[INFO] Primeras diferencias:")
+    for fila in diferencias.head(maximo).itertuples():
+        print(
+            f"  - {fila.periodo} / {fila.regional} / {fila.descripcion} ({fila.campo}): "
+            f"importado {fila.importado:g}, suma de componentes {fila.calculado:g}"
+        )
+    if len(diferencias) > maximo:
+        print(f"  ... y {len(diferencias) - maximo} mas")
+
+
+def validar_consolidacion(conn, periodos=None):
+    """Valida los totales, imprime el reporte y retorna las diferencias"""
+    inicio = time.perf_counter()
+    diferencias = validar_totales(conn, periodos)
+    reportar_diferencias(diferencias)
+    print(f"[INFO] Consolidacion validada en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    return diferencias
+
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=DB_FILE, help="Base de datos SQLite a validar")
+    parser.add_argument(
+        "--periodo",
+        action="append",
+        help="Periodo YYYY_MM a validar (puede repetirse; por defecto, todos)",
+    )
+    parser.add_argument(
+        "--csv", help="Guarda el detalle de las diferencias en este archivo CSV"
+    )
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    diferencias = validar_consolidacion(conn, args.periodo)
+    conn.close()
+
+    if args.csv:
+        diferencias.to_csv(args.csv, index=False)
+        print(f"[OK] Detalle guardado en {args.csv}")
+
+    return 1 if len(diferencias) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
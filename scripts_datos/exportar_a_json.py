@@ -1,79 +1,181 @@
 """
 Script para exportar datos de SQLite a archivos JSON
 Adaptado para estructura desagregada por regional
+Todos los conjuntos se leen con una sola conexión desde la misma instantánea
+de la base y luego se serializan y escriben en paralelo. Los conjuntos cuyas
+tablas y consulta no cambiaron desde la exportación anterior se omiten.
 """
 
+import argparse
+import contextlib
+import filecmp
+import hashlib
+import itertools
 import sqlite3
 import json
 import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentacion
+from artefactos_publicacion import publicar_artefactos, reportar_publicacion
+from cache_consultas import CacheConsultas, ruta_cache
+from motor_exportacion import (
+    FILAS_POR_BLOQUE,
+    ejecutar,
+    huella,
+    iterar_filas,
+    registrar_tablas,
+)
 
 DB_FILE = "seguimiento_metas.db"
 OUTPUT_DIR = "datos_json"
 
+# Los agregados nacionales se exportan para el periodo más reciente importado
+PERIODO_VIGENTE = "(SELECT MAX(periodo) FROM agregado_fpi_descripcion)"
 
-def crear_directorio():
+# Estado de la exportación anterior (tablas leídas y sus versiones por
+# conjunto), guardado en el directorio de salida
+ESTADO_EXPORTACION = ".estado_exportacion.json"
+
+
+def crear_directorio(directorio=OUTPUT_DIR):
     """Crea el directorio de salida si no existe"""
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-    print(f"[OK] Directorio {OUTPUT_DIR} creado/verificado")
+    if not os.path.exists(directorio):
+        os.makedirs(directorio)
+    print(f"[OK] Directorio {directorio} creado/verificado")
+
+
+def leer_fragmentos_regional(cursor):
+    """
+    Lee por regional las metas FPI del periodo vigente con su estado de
+    semáforo, sus subtotales y totales y el resumen de agregado_fpi_regional.
+    Retorna un documento por regional ({codigo}.json) más el índice
+    (indice.json), y como registros la cantidad de regionales.
+    """
+    cursor.execute(f"""
+    SELECT
+        id_regional,
+        descripciones,
+        meta,
+        ejecucion,
+        porcentaje
+    FROM agregado_fpi_regional
+    WHERE periodo = {PERIODO_VIGENTE}
+    """)
 
+    resumenes = {}
+    for row in cursor.fetchall():
+        resumen = dict(row)
+        resumenes[resumen.pop("id_regional")] = resumen
 
-def exportar_regionales():
-    """Exporta listado de regionales"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    # Estado de semáforo materializado (clasificacion_semaforo); sin rango o
+    # sin meta queda en null
+    cursor.execute(f"""
+    SELECT
+        r.id as idRegional,
+        r.codigo_regional as codigo,
+        r.nombre as nombreRegional,
+        mfpi.periodo,
+        mfpi.id,
+        dm.descripcion,
+        mfpi.meta,
+        mfpi.ejecucion,
+        ROUND((mfpi.ejecucion * 100.0 / NULLIF(mfpi.meta, 0)), 2) as porcentaje,
+        es.estado as estadoSemaforo,
+        mfpi.es_subtotal as esSubtotal,
+        mfpi.es_total as esTotal,
+        mfpi.nivel_jerarquia as nivelJerarquia
+    FROM meta_formacion_profesional_integral mfpi
+    JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
+    JOIN regional r ON mfpi.id_regional = r.id
+    LEFT JOIN estado_semaforo es
+        ON es.periodo = mfpi.periodo
+        AND es.id_descripcion = mfpi.id_descripcion
+        AND es.id_regional = mfpi.id_regional
+    WHERE mfpi.periodo = {PERIODO_VIGENTE}
+    ORDER BY r.codigo_regional, mfpi.nivel_jerarquia DESC, dm.descripcion
+    """)
+
+    fragmentos = {}
+    indice = []
+    vigente = None
+    for (id_regional, codigo, nombre, periodo), filas in itertools.groupby(
+        iterar_filas(cursor),
+        key=lambda fila: (
+            fila.pop("idRegional"),
+            fila.pop("codigo"),
+            fila.pop("nombreRegional"),
+            fila.pop("periodo"),
+        ),
+    ):
+        vigente = periodo
+        metas, totales = [], []
+        for fila in filas:
+            (totales if fila["esSubtotal"] or fila["esTotal"] else metas).append(fila)
+
+        archivo = f"{codigo}.json"
+        fragmentos[archivo] = {
+            "regional": {"codigo": codigo, "nombre": nombre},
+            "periodo": periodo,
+            "resumen": resumenes.get(id_regional),
+            "totales": totales,
+            "metas": metas,
+        }
+        indice.append({
+            "codigo": codigo,
+            "nombre": nombre,
+            "archivo": archivo,
+            "metas": len(metas),
+            "totales": len(totales),
+        })
+
+    fragmentos["indice.json"] = {
+        "clave": "codigo_regional",
+        "periodo": vigente,
+        "fragmentos": indice,
+    }
+    return fragmentos, len(indice)
 
-    cursor.execute("""
+
+# Conjuntos exportados: (nombre, archivo de salida, especificación). Cada
+# especificación se ejecuta con motor_exportacion con una sola consulta.
+EXPORTACIONES = [
+    (
+        "regionales",
+        "regionales.json",
+        {
+            "consulta": """
     SELECT
         id,
         codigo_regional as codigo,
         nombre
     FROM regional
     ORDER BY codigo_regional
-    """)
-
-    regionales = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/regionales.json", "w", encoding="utf-8") as f:
-        json.dump(regionales, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportadas {len(regionales)} regionales")
-    return len(regionales)
-
-
-def exportar_descripciones_metas():
-    """Exporta descripciones de metas"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    """,
+        },
+    ),
+    (
+        "descripciones_metas",
+        "descripciones_metas.json",
+        {
+            "consulta": """
     SELECT
         id,
         descripcion
     FROM descripcion_meta
     ORDER BY descripcion
-    """)
-
-    descripciones = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/descripciones_metas.json", "w", encoding="utf-8") as f:
-        json.dump(descripciones, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportadas {len(descripciones)} descripciones de metas")
-    return len(descripciones)
-
-
-def exportar_metas_fpi():
-    """Exporta metas de formación profesional integral desagregadas por regional"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    """,
+        },
+    ),
+    # Metas FPI desagregadas por regional (periodo vigente). Conjunto grande:
+    # se entrega por flujo, sin materializar el resultado
+    (
+        "metas_fpi",
+        "metas_fpi.json",
+        {
+            "consulta": f"""
     SELECT
         mfpi.id,
         dm.descripcion,
@@ -81,65 +183,56 @@ def exportar_metas_fpi():
         mfpi.meta,
         mfpi.ejecucion,
         ROUND((mfpi.ejecucion * 100.0 / NULLIF(mfpi.meta, 0)), 2) as porcentaje,
+        es.estado as estadoSemaforo,
         mfpi.es_subtotal as esSubtotal,
         mfpi.es_total as esTotal,
         mfpi.nivel_jerarquia as nivelJerarquia
     FROM meta_formacion_profesional_integral mfpi
     JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
     JOIN regional r ON mfpi.id_regional = r.id
+    LEFT JOIN estado_semaforo es
+        ON es.periodo = mfpi.periodo
+        AND es.id_descripcion = mfpi.id_descripcion
+        AND es.id_regional = mfpi.id_regional
+    WHERE mfpi.periodo = {PERIODO_VIGENTE}
     ORDER BY r.codigo_regional, mfpi.nivel_jerarquia DESC, dm.descripcion
-    """)
-
-    metas = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/metas_fpi.json", "w", encoding="utf-8") as f:
-        json.dump(metas, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportadas {len(metas)} metas FPI por regional")
-    return len(metas)
-
-
-def exportar_metas_fpi_agregadas():
-    """Exporta metas FPI agregadas por descripción (totales nacionales)"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    """,
+            "flujo": True,
+        },
+    ),
+    # Metas FPI agregadas por descripción (totales nacionales)
+    (
+        "metas_fpi_agregadas",
+        "metas_fpi_agregadas.json",
+        {
+            "consulta": f"""
     SELECT
         dm.id,
         dm.descripcion,
-        COUNT(DISTINCT mfpi.id_regional) as regionales,
-        SUM(mfpi.meta) as metaTotal,
-        SUM(mfpi.ejecucion) as ejecucionTotal,
-        ROUND((SUM(mfpi.ejecucion) * 100.0 / NULLIF(SUM(mfpi.meta), 0)), 2) as porcentajeTotal,
-        MAX(mfpi.es_subtotal) as esSubtotal,
-        MAX(mfpi.es_total) as esTotal,
-        MAX(mfpi.nivel_jerarquia) as nivelJerarquia
-    FROM descripcion_meta dm
-    JOIN meta_formacion_profesional_integral mfpi ON dm.id = mfpi.id_descripcion
-    GROUP BY dm.id, dm.descripcion
+        a.regionales,
+        a.meta as metaTotal,
+        a.ejecucion as ejecucionTotal,
+        a.porcentaje as porcentajeTotal,
+        es.estado as estadoSemaforo,
+        a.es_subtotal as esSubtotal,
+        a.es_total as esTotal,
+        a.nivel_jerarquia as nivelJerarquia
+    FROM agregado_fpi_descripcion a
+    JOIN descripcion_meta dm ON a.id_descripcion = dm.id
+    LEFT JOIN estado_semaforo es
+        ON es.periodo = a.periodo
+        AND es.id_descripcion = a.id_descripcion
+        AND es.id_regional IS NULL
+    WHERE a.periodo = {PERIODO_VIGENTE}
     ORDER BY nivelJerarquia DESC, dm.descripcion
-    """)
-
-    metas_agregadas = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/metas_fpi_agregadas.json", "w", encoding="utf-8") as f:
-        json.dump(metas_agregadas, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportadas {len(metas_agregadas)} metas FPI agregadas")
-    return len(metas_agregadas)
-
-
-def exportar_por_nivel():
-    """Exporta formación por nivel y programa"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    """,
+        },
+    ),
+    (
+        "formacion_por_nivel",
+        "formacion_por_nivel.json",
+        {
+            "consulta": f"""
     SELECT
         id,
         nivel_formacion as nivelFormacion,
@@ -155,26 +248,16 @@ def exportar_por_nivel():
         total_meta as totalMeta,
         es_total as esTotal
     FROM formacion_por_nivel_programa
+    WHERE periodo = {PERIODO_VIGENTE}
     ORDER BY es_total, total_meta DESC
-    """)
-
-    niveles = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/formacion_por_nivel.json", "w", encoding="utf-8") as f:
-        json.dump(niveles, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportados {len(niveles)} niveles de formacion")
-    return len(niveles)
-
-
-def exportar_programas_relevantes():
-    """Exporta programas relevantes"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    """,
+        },
+    ),
+    (
+        "programas_relevantes",
+        "programas_relevantes.json",
+        {
+            "consulta": f"""
     SELECT
         id,
         descripcion,
@@ -183,26 +266,16 @@ def exportar_programas_relevantes():
         ROUND((ejecucion * 100.0 / NULLIF(meta, 0)), 2) as porcentaje,
         tipo
     FROM programa_relevante
+    WHERE periodo = {PERIODO_VIGENTE}
     ORDER BY tipo, descripcion
-    """)
-
-    programas = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/programas_relevantes.json", "w", encoding="utf-8") as f:
-        json.dump(programas, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportados {len(programas)} programas relevantes")
-    return len(programas)
-
-
-def exportar_rangos_semaforo():
-    """Exporta rangos de categorización (semáforo)"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    """,
+        },
+    ),
+    (
+        "rangos_semaforo",
+        "rangos_semaforo.json",
+        {
+            "consulta": """
     SELECT
         id,
         agrupador,
@@ -217,67 +290,37 @@ def exportar_rangos_semaforo():
         sobreejecucion_superior_a as sobreejecucionSuperiorA
     FROM rangos_categorizacion
     ORDER BY agrupador, nombre_indicador
-    """)
-
-    rangos = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/rangos_semaforo.json", "w", encoding="utf-8") as f:
-        json.dump(rangos, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportados {len(rangos)} rangos de semaforo")
-    return len(rangos)
-
-
-def exportar_metricas_adicionales():
-    """Exporta métricas adicionales agrupadas por categoría"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT DISTINCT categoria FROM metrica_adicional ORDER BY categoria"
-    )
-    categorias = [row["categoria"] for row in cursor.fetchall()]
-
-    metricas_por_categoria = {}
-
-    for categoria in categorias:
-        cursor.execute(
-            """
-        SELECT
-            id,
-            nombre_metrica as nombreMetrica,
-            meta,
-            ejecucion,
-            tipo_dato as tipoDato,
-            es_total as esTotal
-        FROM metrica_adicional
-        WHERE categoria = ?
-        ORDER BY es_total DESC, nombre_metrica
-        """,
-            (categoria,),
-        )
-
-        metricas_por_categoria[categoria] = [dict(row) for row in cursor.fetchall()]
-
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/metricas_adicionales.json", "w", encoding="utf-8") as f:
-        json.dump(metricas_por_categoria, f, ensure_ascii=False, indent=2)
-
-    total_metricas = sum(len(m) for m in metricas_por_categoria.values())
-    print(f"[OK] Exportadas {total_metricas} metricas en {len(categorias)} categorias")
-    return total_metricas
-
-
-def exportar_jerarquias():
-    """Exporta las relaciones jerárquicas"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute("""
+    """,
+        },
+    ),
+    # Métricas adicionales agrupadas por categoría
+    (
+        "metricas_adicionales",
+        "metricas_adicionales.json",
+        {
+            "consulta": f"""
+    SELECT
+        categoria,
+        id,
+        nombre_metrica as nombreMetrica,
+        meta,
+        ejecucion,
+        tipo_dato as tipoDato,
+        es_total as esTotal
+    FROM metrica_adicional
+    WHERE periodo = {PERIODO_VIGENTE}
+    ORDER BY categoria, es_total DESC, nombre_metrica
+    """,
+            "agrupar": ("categoria",),
+        },
+    ),
+    # Relaciones de los registros del periodo vigente (relacion_jerarquica
+    # enlaza registros de todos los periodos; se filtra por el del padre)
+    (
+        "jerarquias",
+        "jerarquias.json",
+        {
+            "consulta": f"""
     SELECT
         id,
         tabla_origen as tablaOrigen,
@@ -288,59 +331,69 @@ def exportar_jerarquias():
         tabla_hijo as tablaHijo,
         operacion
     FROM relacion_jerarquica
+    WHERE id_padre IN (
+        SELECT id FROM meta_formacion_profesional_integral
+        WHERE periodo = {PERIODO_VIGENTE}
+    )
     ORDER BY nombre_padre, nombre_hijo
-    """)
-
-    jerarquias = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-
-    with open(f"{OUTPUT_DIR}/jerarquias.json", "w", encoding="utf-8") as f:
-        json.dump(jerarquias, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportadas {len(jerarquias)} relaciones jerarquicas")
-    return len(jerarquias)
-
-
-def exportar_resumen_dashboard():
-    """Exporta datos para el dashboard principal"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    # KPIs principales (agregados nacionales)
-    cursor.execute("""
+    """,
+            "flujo": True,
+        },
+    ),
+    # Datos del dashboard principal; se cuentan como registros los KPIs
+    (
+        "dashboard",
+        "dashboard.json",
+        {
+            "partes": {
+                # KPIs principales (agregados nacionales). El estado sale del
+                # semáforo materializado; sin rango, de umbrales fijos (90 y 70)
+                "kpis": {
+                    "consulta": f"""
     SELECT
         dm.descripcion as titulo,
-        SUM(mfpi.meta) as meta,
-        SUM(mfpi.ejecucion) as ejecucion,
-        ROUND((SUM(mfpi.ejecucion) * 100.0 / NULLIF(SUM(mfpi.meta), 0)), 2) as porcentaje,
-        CASE
-            WHEN ROUND((SUM(mfpi.ejecucion) * 100.0 / NULLIF(SUM(mfpi.meta), 0)), 2) >= 90 THEN 'success'
-            WHEN ROUND((SUM(mfpi.ejecucion) * 100.0 / NULLIF(SUM(mfpi.meta), 0)), 2) >= 70 THEN 'warning'
-            ELSE 'danger'
-        END as estado
-    FROM meta_formacion_profesional_integral mfpi
-    JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
-    WHERE dm.descripcion IN (
+        a.meta,
+        a.ejecucion,
+        a.porcentaje,
+        CASE es.estado
+            WHEN 'bajo' THEN 'danger'
+            WHEN 'vulnerable' THEN 'warning'
+            WHEN 'buena' THEN 'success'
+            WHEN 'sobreejecucion' THEN 'success'
+            ELSE CASE
+                WHEN a.porcentaje >= 90 THEN 'success'
+                WHEN a.porcentaje >= 70 THEN 'warning'
+                ELSE 'danger'
+            END
+        END as estado,
+        es.estado as estadoSemaforo
+    FROM agregado_fpi_descripcion a
+    JOIN descripcion_meta dm ON a.id_descripcion = dm.id
+    LEFT JOIN estado_semaforo es
+        ON es.periodo = a.periodo
+        AND es.id_descripcion = a.id_descripcion
+        AND es.id_regional IS NULL
+    WHERE a.periodo = {PERIODO_VIGENTE}
+    AND dm.descripcion IN (
         'TOTAL FORMACION PROFESIONAL INTEGRAL (O=N+F)',
         'TOTAL FORMACION TITULADA (F = D+E)',
         'TOTAL FORMACION COMPLEMENTARIA (N = G+H+K+L+M)',
         'EDUCACION SUPERIOR (=E)'
     )
-    GROUP BY dm.descripcion
-    """)
-
-    kpis = [dict(row) for row in cursor.fetchall()]
-
-    # Por modalidad
-    cursor.execute("""
+    ORDER BY dm.descripcion
+    """,
+                },
+                # Por modalidad (periodo vigente)
+                "modalidades": {
+                    "consulta": f"""
     SELECT
         'Regular' as modalidad,
         SUM(regular_meta) as meta,
         SUM(regular_ejecucion) as ejecucion,
         ROUND((SUM(regular_ejecucion) * 100.0 / NULLIF(SUM(regular_meta), 0)), 2) as porcentaje
     FROM formacion_por_nivel_programa
-    WHERE regular_meta IS NOT NULL AND es_total = 0
+    WHERE periodo = {PERIODO_VIGENTE}
+    AND regular_meta IS NOT NULL AND es_total = 0
     UNION ALL
     SELECT
         'CampeSENA',
@@ -348,7 +401,8 @@ def exportar_resumen_dashboard():
         SUM(campesena_ejecucion),
         ROUND((SUM(campesena_ejecucion) * 100.0 / NULLIF(SUM(campesena_meta), 0)), 2)
     FROM formacion_por_nivel_programa
-    WHERE campesena_meta IS NOT NULL AND es_total = 0
+    WHERE periodo = {PERIODO_VIGENTE}
+    AND campesena_meta IS NOT NULL AND es_total = 0
     UNION ALL
     SELECT
         'Full Popular',
@@ -356,65 +410,378 @@ def exportar_resumen_dashboard():
         SUM(full_popular_ejecucion),
         ROUND((SUM(full_popular_ejecucion) * 100.0 / NULLIF(SUM(full_popular_meta), 0)), 2)
     FROM formacion_por_nivel_programa
-    WHERE full_popular_meta IS NOT NULL AND es_total = 0
-    """)
-
-    modalidades = [dict(row) for row in cursor.fetchall()]
-
-    # Top 5 por cumplimiento (agregado)
-    cursor.execute("""
+    WHERE periodo = {PERIODO_VIGENTE}
+    AND full_popular_meta IS NOT NULL AND es_total = 0
+    """,
+                },
+                # Top 5 por cumplimiento (agregado)
+                "topCumplimiento": {
+                    "consulta": f"""
     SELECT
         dm.descripcion,
-        SUM(mfpi.meta) as meta,
-        SUM(mfpi.ejecucion) as ejecucion,
-        ROUND(MIN(100.59, (SUM(mfpi.ejecucion) * 100.0 / NULLIF(SUM(mfpi.meta), 0))), 2) as porcentaje
-    FROM meta_formacion_profesional_integral mfpi
-    JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
-    WHERE mfpi.es_total = 0 AND mfpi.es_subtotal = 0
-    GROUP BY dm.descripcion
-    HAVING SUM(mfpi.meta) > 1000
+        a.meta,
+        a.ejecucion,
+        ROUND(MIN(100.59, (a.ejecucion * 100.0 / NULLIF(a.meta, 0))), 2) as porcentaje
+    FROM agregado_fpi_descripcion a
+    JOIN descripcion_meta dm ON a.id_descripcion = dm.id
+    WHERE a.periodo = {PERIODO_VIGENTE}
+    AND a.es_total = 0 AND a.es_subtotal = 0 AND a.meta > 1000
     ORDER BY porcentaje DESC
     LIMIT 5
-    """)
-
-    top_cumplimiento = [dict(row) for row in cursor.fetchall()]
-
-    # Top 5 con mayor brecha (agregado)
-    cursor.execute("""
+    """,
+                },
+                # Top 5 con mayor brecha (agregado)
+                "mayorBrecha": {
+                    "consulta": f"""
     SELECT
         dm.descripcion,
-        SUM(mfpi.meta) as meta,
-        SUM(mfpi.ejecucion) as ejecucion,
-        (SUM(mfpi.meta) - SUM(mfpi.ejecucion)) as brecha,
-        ROUND((SUM(mfpi.ejecucion) * 100.0 / NULLIF(SUM(mfpi.meta), 0)), 2) as porcentaje
-    FROM meta_formacion_profesional_integral mfpi
-    JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
-    WHERE mfpi.es_total = 0 AND mfpi.es_subtotal = 0
-    GROUP BY dm.descripcion
+        a.meta,
+        a.ejecucion,
+        (a.meta - a.ejecucion) as brecha,
+        a.porcentaje
+    FROM agregado_fpi_descripcion a
+    JOIN descripcion_meta dm ON a.id_descripcion = dm.id
+    WHERE a.periodo = {PERIODO_VIGENTE}
+    AND a.es_total = 0 AND a.es_subtotal = 0
     ORDER BY brecha DESC
     LIMIT 5
-    """)
-
-    mayor_brecha = [dict(row) for row in cursor.fetchall()]
+    """,
+                },
+            },
+            "registros": "kpis",
+        },
+    ),
+]
+
+# Conjuntos fragmentados: (nombre, subdirectorio de salida, especificación). La
+# especificación retorna {archivo: documento} y cada documento se escribe en el
+# subdirectorio
+FRAGMENTOS = [
+    ("fragmentos_regional", "regional", leer_fragmentos_regional),
+]
+
+
+def conectar_lectura(db_file=DB_FILE):
+    """Abre la base en modo solo lectura"""
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def leer_instantanea(
+    db_file=DB_FILE,
+    exportaciones=EXPORTACIONES + FRAGMENTOS,
+    escribir_flujo=None,
+    seleccionar=None,
+    cache=None,
+):
+    """
+    Lee todos los conjuntos con una sola conexión y dentro de una única
+    transacción de lectura, de modo que todos vean la misma versión de la
+    base aunque una importación la publique mientras tanto.
+    Cada especificación se ejecuta con motor_exportacion.ejecutar. Las que
+    retornan un generador de filas (registros None, "flujo") se escriben por
+    flujo dentro de la transacción con escribir_flujo(archivo, filas), que
+    retorna la cantidad de filas; en ese caso datos queda en None. Sin
+    escribir_flujo esas filas se materializan en una lista.
+    Si se indica, seleccionar(conn, exportaciones) se llama ya dentro de la
+    transacción y retorna los conjuntos que se leen.
+    Con cache (CacheConsultas) las consultas ya ejecutadas sobre la misma
+    versión de los datos no se vuelven a ejecutar.
+    Retorna una lista de (nombre, archivo, datos, registros, segundos de
+    lectura, tablas leídas).
+    """
+    conn = conectar_lectura(db_file)
+    leidos = []
+    try:
+        conn.execute("BEGIN")
+        if seleccionar:
+            exportaciones = seleccionar(conn, exportaciones)
+        for nombre, archivo, especificacion in exportaciones:
+            with instrumentacion.etapa(f"lectura:{nombre}") as medida:
+                with registrar_tablas(conn) as tablas:
+                    datos, registros = ejecutar(conn.cursor(), especificacion, cache=cache)
+                if registros is None and escribir_flujo:
+                    datos, registros = None, escribir_flujo(archivo, datos)
+                elif registros is None:
+                    datos = list(datos)
+                    registros = len(datos)
+                medida["filas"] = registros
+            leidos.append((nombre, archivo, datos, registros, medida["segundos"], tablas))
+    finally:
+        conn.rollback()
+        conn.close()
+    return leidos
+
+
+def versiones_datos(conn):
+    """Versión actual de cada tabla ({} si la base no tiene version_datos)"""
+    try:
+        return dict(conn.execute("SELECT tabla, version FROM version_datos"))
+    except sqlite3.OperationalError:
+        return {}
+
+
+def huella_definicion(especificacion, opciones):
+    """Huella de la especificación y de las opciones que cambian su salida"""
+    contenido = huella(especificacion) + repr(opciones)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+
+def cargar_estado(directorio=OUTPUT_DIR):
+    """Estado de la exportación anterior ({} si no existe o no se puede leer)"""
+    try:
+        with open(os.path.join(directorio, ESTADO_EXPORTACION), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_estado(estado, directorio=OUTPUT_DIR):
+    """Guarda el estado de la exportación de forma atómica"""
+    ruta = os.path.join(directorio, ESTADO_EXPORTACION)
+    with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    os.replace(f"{ruta}.tmp", ruta)
+
+
+def motivo_reconstruccion(anterior, definicion, versiones, salida):
+    """
+    Motivo por el que hay que volver a exportar un conjunto, o None si su
+    consulta y las versiones de las tablas que leyó no cambiaron
+    """
+    if not anterior:
+        return "sin exportación previa"
+    if not os.path.exists(salida):
+        return "archivo de salida faltante"
+    if anterior["definicion"] != definicion:
+        return "consulta u opciones modificadas"
+    if not versiones:
+        return "base sin versiones de datos"
+    modificadas = sorted(
+        tabla
+        for tabla, version in anterior["versiones"].items()
+        if versiones.get(tabla) != version
+    )
+    if modificadas:
+        return f"tablas modificadas: {', '.join(modificadas)}"
+    return None
+
+
+def escribir_json(ruta, datos):
+    """Serializa y escribe un archivo JSON; retorna los segundos empleados"""
+    inicio = time.perf_counter()
+    texto = json.dumps(datos, ensure_ascii=False, indent=2)
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(texto)
+    return time.perf_counter() - inicio
+
+
+def escribir_json_flujo(ruta, filas, ruta_ndjson=None, tamano=FILAS_POR_BLOQUE):
+    """
+    Escribe las filas como arreglo JSON a medida que llegan, con el mismo
+    formato que json.dump(..., indent=2), y si se indica ruta_ndjson también
+    como NDJSON (un objeto por línea) para que el frontend pueda mostrarlas
+    de forma progresiva. Las filas se serializan por bloques de `tamano`, de
+    modo que la memoria no depende de la cantidad de filas.
+    Retorna la cantidad de filas escritas.
+    """
+    filas = iter(filas)
+    registros = 0
+    with contextlib.ExitStack() as archivos:
+        f = archivos.enter_context(open(ruta, "w", encoding="utf-8"))
+        ndjson = ruta_ndjson and archivos.enter_context(
+            open(ruta_ndjson, "w", encoding="utf-8")
+        )
+        f.write("[")
+        while True:
+            bloque = list(itertools.islice(filas, tamano))
+            if not bloque:
+                break
+            # Se quitan el "[\n" inicial y el "\n]" final del arreglo del bloque
+            f.write(",\n" if registros else "\n")
+            f.write(json.dumps(bloque, ensure_ascii=False, indent=2)[2:-2])
+            if ndjson:
+                ndjson.writelines(
+                    json.dumps(fila, ensure_ascii=False) + "\n" for fila in bloque
+                )
+            registros += len(bloque)
+        f.write("\n]" if registros else "]")
+    return registros
+
+
+def exportar(
+    db_file=DB_FILE,
+    directorio=OUTPUT_DIR,
+    procesos=None,
+    ndjson=False,
+    completo=False,
+    cache=None,
+):
+    """
+    Lee todos los conjuntos de una misma instantánea y los serializa y
+    escribe en paralelo en un pool de procesos (por defecto uno por núcleo;
+    con procesos <= 1 se escriben en el proceso actual, uno tras otro).
+    Los conjuntos grandes se escriben por flujo durante la lectura, y con
+    ndjson=True también como <conjunto>.ndjson.
+    Los conjuntos de FRAGMENTOS se escriben como un archivo por documento en
+    su subdirectorio, repartidos en el mismo pool.
+    Salvo con completo=True, solo se leen y escriben los conjuntos cuya
+    consulta u opciones cambiaron o que leen alguna tabla con una versión
+    distinta de la registrada en ESTADO_EXPORTACION. El cache se pasa a
+    leer_instantanea.
+    Retorna (resultados, motivos): resultados es una lista de (nombre, archivo,
+    registros, lectura, escritura) con los tiempos en segundos de los
+    conjuntos exportados (escritura es None en los conjuntos por flujo, cuya
+    escritura queda incluida en la lectura); motivos indica por qué se exportó
+    cada conjunto, o None si se omitió.
+    """
+    estado = {} if completo else cargar_estado(directorio)
+    motivos = {}
+    definiciones = {}
+    versiones = {}
+
+    def seleccionar(conn, exportaciones):
+        versiones.update(versiones_datos(conn))
+        seleccionadas = []
+        for nombre, archivo, especificacion in exportaciones:
+            opciones = (ndjson,)
+            definiciones[nombre] = huella_definicion(especificacion, opciones)
+            motivos[nombre] = (
+                "exportación completa"
+                if completo
+                else motivo_reconstruccion(
+                    estado.get(nombre),
+                    definiciones[nombre],
+                    versiones,
+                    os.path.join(directorio, archivo),
+                )
+            )
+            if motivos[nombre]:
+                seleccionadas.append((nombre, archivo, especificacion))
+        return seleccionadas
+
+    def escribir_flujo(archivo, filas):
+        ruta = os.path.join(directorio, archivo)
+        ruta_ndjson = os.path.splitext(ruta)[0] + ".ndjson" if ndjson else None
+        return escribir_json_flujo(ruta, filas, ruta_ndjson)
+
+    leidos = leer_instantanea(
+        db_file, escribir_flujo=escribir_flujo, seleccionar=seleccionar, cache=cache
+    )
+    fragmentados = {nombre for nombre, *_ in FRAGMENTOS}
+    pendientes = []
+    for nombre, archivo, datos, *_ in leidos:
+        if datos is None:
+            continue
+        if nombre not in fragmentados:
+            pendientes.append((nombre, os.path.join(directorio, archivo), datos))
+            continue
+        # Se regenera el subdirectorio completo para no dejar fragmentos obsoletos
+        subdirectorio = os.path.join(directorio, archivo)
+        shutil.rmtree(subdirectorio, ignore_errors=True)
+        os.makedirs(subdirectorio)
+        pendientes.extend(
+            (nombre, os.path.join(subdirectorio, fragmento), documento)
+            for fragmento, documento in datos.items()
+        )
+    rutas = [ruta for _, ruta, _ in pendientes]
+    datos = [datos for _, _, datos in pendientes]
 
-    conn.close()
+    if procesos is None:
+        procesos = min(os.cpu_count() or 1, len(pendientes))
 
-    dashboard = {
-        "kpis": kpis,
-        "modalidades": modalidades,
-        "topCumplimiento": top_cumplimiento,
-        "mayorBrecha": mayor_brecha,
+    # Los conjuntos por flujo (datos None) ya se escribieron durante la lectura
+    registros_por_conjunto = {
+        nombre: registros for nombre, _, datos, registros, *_ in leidos if datos is not None
     }
-
-    with open(f"{OUTPUT_DIR}/dashboard.json", "w", encoding="utf-8") as f:
-        json.dump(dashboard, f, ensure_ascii=False, indent=2)
-
-    print(f"[OK] Exportados datos de dashboard")
-    return len(kpis)
-
-
-def main():
+    with instrumentacion.etapa("escritura", sum(registros_por_conjunto.values())):
+        # Con un solo proceso el pool solo agregaría el costo de enviar los datos
+        if procesos <= 1:
+            escrituras = list(map(escribir_json, rutas, datos))
+        else:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                escrituras = list(pool.map(escribir_json, rutas, datos))
+
+        # Los fragmentos de un mismo conjunto suman sus tiempos de escritura
+        tiempos = {}
+        for (nombre, *_), segundos in zip(pendientes, escrituras):
+            tiempos[nombre] = tiempos.get(nombre, 0) + segundos
+        for nombre, segundos in tiempos.items():
+            instrumentacion.registrar(
+                f"escritura:{nombre}", registros_por_conjunto[nombre], segundos
+            )
+
+    # El estado se actualiza solo después de escribir los archivos
+    for nombre, *_, tablas in leidos:
+        estado[nombre] = {
+            "definicion": definiciones[nombre],
+            "versiones": {tabla: versiones.get(tabla) for tabla in sorted(tablas)},
+        }
+    guardar_estado(estado, directorio)
+
+    resultados = [
+        (nombre, archivo, registros, lectura, tiempos.get(nombre))
+        for nombre, archivo, _, registros, lectura, _ in leidos
+    ]
+    return resultados, motivos
+
+
+def reportar_exportacion(resultados, motivos=None):
+    """
+    Imprime registros y tiempos de lectura y escritura por conjunto exportado
+    y, si se indican los motivos, por qué se exportó u omitió cada conjunto
+    """
+    if resultados:
+        print(f"{'Conjunto':<24}{'Registros':>10}{'Lectura':>12}{'Escritura':>12}")
+    for nombre, _, registros, lectura, escritura in resultados:
+        escritura = "(flujo)" if escritura is None else f"{escritura * 1000:.1f} ms"
+        print(f"{nombre:<24}{registros:>10}{lectura * 1000:>9.1f} ms{escritura:>12}")
+
+    if motivos:
+        if resultados:
+            print()
+        for nombre, motivo in motivos.items():
+            if motivo:
+                print(f"[INFO] {nombre}: reconstruido ({motivo})")
+        omitidos = [nombre for nombre, motivo in motivos.items() if not motivo]
+        if omitidos:
+            print(f"[OK] Sin cambios, se conservan: {', '.join(omitidos)}")
+
+
+def main(argv=None):
     """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=None,
+        help="Procesos para serializar y escribir (por defecto, uno por núcleo; "
+        "1: secuencial)",
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Escribe también los conjuntos grandes como NDJSON (un objeto por línea)",
+    )
+    parser.add_argument(
+        "--completo",
+        action="store_true",
+        help="Exporta todos los conjuntos aunque sus datos no hayan cambiado",
+    )
+    parser.add_argument(
+        "--sin-publicar",
+        action="store_true",
+        help="No genera los archivos con hash, sus variantes comprimidas ni manifest.json",
+    )
+    parser.add_argument(
+        "--sin-cache",
+        action="store_true",
+        help="Ejecuta todas las consultas sin usar ni actualizar el cache de consultas",
+    )
+    instrumentacion.agregar_argumentos(parser)
+    args = parser.parse_args(argv)
+
     print("=" * 80)
     print("EXPORTACION DE DATOS A JSON PARA ANGULAR")
     print("=" * 80)
@@ -423,27 +790,44 @@ def main():
     crear_directorio()
     print()
 
-    total_registros = 0
-    total_registros += exportar_regionales()
-    total_registros += exportar_descripciones_metas()
-    total_registros += exportar_metas_fpi()
-    total_registros += exportar_metas_fpi_agregadas()
-    total_registros += exportar_por_nivel()
-    total_registros += exportar_programas_relevantes()
-    total_registros += exportar_rangos_semaforo()
-    total_registros += exportar_metricas_adicionales()
-    total_registros += exportar_jerarquias()
-    total_registros += exportar_resumen_dashboard()
-
-    # Copiar referencias_totales.json
-    import shutil
-
-    shutil.copy("referencias_totales.json", f"{OUTPUT_DIR}/referencias_totales.json")
-    print("[OK] Copiado referencias_totales.json")
+    inicio = time.perf_counter()
+    instrumentos = instrumentacion.iniciar("exportar_a_json", args.perfilar)
+    cache = None if args.sin_cache else CacheConsultas.cargar(ruta_cache(DB_FILE))
+    resultados, motivos = exportar(
+        DB_FILE,
+        OUTPUT_DIR,
+        args.procesos,
+        args.ndjson,
+        args.completo,
+        cache,
+    )
+    reportar_exportacion(resultados, motivos)
+    if cache is not None:
+        cache.guardar(ruta_cache(DB_FILE))
+        cache.reportar()
+    total_registros = sum(registros for _, _, registros, *_ in resultados)
+
+    # Copiar referencias_totales.json (solo si cambió)
+    destino_referencias = f"{OUTPUT_DIR}/referencias_totales.json"
+    if not args.completo and os.path.exists(destino_referencias) and filecmp.cmp(
+        "referencias_totales.json", destino_referencias, shallow=False
+    ):
+        print("\n[OK] referencias_totales.json sin cambios")
+    else:
+        shutil.copy("referencias_totales.json", destino_referencias)
+        print("\n[OK] Copiado referencias_totales.json")
+
+    if not args.sin_publicar:
+        destino = os.path.join(OUTPUT_DIR, "publicado")
+        with instrumentacion.etapa("publicacion"):
+            publicacion = publicar_artefactos(OUTPUT_DIR, destino)
+        reportar_publicacion(*publicacion, destino)
+
+    instrumentacion.finalizar(instrumentos, args.reporte)
 
     print()
     print("=" * 80)
-    print(f"EXPORTACION COMPLETADA")
+    print(f"EXPORTACION COMPLETADA en {time.perf_counter() - inicio:.3f}s")
     print(f"Total de registros exportados: {total_registros}")
     print(f"Archivos generados en: {OUTPUT_DIR}/")
     print("=" * 80)
@@ -0,0 +1,310 @@
+"""
+Generador de libros ODS sintéticos con el formato de seguimiento_metas_YYYY_MM.ods,
+para medir el pipeline con más regionales, metas, categorías y periodos que
+los datos reales. Cada libro tiene las cinco hojas que lee el importador con
+su misma disposición: formacio_regional (un bloque Cupos / Ejecución /
+% Ejecución por meta, una fila por regional y la fila TOTAL REGIONALES),
+semaforo (rangos de cada indicador para el mes del libro),
+nacional_seguimiento_otras_meta (bloques por categoría, cada uno con su fila
+META / EJECUCIÓN) y las hojas nacionales por nivel y de programas relevantes.
+
+Las metas incluyen las jerarquías de RELACIONES_FPI, con subtotales y totales
+iguales a la suma de sus componentes, más metas de detalle sintéticas. El
+contenido se escribe por flujo, sin construir el documento en memoria, y es
+el mismo para una misma semilla.
+"""
+
+import argparse
+import os
+import re
+import time
+import zipfile
+from graphlib import TopologicalSorter
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+from clasificacion_semaforo import MESES
+from importar_a_sqlite import RELACIONES_FPI
+
+# Volumen de los datos reales (un libro mensual)
+REGIONALES = 33
+METAS = 64
+CATEGORIAS = 8
+METRICAS_POR_CATEGORIA = 10
+PERIODOS = 1
+ULTIMO_PERIODO = "2025_09"
+SEMILLA = 0
+
+# Rangos de semáforo de los indicadores (los de la mayoría de la hoja real)
+RANGOS = (0, 0.8299, 0.83, 0.8999, 0.9, 1.0059, 1.0059)
+
+NIVELES_FORMACION = ("AUXILIAR", "OPERARIO", "TÉCNICO", "TECNÓLOGO", "COMPLEMENTARIA")
+
+PROGRAMAS_RELEVANTES = (
+    ("Total Formación Profesional CampeSENA", "Programa relevante"),
+    ("Total Formación Profesional Full Popular", "Programa relevante"),
+    ("Total Formación Profesional Virtual", "Programa relevante"),
+    ("Tecnólogos Primer Curso", "Primer curso"),
+)
+
+MIMETYPE = "application/vnd.oasis.opendocument.spreadsheet"
+
+MANIFIESTO = f"""<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">
+ <manifest:file-entry manifest:full-path="/" manifest:media-type="{MIMETYPE}"/>
+ <manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>
+</manifest:manifest>
+"""
+
+INICIO_CONTENIDO = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content
+ xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+ xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+ xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+ office:version="1.2">
+<office:body><office:spreadsheet>
+"""
+
+FIN_CONTENIDO = "</office:spreadsheet></office:body></office:document-content>\n"
+
+ESPACIOS_REPETIDOS = re.compile(r"  +")
+
+
+def periodos_hasta(ultimo, cantidad):
+    """Los `cantidad` periodos YYYY_MM consecutivos que terminan en `ultimo`"""
+    anio, mes = (int(parte) for parte in ultimo.split("_"))
+    indice = anio * 12 + mes - 1
+    return [
+        f"{k // 12}_{k % 12 + 1:02d}" for k in range(indice - cantidad + 1, indice + 1)
+    ]
+
+
+def metas_con_jerarquia(cantidad):
+    """
+    Nombres de las metas, con cada componente antes de su total, y las
+    relaciones padre -> hijos. Se incluyen siempre las de RELACIONES_FPI; el
+    resto hasta `cantidad` son metas de detalle sintéticas.
+    """
+    relaciones = {padre: list(hijos) for padre, hijos in RELACIONES_FPI}
+    nombres = list(TopologicalSorter(relaciones).static_order())
+    nombres += [
+        f"Meta Sintética {numero:04d}" for numero in range(1, cantidad - len(nombres) + 1)
+    ]
+    return nombres, relaciones
+
+
+def valores_metas(nombres, relaciones, regionales, rng):
+    """
+    Matrices (regional x meta) de cupos y ejecución. Las metas de detalle son
+    aleatorias; las que tienen componentes suman las de sus hijos.
+    """
+    forma = (regionales, len(nombres))
+    cupos = rng.integers(0, 50000, size=forma)
+    # Cumplimiento alrededor del 85 %, para repartir los estados de semáforo
+    ejecucion = np.rint(cupos * rng.normal(0.85, 0.15, size=forma).clip(0)).astype(np.int64)
+
+    columna = {nombre: indice for indice, nombre in enumerate(nombres)}
+    for nombre in nombres:
+        hijos = [columna[hijo] for hijo in relaciones.get(nombre, ())]
+        if hijos:
+            cupos[:, columna[nombre]] = cupos[:, hijos].sum(axis=1)
+            ejecucion[:, columna[nombre]] = ejecucion[:, hijos].sum(axis=1)
+    return cupos, ejecucion
+
+
+def porcentaje(meta, ejecucion):
+    """% Ejecución como en la hoja real (N/A sin meta)"""
+    return round(ejecucion / meta, 4) if meta else "N/A"
+
+
+def hoja_formacion_regional(nombres, cupos, ejecucion):
+    """Filas de formacio_regional: dos filas de encabezado, regionales y total"""
+    yield ["CÓDIGO REGIONAL", "NOMBRE REGIONAL"] + [
+        valor for nombre in nombres for valor in (nombre, None, None)
+    ]
+    yield [None, None] + ["Cupos", "Ejecución", "% Ejecución"] * len(nombres)
+
+    for indice in range(cupos.shape[0]):
+        fila = [indice + 1, f"REGIONAL SINTÉTICA {indice + 1:04d}"]
+        for meta, ejecutado in zip(cupos[indice].tolist(), ejecucion[indice].tolist()):
+            fila += [meta, ejecutado, porcentaje(meta, ejecutado)]
+        yield fila
+
+    fila = ["TOTAL REGIONALES", None]
+    for meta, ejecutado in zip(cupos.sum(axis=0).tolist(), ejecucion.sum(axis=0).tolist()):
+        fila += [meta, ejecutado, porcentaje(meta, ejecutado)]
+    yield fila
+
+
+def hoja_semaforo(nombres, mes):
+    """Filas de semaforo: un rango por indicador para el mes del libro"""
+    yield [
+        "agrupador",
+        "nombre_de_indicador",
+        "mes",
+        "min_baja",
+        "max_baja",
+        "min_vulnerable",
+        "max_vulnerable",
+        "min_buena",
+        "max_buena",
+        "sobreejecucion_superior_a",
+    ]
+    for nombre in nombres:
+        yield ["1. Formación Profesional Integral", nombre, mes, *RANGOS]
+
+
+def hoja_formacion_por_nivel(rng):
+    """Filas de profesional_integral_x_programa, con su fila de total"""
+    yield [
+        "nivel_formacion",
+        "regular_meta",
+        "regular_ejecucion",
+        "campesena_meta",
+        "campesena_ejecucion",
+        "full_popular_meta",
+        "full_popular_ejecucion",
+        "total_meta_formacion_profesional",
+    ]
+    valores = rng.integers(1000, 500000, size=(len(NIVELES_FORMACION), 6))
+    for nivel, (rm, re_, cm, ce, fm, fe) in zip(NIVELES_FORMACION, valores.tolist()):
+        yield [nivel, rm, re_, cm, ce, fm, fe, rm + cm + fm]
+    rm, re_, cm, ce, fm, fe = valores.sum(axis=0).tolist()
+    yield ["TOTAL FORMACIÓN PROFESIONAL INTEGRAL", rm, re_, cm, ce, fm, fe, rm + cm + fm]
+
+
+def hoja_programas_relevantes(rng):
+    """Filas de nacional_seguimiento_relevantes"""
+    yield ["Metas Programas Relevantes", "meta", "ejecucion", "tipo"]
+    for descripcion, tipo in PROGRAMAS_RELEVANTES:
+        meta = int(rng.integers(10000, 4000000))
+        yield [descripcion, meta, int(meta * rng.uniform(0.6, 1.1)), tipo]
+
+
+def hoja_otras_metas(categorias, metricas, rng):
+    """
+    Filas de nacional_seguimiento_otras_meta: por categoría, una fila
+    categoría / META / EJECUCIÓN seguida de sus métricas y su total
+    """
+    for categoria in range(1, categorias + 1):
+        nombre_categoria = f"CATEGORÍA SINTÉTICA {categoria:03d}"
+        yield [nombre_categoria, "META", "EJECUCIÓN"]
+        metas = rng.integers(100, 400000, size=metricas)
+        ejecuciones = np.rint(metas * rng.uniform(0.5, 1.1, size=metricas)).astype(np.int64)
+        for numero, (meta, ejecutado) in enumerate(zip(metas.tolist(), ejecuciones.tolist()), 1):
+            yield [f"Métrica {categoria:03d}-{numero:03d}", meta, ejecutado]
+        yield [f"TOTAL {nombre_categoria}", int(metas.sum()), int(ejecuciones.sum())]
+
+
+def celda(valor):
+    """XML de una celda: vacía, numérica o de texto"""
+    if valor is None:
+        return "<table:table-cell/>"
+    if isinstance(valor, (int, float)):
+        return (
+            f'<table:table-cell office:value-type="float" office:value="{valor}">'
+            f"<text:p>{valor}</text:p></table:table-cell>"
+        )
+    # Los espacios repetidos se codifican con text:s, como en los libros reales
+    texto = ESPACIOS_REPETIDOS.sub(
+        lambda espacios: f' <text:s text:c="{len(espacios.group()) - 1}"/>', escape(valor)
+    )
+    return f'<table:table-cell office:value-type="string"><text:p>{texto}</text:p></table:table-cell>'
+
+
+def escribir_ods(ruta, hojas):
+    """
+    Escribe un libro ODS mínimo (mimetype, manifiesto y content.xml) con las
+    hojas indicadas ({nombre: iterable de filas}), fila por fila
+    """
+    with zipfile.ZipFile(ruta, "w") as libro:
+        # mimetype va primero y sin comprimir
+        libro.writestr("mimetype", MIMETYPE, compress_type=zipfile.ZIP_STORED)
+        libro.writestr("META-INF/manifest.xml", MANIFIESTO, compress_type=zipfile.ZIP_DEFLATED)
+        with libro.open("content.xml", "w") as contenido:
+            contenido.write(INICIO_CONTENIDO.encode("utf-8"))
+            for nombre, filas in hojas.items():
+                contenido.write(f"<table:table table:name={quoteattr(nombre)}>".encode("utf-8"))
+                for fila in filas:
+                    xml = "".join(celda(valor) for valor in fila)
+                    contenido.write(f"<table:table-row>{xml}</table:table-row>".encode("utf-8"))
+                contenido.write(b"</table:table>")
+            contenido.write(FIN_CONTENIDO.encode("utf-8"))
+
+
+def generar_libros(
+    directorio,
+    regionales=REGIONALES,
+    metas=METAS,
+    categorias=CATEGORIAS,
+    metricas=METRICAS_POR_CATEGORIA,
+    periodos=PERIODOS,
+    ultimo_periodo=ULTIMO_PERIODO,
+    semilla=SEMILLA,
+):
+    """
+    Genera un libro seguimiento_metas_YYYY_MM.ods por periodo en `directorio`.
+    Retorna la lista de rutas generadas, en orden de periodo.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    nombres, relaciones = metas_con_jerarquia(metas)
+
+    rutas = []
+    for periodo in periodos_hasta(ultimo_periodo, periodos):
+        cupos, ejecucion = valores_metas(nombres, relaciones, regionales, rng)
+        mes = MESES[int(periodo.split("_")[1]) - 1]
+        ruta = os.path.join(directorio, f"seguimiento_metas_{periodo}.ods")
+        escribir_ods(
+            ruta,
+            {
+                "formacio_regional": hoja_formacion_regional(nombres, cupos, ejecucion),
+                "semaforo": hoja_semaforo(nombres, mes),
+                "profesional_integral_x_programa": hoja_formacion_por_nivel(rng),
+                "nacional_seguimiento_relevantes": hoja_programas_relevantes(rng),
+                "nacional_seguimiento_otras_meta": hoja_otras_metas(categorias, metricas, rng),
+            },
+        )
+        rutas.append(ruta)
+    return rutas
+
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directorio", help="Directorio donde se escriben los libros")
+    parser.add_argument("--regionales", type=int, default=REGIONALES)
+    parser.add_argument(
+        "--metas",
+        type=int,
+        default=METAS,
+        help="Metas por regional (al menos las de RELACIONES_FPI)",
+    )
+    parser.add_argument("--categorias", type=int, default=CATEGORIAS)
+    parser.add_argument("--metricas", type=int, default=METRICAS_POR_CATEGORIA)
+    parser.add_argument("--periodos", type=int, default=PERIODOS)
+    parser.add_argument(
+        "--hasta", default=ULTIMO_PERIODO, help="Último periodo YYYY_MM generado"
+    )
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    rutas = generar_libros(
+        args.directorio,
+        args.regionales,
+        args.metas,
+        args.categorias,
+        args.metricas,
+        args.periodos,
+        args.hasta,
+        args.semilla,
+    )
+    for ruta in rutas:
+        print(f"[OK] {ruta} ({os.path.getsize(ruta) / 1024:.0f} KB)")
+    print(f"[INFO] {len(rutas)} libros generados en {time.perf_counter() - inicio:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
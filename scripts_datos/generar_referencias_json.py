@@ -3,77 +3,48 @@ Script para generar archivo JSON con referencias de totales y agregaciones
 Adaptado para la estructura desagregada por regional
 """
 
+import argparse
 import sqlite3
 import json
 
+import instrumentacion
+from cache_consultas import CacheConsultas, ruta_cache
+from motor_exportacion import ejecutar
+
 DB_FILE = "seguimiento_metas.db"
 JSON_OUTPUT = "referencias_totales.json"
 
+# Periodo vigente: el último con agregados materializados (como en exportar_a_json)
+PERIODO_VIGENTE = "(SELECT MAX(periodo) FROM agregado_fpi_descripcion)"
 
-def extraer_referencias():
-    """Extrae todas las referencias de totales y agregaciones"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    referencias = {
-        "version": "1.0",
-        "periodo": "2025_09",
-        "descripcion": "Referencias de totales y agregaciones para seguimiento de metas SENA",
-        "regionales": [],
-        "jerarquias": {},
-        "totales": {},
-        "calculos": {},
-    }
-
-    # 0. Extraer listado de regionales
-    cursor.execute("""
+# Especificaciones de las consultas de referencias (ver motor_exportacion)
+REGIONALES = {
+    "consulta": """
     SELECT id, codigo_regional, nombre
     FROM regional
     ORDER BY codigo_regional
-    """)
-
-    regionales = []
-    for row in cursor.fetchall():
-        regionales.append(
-            {"id": row["id"], "codigo": row["codigo_regional"], "nombre": row["nombre"]}
-        )
-
-    referencias["regionales"] = regionales
-
-    # 1. Extraer descripciones de metas
-    cursor.execute("""
-    SELECT id, descripcion
-    FROM descripcion_meta
-    ORDER BY descripcion
-    """)
-
-    descripciones_metas = {}
-    for row in cursor.fetchall():
-        descripciones_metas[row["id"]] = row["descripcion"]
-
-    # 2. Extraer jerarquías de relaciones (adaptadas para la nueva estructura)
-    cursor.execute("""
-    SELECT DISTINCT
-        nombre_padre,
-        GROUP_CONCAT(nombre_hijo, '|') as hijos
+    """,
+    "campos": {"id": "id", "codigo": "codigo_regional", "nombre": "nombre"},
+}
+
+# Hay un enlace por regional y periodo: se toma cada par padre-hijo una vez.
+# Los pares llegan ordenados por padre desde el índice; los componentes de
+# cada padre se ordenan por su primer enlace.
+COMPONENTES_JERARQUIA = {
+    "consulta": """
+    SELECT nombre_padre, nombre_hijo, MIN(id) as primer_id
     FROM relacion_jerarquica
     WHERE tabla_origen = 'meta_formacion_profesional_integral'
-    GROUP BY nombre_padre
-    """)
-
-    for row in cursor.fetchall():
-        nombre_padre = row["nombre_padre"]
-        hijos = row["hijos"].split("|") if row["hijos"] else []
-
-        referencias["jerarquias"][nombre_padre] = {
-            "tipo": "suma",
-            "componentes": hijos,
-            "tabla": "meta_formacion_profesional_integral",
-        }
-
-    # 3. Identificar totales y subtotales en FPI por regional
-    cursor.execute("""
+    GROUP BY nombre_padre, nombre_hijo
+    """,
+    "agrupar": ("nombre_padre",),
+    "orden": "primer_id",
+    "valor": "nombre_hijo",
+}
+
+# Totales y subtotales en FPI por regional (periodo vigente)
+TOTALES_FPI = {
+    "consulta": f"""
     SELECT
         mfpi.id,
         dm.descripcion,
@@ -82,35 +53,30 @@ def extraer_referencias():
         mfpi.nivel_jerarquia,
         mfpi.id_regional,
         r.codigo_regional,
-        SUM(mfpi.meta) as meta_total,
-        SUM(mfpi.ejecucion) as ejecucion_total
+        mfpi.meta as meta_total,
+        mfpi.ejecucion as ejecucion_total
     FROM meta_formacion_profesional_integral mfpi
     JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
     JOIN regional r ON mfpi.id_regional = r.id
-    WHERE mfpi.es_subtotal = 1 OR mfpi.es_total = 1
-    GROUP BY dm.descripcion, mfpi.es_subtotal, mfpi.es_total, mfpi.nivel_jerarquia, r.codigo_regional
-    ORDER BY mfpi.nivel_jerarquia, dm.descripcion
-    """)
-
-    fpi_totales = []
-    for row in cursor.fetchall():
-        fpi_totales.append(
-            {
-                "id": row["id"],
-                "descripcion": row["descripcion"],
-                "es_subtotal": bool(row["es_subtotal"]),
-                "es_total": bool(row["es_total"]),
-                "nivel_jerarquia": row["nivel_jerarquia"],
-                "regional": row["codigo_regional"],
-                "meta": row["meta_total"],
-                "ejecucion": row["ejecucion_total"],
-            }
-        )
-
-    referencias["totales"]["formacion_profesional_integral"] = fpi_totales
-
-    # 4. Totales de formación por nivel
-    cursor.execute("""
+    WHERE (mfpi.es_subtotal = 1 OR mfpi.es_total = 1)
+    AND mfpi.periodo = {PERIODO_VIGENTE}
+    ORDER BY mfpi.nivel_jerarquia, dm.descripcion, r.codigo_regional
+    """,
+    "campos": {
+        "id": "id",
+        "descripcion": "descripcion",
+        "es_subtotal": ("es_subtotal", bool),
+        "es_total": ("es_total", bool),
+        "nivel_jerarquia": "nivel_jerarquia",
+        "regional": "codigo_regional",
+        "meta": "meta_total",
+        "ejecucion": "ejecucion_total",
+    },
+}
+
+# Totales de formación por nivel (periodo vigente)
+TOTALES_POR_NIVEL = {
+    "consulta": f"""
     SELECT
         id,
         nivel_formacion,
@@ -124,83 +90,121 @@ def extraer_referencias():
         es_total
     FROM formacion_por_nivel_programa
     WHERE es_total = 1
+    AND periodo = {PERIODO_VIGENTE}
     ORDER BY nivel_formacion
-    """)
-
-    nivel_totales = []
-    for row in cursor.fetchall():
-        nivel_totales.append(
-            {
-                "id": row["id"],
-                "nivel_formacion": row["nivel_formacion"],
-                "componentes": {
-                    "regular": {
-                        "meta": row["regular_meta"],
-                        "ejecucion": row["regular_ejecucion"],
-                    },
-                    "campesena": {
-                        "meta": row["campesena_meta"],
-                        "ejecucion": row["campesena_ejecucion"],
-                    },
-                    "full_popular": {
-                        "meta": row["full_popular_meta"],
-                        "ejecucion": row["full_popular_ejecucion"],
-                    },
-                },
-                "total_meta": row["total_meta"],
-            }
-        )
-
-    referencias["totales"]["formacion_por_nivel_programa"] = nivel_totales
-
-    # 5. Métricas adicionales que son totales
-    cursor.execute("""
-    SELECT DISTINCT
+    """,
+    "campos": {
+        "id": "id",
+        "nivel_formacion": "nivel_formacion",
+        "componentes": {
+            "regular": {"meta": "regular_meta", "ejecucion": "regular_ejecucion"},
+            "campesena": {"meta": "campesena_meta", "ejecucion": "campesena_ejecucion"},
+            "full_popular": {
+                "meta": "full_popular_meta",
+                "ejecucion": "full_popular_ejecucion",
+            },
+        },
+        "total_meta": "total_meta",
+    },
+}
+
+# Métricas adicionales por categoría (periodo vigente), en una sola consulta
+METRICAS_POR_CATEGORIA = {
+    "consulta": f"""
+    SELECT
         categoria,
-        COUNT(*) as cantidad_metricas
+        id,
+        nombre_metrica,
+        meta,
+        ejecucion,
+        tipo_dato,
+        es_total
     FROM metrica_adicional
-    GROUP BY categoria
-    ORDER BY categoria
-    """)
-
-    categorias = {}
-    for row in cursor.fetchall():
-        categoria = row["categoria"]
-
-        cursor.execute(
-            """
-        SELECT
-            id,
-            nombre_metrica,
-            meta,
-            ejecucion,
-            tipo_dato,
-            es_total
-        FROM metrica_adicional
-        WHERE categoria = ?
-        ORDER BY es_total DESC, nombre_metrica
-        """,
-            (categoria,),
-        )
-
-        metricas = []
-        for metrica_row in cursor.fetchall():
-            metricas.append(
-                {
-                    "id": metrica_row["id"],
-                    "nombre": metrica_row["nombre_metrica"],
-                    "meta": metrica_row["meta"],
-                    "ejecucion": metrica_row["ejecucion"],
-                    "tipo_dato": metrica_row["tipo_dato"],
-                    "es_total": bool(metrica_row["es_total"]),
-                }
-            )
-
-        categorias[categoria] = metricas
-
-    referencias["totales"]["metricas_adicionales"] = categorias
-
-    # 6. Calculos especiales conocidos
+    WHERE periodo = {PERIODO_VIGENTE}
+    ORDER BY categoria, es_total DESC, nombre_metrica
+    """,
+    "agrupar": ("categoria",),
+    "campos": {
+        "id": "id",
+        "nombre": "nombre_metrica",
+        "meta": "meta",
+        "ejecucion": "ejecucion",
+        "tipo_dato": "tipo_dato",
+        "es_total": ("es_total", bool),
+    },
+}
+
+# Programas especiales (periodo vigente)
+PROGRAMAS_ESPECIALES = {
+    "consulta": f"""
+    SELECT descripcion, meta, ejecucion, tipo
+    FROM programa_relevante
+    WHERE periodo = {PERIODO_VIGENTE}
+    ORDER BY tipo, descripcion
+    """,
+}
+
+
+def consultar(cursor, nombre, especificacion, cache=None):
+    """Ejecuta una especificación como etapa consulta:<nombre> de la instrumentación"""
+    with instrumentacion.etapa(f"consulta:{nombre}") as medida:
+        datos, _ = ejecutar(cursor, especificacion, cache=cache)
+        medida["filas"] = len(datos)
+    return datos
+
+
+def extraer_referencias(cache=None):
+    """
+    Extrae todas las referencias de totales y agregaciones. Con cache
+    (CacheConsultas) las consultas ya ejecutadas sobre la misma versión de
+    los datos no se vuelven a ejecutar.
+    """
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    cursor.execute(f"SELECT {PERIODO_VIGENTE}")
+    periodo = cursor.fetchone()[0]
+
+    referencias = {
+        "version": "1.0",
+        "periodo": periodo,
+        "descripcion": "Referencias de totales y agregaciones para seguimiento de metas SENA",
+        "regionales": [],
+        "jerarquias": {},
+        "totales": {},
+        "calculos": {},
+    }
+
+    # 0. Extraer listado de regionales
+    regionales = consultar(cursor, "regionales", REGIONALES, cache)
+    referencias["regionales"] = regionales
+
+    # 1. Extraer jerarquías de relaciones (adaptadas para la nueva estructura)
+    componentes = consultar(cursor, "jerarquias", COMPONENTES_JERARQUIA, cache)
+    for nombre_padre, hijos in componentes.items():
+        referencias["jerarquias"][nombre_padre] = {
+            "tipo": "suma",
+            "componentes": hijos,
+            "tabla": "meta_formacion_profesional_integral",
+        }
+
+    # 2. Totales y subtotales en FPI por regional
+    referencias["totales"]["formacion_profesional_integral"] = consultar(
+        cursor, "totales_fpi", TOTALES_FPI, cache
+    )
+
+    # 3. Totales de formación por nivel
+    referencias["totales"]["formacion_por_nivel_programa"] = consultar(
+        cursor, "totales_por_nivel", TOTALES_POR_NIVEL, cache
+    )
+
+    # 4. Métricas adicionales por categoría
+    referencias["totales"]["metricas_adicionales"] = consultar(
+        cursor, "metricas_por_categoria", METRICAS_POR_CATEGORIA, cache
+    )
+
+    # 5. Calculos especiales conocidos
     referencias["calculos"]["formulas_conocidas"] = {
         "EDUCACION SUPERIOR (=E)": {
             "formula": "SubTotal Tecnólogos ( E)",
@@ -248,27 +252,12 @@ def extraer_referencias():
         },
     }
 
-    # 7. Mapeo de programas especiales
-    cursor.execute("""
-    SELECT descripcion, meta, ejecucion, tipo
-    FROM programa_relevante
-    ORDER BY tipo, descripcion
-    """)
-
-    programas_especiales = []
-    for row in cursor.fetchall():
-        programas_especiales.append(
-            {
-                "descripcion": row["descripcion"],
-                "meta": row["meta"],
-                "ejecucion": row["ejecucion"],
-                "tipo": row["tipo"],
-            }
-        )
-
-    referencias["programas_especiales"] = programas_especiales
-
-    # 8. Indicadores transversales
+    # 6. Mapeo de programas especiales
+    referencias["programas_especiales"] = consultar(
+        cursor, "programas_especiales", PROGRAMAS_ESPECIALES, cache
+    )
+
+    # 7. Indicadores transversales
     referencias["indicadores_transversales"] = {
         "CampeSENA": {
             "tablas": [
@@ -294,7 +283,7 @@ def extraer_referencias():
         },
     }
 
-    # 9. Información de desagregación por regional
+    # 8. Información de desagregación por regional
     referencias["desagregacion_regional"] = {
         "descripcion": "Las metas de formación profesional integral están desagregadas por regional",
         "total_regionales": len(regionales),
@@ -311,15 +300,27 @@ def extraer_referencias():
     return referencias
 
 
-def main():
+def main(argv=None):
     """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sin-cache",
+        action="store_true",
+        help="Ejecuta todas las consultas sin usar ni actualizar el cache de consultas",
+    )
+    instrumentacion.agregar_argumentos(parser)
+    args = parser.parse_args(argv)
+
     print("Generando referencias de totales y agregaciones...\n")
 
-    referencias = extraer_referencias()
+    instrumentos = instrumentacion.iniciar("generar_referencias_json", args.perfilar)
+    cache = None if args.sin_cache else CacheConsultas.cargar(ruta_cache(DB_FILE))
+    referencias = extraer_referencias(cache)
 
     # Guardar JSON
-    with open(JSON_OUTPUT, "w", encoding="utf-8") as f:
-        json.dump(referencias, f, ensure_ascii=False, indent=2)
+    with instrumentacion.etapa("escritura"):
+        with open(JSON_OUTPUT, "w", encoding="utf-8") as f:
+            json.dump(referencias, f, ensure_ascii=False, indent=2)
 
     print(f"[OK] Archivo JSON generado: {JSON_OUTPUT}")
     print("\nEstadisticas:")
@@ -339,6 +340,12 @@ def main():
         f"  - Formulas conocidas: {len(referencias['calculos']['formulas_conocidas'])}"
     )
 
+    if cache is not None:
+        cache.guardar(ruta_cache(DB_FILE))
+        cache.reportar()
+
+    instrumentacion.finalizar(instrumentos, args.reporte)
+
 
 if __name__ == "__main__":
     main()
@@ -3,25 +3,340 @@ Script para importar datos de seguimiento de metas desde archivo ODS a SQLite
 con esquema normalizado y desagregación por regional
 """
 
+import argparse
+import functools
+import hashlib
+import os
+import re
+import numpy as np
 import pandas as pd
 import sqlite3
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
+import clasificacion_semaforo
+import consolidacion_jerarquica
+import instrumentacion
+import lector_ods
+from cache_dimensiones import Dimensiones
+
 # Configuración
 ODS_FILE = "seguimiento_metas_2025_09.ods"
 DB_FILE = "seguimiento_metas.db"
 
+# Periodo que se asigna a los datos importados cuando no se indica otro
+PERIODO = "2025_09"
+
+# Nombre de los archivos mensuales; de él se deriva el periodo
+PATRON_ARCHIVO = re.compile(r"seguimiento_metas_(\d{4})_(\d{2})\.ods$")
+
+# Filas de regionales en la hoja formacio_regional: desde FILA_INICIO_REGIONALES
+# hasta la fila TOTAL REGIONALES (la 35 en el libro con 33 regionales)
+FILA_INICIO_REGIONALES = 2
+
+# Lector del libro: "stream" (iterparse, sin DOM) u "odf" (DOM de odfpy). En ambos
+# casos cada hoja llega a los importadores como DataFrame completo
+LECTOR = "stream"
+
+# Hojas del libro que se importan y sus opciones de lectura
+HOJAS = {
+    "formacio_regional": {"header": None},
+    "semaforo": {},
+    "profesional_integral_x_programa": {},
+    "nacional_seguimiento_relevantes": {},
+    "nacional_seguimiento_otras_meta": {},
+}
+
+
+# Agregados materializados de las metas FPI, mantenidos por actualizar_agregados
+TABLAS_AGREGADOS = ("agregado_fpi_descripcion", "agregado_fpi_regional")
+
+# Estado de semáforo materializado, mantenido por clasificacion_semaforo
+TABLA_ESTADOS = "estado_semaforo"
+
+# Tablas derivadas que se reescriben completas en una sola operación: quien
+# las escribe renueva su versión una vez, en lugar de un trigger por fila
+TABLAS_VERSION_MANUAL = (TABLA_ESTADOS,)
+
+# Tablas que se alimentan de cada hoja (la primera es la tabla principal)
+TABLAS_POR_HOJA = {
+    "formacio_regional": (
+        "meta_formacion_profesional_integral",
+        "regional",
+        "descripcion_meta",
+        "relacion_jerarquica",
+    )
+    + TABLAS_AGREGADOS
+    + (TABLA_ESTADOS,),
+    "semaforo": ("rangos_categorizacion", TABLA_ESTADOS),
+    "profesional_integral_x_programa": ("formacion_por_nivel_programa",),
+    "nacional_seguimiento_relevantes": ("programa_relevante",),
+    "nacional_seguimiento_otras_meta": ("metrica_adicional",),
+}
+
+# Clave natural de cada tabla de hechos, usada en la escritura incremental
+CLAVES = {
+    "meta_formacion_profesional_integral": ("id_descripcion", "id_regional", "periodo"),
+    "rangos_categorizacion": ("nombre_indicador", "mes"),
+    "formacion_por_nivel_programa": ("nivel_formacion", "periodo"),
+    "programa_relevante": ("descripcion", "periodo"),
+    "metrica_adicional": ("categoria", "nombre_metrica", "periodo"),
+}
+
+
+# Índices únicos de las tablas cargadas. Se mantienen fuera del CREATE TABLE
+# para poder crearlos después de la carga en el modo de construcción
+INDICES_UNICOS = [
+    ("ux_regional_codigo", "regional", ("codigo_regional",)),
+    ("ux_descripcion_meta_descripcion", "descripcion_meta", ("descripcion",)),
+    ("ux_agregado_fpi_descripcion", TABLAS_AGREGADOS[0], ("periodo", "id_descripcion")),
+    ("ux_agregado_fpi_regional", TABLAS_AGREGADOS[1], ("periodo", "id_regional")),
+    (
+        "ux_estado_semaforo",
+        TABLA_ESTADOS,
+        ("periodo", "id_descripcion", "id_regional"),
+    ),
+] + [
+    (f"ux_{tabla}", tabla, claves) for tabla, claves in CLAVES.items()
+]
+
+# Índices de las consultas de exportación y referencias: (nombre, tabla,
+# columnas o expresiones, condición del índice parcial). Cada uno responde a
+# un ORDER BY o a un filtro concreto; tests/test_planes_consulta.py comprueba
+# que los planes los sigan usando.
+INDICES_CONSULTA = [
+    # exportar_metas_fpi y fragmentos por regional: periodo vigente ORDER BY
+    # codigo_regional, nivel_jerarquia DESC, descripcion
+    (
+        "ix_meta_fpi_periodo_regional",
+        "meta_formacion_profesional_integral",
+        "periodo, id_regional, nivel_jerarquia DESC",
+        None,
+    ),
+    # referencias: subtotales y totales del periodo vigente
+    (
+        "ix_meta_fpi_totales",
+        "meta_formacion_profesional_integral",
+        "periodo, nivel_jerarquia",
+        "es_subtotal = 1 OR es_total = 1",
+    ),
+    # exportar_metas_fpi_agregadas: periodo vigente ORDER BY nivel_jerarquia DESC
+    (
+        "ix_agregado_fpi_nivel",
+        "agregado_fpi_descripcion",
+        "periodo, nivel_jerarquia DESC",
+        None,
+    ),
+    # Dashboard: top 5 de detalle por cumplimiento y por brecha
+    (
+        "ix_agregado_fpi_cumplimiento",
+        "agregado_fpi_descripcion",
+        "periodo, ROUND(MIN(100.59, (ejecucion * 100.0 / NULLIF(meta, 0))), 2) DESC",
+        "es_total = 0 AND es_subtotal = 0",
+    ),
+    (
+        "ix_agregado_fpi_brecha",
+        "agregado_fpi_descripcion",
+        "periodo, (meta - ejecucion) DESC",
+        "es_total = 0 AND es_subtotal = 0",
+    ),
+    # exportar_por_nivel: periodo vigente ORDER BY es_total, total_meta DESC
+    (
+        "ix_formacion_por_nivel_orden",
+        "formacion_por_nivel_programa",
+        "periodo, es_total, total_meta DESC",
+        None,
+    ),
+    # Dashboard: sumas por modalidad sobre las filas del periodo vigente que
+    # no son total (cubriente)
+    (
+        "ix_formacion_por_nivel_modalidades",
+        "formacion_por_nivel_programa",
+        "periodo, regular_meta, regular_ejecucion, campesena_meta, campesena_ejecucion, "
+        "full_popular_meta, full_popular_ejecucion",
+        "es_total = 0",
+    ),
+    # referencias: totales por nivel del periodo vigente ORDER BY nivel_formacion
+    (
+        "ix_formacion_por_nivel_totales",
+        "formacion_por_nivel_programa",
+        "periodo, nivel_formacion",
+        "es_total = 1",
+    ),
+    # Periodo vigente ORDER BY tipo, descripcion (exportador y referencias)
+    (
+        "ix_programa_relevante_tipo",
+        "programa_relevante",
+        "periodo, tipo, descripcion",
+        None,
+    ),
+    # exportar_rangos_semaforo: ORDER BY agrupador, nombre_indicador
+    (
+        "ix_rangos_categorizacion_agrupador",
+        "rangos_categorizacion",
+        "agrupador, nombre_indicador",
+        None,
+    ),
+    # Métricas del periodo vigente ORDER BY categoria, es_total DESC, nombre_metrica
+    (
+        "ix_metrica_adicional_categoria",
+        "metrica_adicional",
+        "periodo, categoria, es_total DESC, nombre_metrica",
+        None,
+    ),
+    # exportar_jerarquias (ORDER BY nombre_padre, nombre_hijo) y pares de referencias
+    (
+        "ix_relacion_jerarquica_padre_hijo",
+        "relacion_jerarquica",
+        "nombre_padre, nombre_hijo, tabla_origen",
+        None,
+    ),
+]
+
+# Índices de consulta de versiones anteriores que ya no se usan
+INDICES_OBSOLETOS = ("ix_meta_fpi_regional_nivel",)
+
+# Relaciones padre -> hijos de las metas FPI (suma de los hijos)
+RELACIONES_FPI = [
+    # Nombres usados en el seguimiento nacional
+    (
+        "SubTotal Tecnólogos ( E)",
+        [
+            "Tecnólogos Regular - Presencial",
+            "Tecnólogos Regular - Virtual",
+            "Tecnólogos Regular - A Distancia",
+            "Tecnólogos CampeSENA",
+            "Tecnólogos Full Popular",
+        ],
+    ),
+    ("EDUCACION SUPERIOR (=E)", ["SubTotal Tecnólogos ( E)"]),
+    (
+        "SubTotal Operarios (B)",
+        ["Operarios Regular", "Operarios CampeSENA", "Operarios Full Popular"],
+    ),
+    (
+        "SubTotal Auxiliares (A)",
+        ["Auxiliares Regular", "Auxiliares CampeSENA", "Auxiliares Full Popular"],
+    ),
+    (
+        "SubTotal Técnico Laboral (C)",
+        [
+            "Técnico Laboral Regular - Presencial",
+            "Técnico Laboral Regular - Virtual",
+            "Técnico Laboral CampeSENA",
+            "Técnico Laboral Full Popular",
+            "Técnico Laboral Articulación con la Media",
+        ],
+    ),
+    (
+        "TOTAL FORMACIÓN LABORAL (D=A+B+C+T)",
+        [
+            "SubTotal Auxiliares (A)",
+            "SubTotal Operarios (B)",
+            "SubTotal Técnico Laboral (C)",
+            "Profundización Técnica (T)",
+        ],
+    ),
+    (
+        "TOTAL FORMACION TITULADA (F = D+E)",
+        ["TOTAL FORMACIÓN LABORAL (D=A+B+C+T)", "EDUCACION SUPERIOR (=E)"],
+    ),
+    (
+        "SubTotal Programa de Bilingüismo (K = I + J)",
+        [
+            "Programa de Bilingüismo - Virtual (I)",
+            "Programa de Bilingüismo - Presencial (J)",
+        ],
+    ),
+    (
+        "TOTAL FORMACION COMPLEMENTARIA (N = G+H+K+L+M)",
+        [
+            "Formación Complementaria - Virtual  (Sin Bilingüismo) (G)",
+            "Formación Complementaria - Presencial (Sin Bilingüismo) (H)",
+            "SubTotal Programa de Bilingüismo (K = I + J)",
+            "Formación Complementaria CampeSENA (L)",
+            "Formación Complementaria Full Popular (M)",
+        ],
+    ),
+    (
+        "TOTAL FORMACION PROFESIONAL INTEGRAL (O=N+F)",
+        [
+            "TOTAL FORMACION TITULADA (F = D+E)",
+            "TOTAL FORMACION COMPLEMENTARIA (N = G+H+K+L+M)",
+        ],
+    ),
+    # Nombres usados en la hoja formacio_regional
+    (
+        "Total Tecnólogos (E)",
+        [
+            "Tecnologos Regular - Presencial",
+            "Tecnólogos Regular - Virtual",
+            "Tecnólogos Regular - A Distancia",
+            "Tecnólogos CampeSENA",
+            "Tecnólogos Full Popular",
+        ],
+    ),
+    ("TOTAL EDUCACION SUPERIOR (E)", ["Total Tecnólogos (E)"]),
+    (
+        "Total Operarios (B)",
+        ["Operarios Regular", "Operarios CampeSENA", "Operarios Full Popular"],
+    ),
+    (
+        "Total Auxiliares (A)",
+        ["Auxiliares Regular", "Auxiliares CampeSENA", "Auxiliares Full Popular"],
+    ),
+    (
+        "Total Técnico Laboral (C)",
+        [
+            "Técnico Laboral Regular - Presencial",
+            "Técnico Laboral Regular - Virtual",
+            "Técnico Laboral CampeSENA",
+            "Técnico Laboral Full Popular",
+            "Técnico Laboral Articulación con la Media",
+        ],
+    ),
+    (
+        "TOTAL FORMACIÓN LABORAL (Operarios, Auxiliar  y técnico laboral, profundización técnica) (D=A+B+C+T)",
+        [
+            "Total Auxiliares (A)",
+            "Total Operarios (B)",
+            "Total Técnico Laboral (C)",
+            "Total Profundización Técnica (T)",
+        ],
+    ),
+]
+
+
+def cargar_libro(ods_file=ODS_FILE, lector=LECTOR):
+    """
+    Parsea el libro ODS una sola vez y retorna un diccionario hoja -> DataFrame.
+    Con lector="stream" se recorre el content.xml en una pasada con iterparse
+    (lector_ods); con lector="odf", pd.ExcelFile carga el documento con odfpy
+    al abrirse y cada parse() posterior reutiliza ese documento.
+    """
+    if lector == "stream":
+        return lector_ods.leer_hojas(ods_file, HOJAS)
 
-def crear_esquema(conn):
-    """Crea el esquema normalizado de la base de datos con desagregación regional"""
+    with pd.ExcelFile(ods_file, engine="odf") as libro:
+        return {hoja: libro.parse(hoja, **opciones) for hoja, opciones in HOJAS.items()}
+
+
+def crear_esquema(conn, con_indices=True):
+    """
+    Crea el esquema normalizado de la base de datos con desagregación regional.
+    Con con_indices=False las tablas cargadas se crean sin sus índices ni
+    los triggers de version_datos, que se agregan después de la carga con
+    crear_indices y crear_versiones_datos (modo de construcción).
+    """
     cursor = conn.cursor()
 
     # Tabla de regionales
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS regional (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        codigo_regional VARCHAR(50) UNIQUE NOT NULL,
+        codigo_regional VARCHAR(50) NOT NULL,
         nombre VARCHAR(200)
     )
     """)
@@ -30,7 +345,7 @@ def crear_esquema(conn):
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS descripcion_meta (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        descripcion VARCHAR(500) UNIQUE NOT NULL
+        descripcion VARCHAR(500) NOT NULL
     )
     """)
 
@@ -47,8 +362,7 @@ def crear_esquema(conn):
         nivel_jerarquia INTEGER DEFAULT 0,
         periodo VARCHAR(50) DEFAULT '2025_09',
         FOREIGN KEY(id_descripcion) REFERENCES descripcion_meta(id),
-        FOREIGN KEY(id_regional) REFERENCES regional(id),
-        UNIQUE(id_descripcion, id_regional, periodo)
+        FOREIGN KEY(id_regional) REFERENCES regional(id)
     )
     """)
 
@@ -73,8 +387,7 @@ def crear_esquema(conn):
         max_vulnerable DECIMAL(10,4),
         min_buena DECIMAL(10,4),
         max_buena DECIMAL(10,4),
-        sobreejecucion_superior_a DECIMAL(10,4),
-        UNIQUE(nombre_indicador, mes)
+        sobreejecucion_superior_a DECIMAL(10,4)
     )
     """)
 
@@ -120,8 +433,7 @@ def crear_esquema(conn):
         full_popular_ejecucion INTEGER,
         total_meta INTEGER NOT NULL,
         es_total BOOLEAN DEFAULT 0,
-        periodo VARCHAR(50) DEFAULT '2025_09',
-        UNIQUE(nivel_formacion, periodo)
+        periodo VARCHAR(50) DEFAULT '2025_09'
     )
     """)
 
@@ -133,8 +445,7 @@ def crear_esquema(conn):
         meta INTEGER NOT NULL,
         ejecucion INTEGER NOT NULL,
         tipo VARCHAR(100) NOT NULL,
-        periodo VARCHAR(50) DEFAULT '2025_09',
-        UNIQUE(descripcion, periodo)
+        periodo VARCHAR(50) DEFAULT '2025_09'
     )
     """)
 
@@ -149,8 +460,7 @@ def crear_esquema(conn):
         tipo_dato VARCHAR(50) DEFAULT 'numero',
         es_total BOOLEAN DEFAULT 0,
         formula_calculo TEXT,
-        periodo VARCHAR(50) DEFAULT '2025_09',
-        UNIQUE(categoria, nombre_metrica, periodo)
+        periodo VARCHAR(50) DEFAULT '2025_09'
     )
     """)
 
@@ -183,10 +493,168 @@ def crear_esquema(conn):
     )
     """)
 
+    # Agregados nacionales materializados de las metas FPI, por periodo y
+    # descripción. Se recalculan al importar el periodo (actualizar_agregados)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS agregado_fpi_descripcion (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        periodo VARCHAR(50) NOT NULL,
+        id_descripcion INTEGER NOT NULL,
+        regionales INTEGER NOT NULL,
+        meta INTEGER,
+        ejecucion INTEGER,
+        porcentaje REAL,
+        es_subtotal BOOLEAN DEFAULT 0,
+        es_total BOOLEAN DEFAULT 0,
+        nivel_jerarquia INTEGER DEFAULT 0,
+        FOREIGN KEY(id_descripcion) REFERENCES descripcion_meta(id)
+    )
+    """)
+
+    # Agregados por periodo y regional (suma de los registros de detalle,
+    # sin subtotales ni totales para no contar dos veces)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS agregado_fpi_regional (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        periodo VARCHAR(50) NOT NULL,
+        id_regional INTEGER NOT NULL,
+        descripciones INTEGER NOT NULL,
+        meta INTEGER,
+        ejecucion INTEGER,
+        porcentaje REAL,
+        FOREIGN KEY(id_regional) REFERENCES regional(id)
+    )
+    """)
+
+    # Estado de semáforo de cada meta por regional y de cada agregado nacional
+    # (id_regional nulo) según el rango de su indicador para el mes del
+    # periodo; estado nulo sin rango o sin meta (clasificacion_semaforo)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS estado_semaforo (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        periodo VARCHAR(50) NOT NULL,
+        id_descripcion INTEGER NOT NULL,
+        id_regional INTEGER,
+        id_rango INTEGER,
+        cumplimiento REAL,
+        estado VARCHAR(20),
+        FOREIGN KEY(id_descripcion) REFERENCES descripcion_meta(id),
+        FOREIGN KEY(id_regional) REFERENCES regional(id),
+        FOREIGN KEY(id_rango) REFERENCES rangos_categorizacion(id)
+    )
+    """)
+
+    # Manifiesto de importación: huella del contenido de cada hoja importada
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS manifiesto_importacion (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        archivo VARCHAR(500) NOT NULL,
+        hoja VARCHAR(200) NOT NULL,
+        huella VARCHAR(64) NOT NULL,
+        periodo VARCHAR(50),
+        tablas TEXT NOT NULL,
+        filas INTEGER,
+        fecha_importacion TIMESTAMP NOT NULL,
+        UNIQUE(archivo, hoja)
+    )
+    """)
+
+    # Versión de los datos de cada tabla, renovada por triggers en cada
+    # cambio; la exportación la usa para omitir los conjuntos sin cambios
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS version_datos (
+        tabla VARCHAR(100) PRIMARY KEY,
+        version VARCHAR(32) NOT NULL,
+        fecha_modificacion TIMESTAMP NOT NULL
+    )
+    """)
+
     conn.commit()
+
+    if con_indices:
+        crear_versiones_datos(conn)
+        crear_indices(conn)
+        conn.commit()
+
     print("[OK] Esquema de base de datos creado")
 
 
+def crear_versiones_datos(conn):
+    """
+    Crea los triggers que renuevan version_datos con cada INSERT, UPDATE o
+    DELETE sobre las tablas de datos (salvo TABLAS_VERSION_MANUAL). La
+    versión es un valor aleatorio, de modo que una base reconstruida nunca
+    repite la versión de la anterior.
+    """
+    tablas = [
+        tabla
+        for (tabla,) in conn.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            AND name NOT IN ('version_datos', 'manifiesto_importacion')
+        """)
+    ]
+    for tabla in tablas:
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO version_datos (tabla, version, fecha_modificacion)
+            VALUES (?, lower(hex(randomblob(8))), CURRENT_TIMESTAMP)
+            """,
+            (tabla,),
+        )
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            if tabla in TABLAS_VERSION_MANUAL:
+                conn.execute(f"DROP TRIGGER IF EXISTS tv_{tabla}_{evento.lower()}")
+                continue
+            conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS tv_{tabla}_{evento.lower()}
+            AFTER {evento} ON {tabla}
+            BEGIN
+                UPDATE version_datos
+                SET version = lower(hex(randomblob(8))),
+                    fecha_modificacion = CURRENT_TIMESTAMP
+                WHERE tabla = '{tabla}';
+            END
+            """)
+
+
+def tiene_indice_unico(conn, tabla, columnas):
+    """
+    Indica si la tabla ya tiene un índice único sobre exactamente esas
+    columnas (por ejemplo, el UNIQUE en línea de bases creadas antes)
+    """
+    for _, nombre, unico, *_ in conn.execute(f"PRAGMA index_list({tabla})"):
+        if unico:
+            columnas_indice = tuple(
+                fila[2] for fila in conn.execute(f"PRAGMA index_info({nombre})")
+            )
+            if columnas_indice == tuple(columnas):
+                return True
+    return False
+
+
+def crear_indices(conn):
+    """Crea los índices únicos y los de consulta si aún no existen"""
+    for nombre, tabla, columnas in INDICES_UNICOS:
+        if not tiene_indice_unico(conn, tabla, columnas):
+            conn.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {nombre} ON {tabla} ({', '.join(columnas)})"
+            )
+    for nombre in INDICES_OBSOLETOS:
+        conn.execute(f"DROP INDEX IF EXISTS {nombre}")
+    for nombre, tabla, columnas, condicion in INDICES_CONSULTA:
+        donde = f" WHERE {condicion}" if condicion else ""
+        definicion = f"{tabla} ({columnas}){donde}"
+        # Un índice de una versión anterior con otras columnas se recrea
+        existente = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = ?", (nombre,)
+        ).fetchone()
+        if existente is not None and existente[0] != f"CREATE INDEX {nombre} ON {definicion}":
+            conn.execute(f"DROP INDEX {nombre}")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}")
+    conn.commit()
+
+
 def identificar_tipo_registro(nombre):
     """Identifica si un registro es subtotal, total o detalle"""
     nombre_lower = nombre.lower()
@@ -227,169 +695,343 @@ def extraer_descripciones_de_headers(df):
     return descripciones
 
 
-def importar_formacion_regional(conn, df):
-    """Importa datos de formación por regional desde la hoja formacio_regional"""
-    cursor = conn.cursor()
+def nivel_jerarquia(es_subtotal, es_total):
+    """Nivel jerárquico: 3=total, 2=subtotal, 1=detalle"""
+    if es_total:
+        return 3
+    if es_subtotal:
+        return 2
+    return 1
 
-    descripciones = extraer_descripciones_de_headers(df)
 
-    print(f"[INFO] Se encontraron {len(descripciones)} descripciones de metas")
+def coercionar_numeros(bloque):
+    """
+    Convierte un bloque de celdas (arreglo 2D de objetos) a enteros en una
+    sola pasada. Las celdas vacías valen 0; las que tienen contenido no
+    numérico también valen 0 pero se marcan en la máscara de errores.
+    """
+    crudo = pd.Series(bloque.ravel())
+    numeros = pd.to_numeric(crudo, errors="coerce")
+    errores = (crudo.notna() & numeros.isna()).to_numpy().reshape(bloque.shape)
+    enteros = np.trunc(numeros.fillna(0).to_numpy(dtype=float)).astype(np.int64)
+    return enteros.reshape(bloque.shape), errores
 
-    # Insertar descripciones en la tabla
-    id_descripciones = {}
-    for indice_cupos, descripcion in descripciones:
-        cursor.execute(
-            """
-        INSERT OR IGNORE INTO descripcion_meta (descripcion)
-        VALUES (?)
-        """,
-            (descripcion,),
+
+def filas_regionales(df):
+    """
+    Filas de regionales de la hoja formacio_regional: terminan antes de la
+    fila TOTAL REGIONALES (o al final de la hoja si no la tiene)
+    """
+    codigos = df.iloc[FILA_INICIO_REGIONALES:, 0].astype(str).str.strip().str.upper()
+    totales = np.flatnonzero(codigos.str.startswith("TOTAL").to_numpy())
+    fin = FILA_INICIO_REGIONALES + int(totales[0]) if len(totales) else len(df)
+    return df.iloc[FILA_INICIO_REGIONALES:fin]
+
+
+def reshape_formacion_regional(df):
+    """
+    Convierte los bloques Cupos/Ejecución/% de la hoja formacio_regional en
+    una tabla larga (codigo_regional, nombre_regional, descripcion, meta,
+    ejecucion, es_subtotal, es_total, nivel_jerarquia) en una sola pasada
+    vectorizada. Retorna (tabla_larga, descripciones, errores), donde
+    errores lista las celdas con contenido no numérico.
+    """
+    descripciones = [
+        (indice_cupos, descripcion)
+        for indice_cupos, descripcion in extraer_descripciones_de_headers(df)
+        if indice_cupos + 1 < df.shape[1]
+    ]
+    nombres = [descripcion for _, descripcion in descripciones]
+
+    datos = filas_regionales(df)
+    codigos = datos.iloc[:, 0].astype(str).str.strip()
+    validas = ((codigos != "") & (codigos.str.lower() != "nan")).to_numpy()
+    datos = datos[validas]
+    codigos = codigos[validas].to_numpy()
+    nombres_regional = datos.iloc[:, 1].astype(str).str.strip().to_numpy()
+
+    # Columna de cupos (meta) y de ejecución (la siguiente; la tercera del
+    # bloque es % Ejecución, que no se importa) por descripción
+    columnas_meta = [indice_cupos for indice_cupos, _ in descripciones]
+    columnas_ejecucion = [indice_cupos + 1 for indice_cupos, _ in descripciones]
+    metas, errores_meta = coercionar_numeros(
+        datos.iloc[:, columnas_meta].to_numpy(dtype=object)
+    )
+    ejecuciones, errores_ejecucion = coercionar_numeros(
+        datos.iloc[:, columnas_ejecucion].to_numpy(dtype=object)
+    )
+
+    errores = []
+    for campo, mascara, columnas in (
+        ("meta", errores_meta, columnas_meta),
+        ("ejecucion", errores_ejecucion, columnas_ejecucion),
+    ):
+        for fila, columna in zip(*np.nonzero(mascara)):
+            errores.append(
+                {
+                    "fila": int(FILA_INICIO_REGIONALES + np.flatnonzero(validas)[fila]),
+                    "columna": columnas[columna],
+                    "regional": codigos[fila],
+                    "descripcion": nombres[columna],
+                    "campo": campo,
+                    "valor": datos.iloc[fila, columnas[columna]],
+                }
+            )
+
+    # Banderas de subtotal/total: una vez por descripción, no por celda
+    tipos = [identificar_tipo_registro(descripcion) for descripcion in nombres]
+    es_subtotal = np.array([sub for sub, _ in tipos], dtype=bool)
+    es_total = np.array([tot for _, tot in tipos], dtype=bool)
+    niveles = np.array([nivel_jerarquia(sub, tot) for sub, tot in tipos], dtype=np.int64)
+
+    # Orden regional -> descripción (ravel en orden C)
+    n_regionales, n_descripciones = metas.shape
+    largo = pd.DataFrame(
+        {
+            "codigo_regional": np.repeat(codigos, n_descripciones),
+            "nombre_regional": np.repeat(nombres_regional, n_descripciones),
+            "descripcion": np.tile(np.array(nombres, dtype=object), n_regionales),
+            "meta": metas.ravel(),
+            "ejecucion": ejecuciones.ravel(),
+            "es_subtotal": np.tile(es_subtotal, n_regionales),
+            "es_total": np.tile(es_total, n_regionales),
+            "nivel_jerarquia": np.tile(niveles, n_regionales),
+        }
+    )
+
+    # Se incluyen siempre subtotales y totales
+    incluir = (
+        (largo["meta"] > 0)
+        | (largo["ejecucion"] > 0)
+        | largo["es_subtotal"]
+        | largo["es_total"]
+    )
+    return largo[incluir].reset_index(drop=True), nombres, errores
+
+
+def reportar_errores_celdas(errores, maximo=10):
+    """Imprime el reporte de celdas no numéricas encontradas en la hoja"""
+    if not errores:
+        return
+    print(f"[WARN] {len(errores)} celdas con valores no numericos (importadas como 0):")
+    for error in errores[:maximo]:
+        print(
+            f"  - fila {error['fila'] + 1}, columna {error['columna'] + 1} "
+            f"({error['regional']} / {error['descripcion']} / {error['campo']}): "
+            f"{error['valor']!r}"
         )
+    if len(errores) > maximo:
+        print(f"  ... y {len(errores) - maximo} mas")
+
+
+def normalizar_valor(valor):
+    """Normaliza un valor para SQLite: NaN -> None y escalares numpy -> Python"""
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and np.isnan(valor):
+        return None
+    return valor
 
-        cursor.execute(
-            "SELECT id FROM descripcion_meta WHERE descripcion = ?", (descripcion,)
+
+def escribir_filas(conn, tabla, columnas, filas, periodo=None):
+    """
+    Sincroniza una tabla con las filas de su hoja tocando solo las filas
+    afectadas: inserta o reemplaza las nuevas o modificadas y, si se indica
+    periodo, elimina las de ese periodo que ya no están en la hoja. Las filas
+    sin cambios conservan su id. Retorna (escritas, eliminadas).
+    """
+    # Las filas de la etapa son las comparadas, se escriban o no
+    with instrumentacion.etapa("insercion") as medida:
+        escritas, eliminadas, medida["filas"] = _escribir_filas(
+            conn, tabla, columnas, filas, periodo
         )
-        id_desc = cursor.fetchone()[0]
-        id_descripciones[descripcion] = id_desc
+    return escritas, eliminadas
+
+
+def _escribir_filas(conn, tabla, columnas, filas, periodo):
+    claves = CLAVES[tabla]
+    posiciones = [columnas.index(clave) for clave in claves]
+
+    nuevas = {}
+    for fila in filas:
+        fila = tuple(normalizar_valor(valor) for valor in fila)
+        nuevas[tuple(fila[i] for i in posiciones)] = fila
+
+    consulta = f"SELECT {', '.join(columnas)} FROM {tabla}"
+    parametros = ()
+    if periodo is not None:
+        consulta += " WHERE periodo = ?"
+        parametros = (periodo,)
+    existentes = {
+        tuple(fila[i] for i in posiciones): fila
+        for fila in conn.execute(consulta, parametros)
+    }
+
+    cambiadas = [
+        fila for clave, fila in nuevas.items() if existentes.get(clave) != fila
+    ]
+    eliminadas = []
+    if periodo is not None:
+        eliminadas = [clave for clave in existentes if clave not in nuevas]
+
+    # Se borra por clave antes de insertar (como haría REPLACE) para no
+    # depender de los índices únicos, que pueden crearse después de la carga
+    reemplazadas = [
+        tuple(fila[i] for i in posiciones)
+        for fila in cambiadas
+        if tuple(fila[i] for i in posiciones) in existentes
+    ]
+    conn.executemany(
+        f"DELETE FROM {tabla} WHERE " + " AND ".join(f"{clave} IS ?" for clave in claves),
+        reemplazadas + eliminadas,
+    )
+    conn.executemany(
+        f"INSERT INTO {tabla} ({', '.join(columnas)}) "
+        f"VALUES ({', '.join('?' for _ in columnas)})",
+        cambiadas,
+    )
 
-    conn.commit()
-    print("[OK] Descripciones de metas insertadas")
+    return len(cambiadas), len(eliminadas), len(nuevas)
 
-    # Procesar filas de datos (desde fila 3 hasta fila 35, índices 2 a 34)
-    contador = 0
-    for idx in range(2, min(35, len(df))):
-        row = df.iloc[idx]
 
-        codigo_regional = str(row.iloc[0]).strip()
-        nombre_regional = str(row.iloc[1]).strip()
+def importar_formacion_regional(conn, df, dimensiones=None, periodo=PERIODO):
+    """
+    Importa datos de formación por regional desde la hoja formacio_regional.
+    dimensiones: caches de claves compartidas de la ejecución (Dimensiones);
+    si no se entrega se crea una para esta importación.
+    Retorna la cantidad de registros de metas insertados.
+    """
+    if dimensiones is None:
+        dimensiones = Dimensiones(conn)
+
+    with instrumentacion.etapa("conversion") as medida:
+        largo, descripciones, errores = reshape_formacion_regional(df)
+        medida["filas"] = len(largo)
+
+    print(f"[INFO] Se encontraron {len(descripciones)} descripciones de metas")
 
+    cache_descripciones = dimensiones["descripcion_meta"]
+    id_descripciones = {
+        descripcion: cache_descripciones.obtener_id(descripcion)
+        for descripcion in descripciones
+    }
+
+    # Regionales en el orden de la hoja (incluso las que no tienen metas)
+    cache_regionales = dimensiones["regional"]
+    datos = filas_regionales(df)
+    id_regionales = {}
+    for codigo_regional, nombre_regional in zip(
+        datos.iloc[:, 0].astype(str).str.strip(), datos.iloc[:, 1].astype(str).str.strip()
+    ):
         if not codigo_regional or codigo_regional.lower() == "nan":
             continue
-
-        cursor.execute(
-            """
-        INSERT OR IGNORE INTO regional (codigo_regional, nombre)
-        VALUES (?, ?)
-        """,
-            (codigo_regional, nombre_regional),
+        id_regionales[codigo_regional] = cache_regionales.obtener_id(
+            codigo_regional, nombre_regional
         )
 
-        cursor.execute(
-            "SELECT id FROM regional WHERE codigo_regional = ?", (codigo_regional,)
-        )
-        id_regional = cursor.fetchone()[0]
-
-        for indice_cupos, descripcion in descripciones:
-            try:
-                meta_val = row.iloc[indice_cupos]
-                # Se ajusta para tomar la columna de ejecución correcta (saltando una columna)
-                ejec_val = row.iloc[indice_cupos + 2]
-
-                meta = None
-                ejecucion = None
-
-                try:
-                    meta = int(float(meta_val)) if pd.notna(meta_val) else 0
-                except:
-                    meta = 0
-
-                try:
-                    ejecucion = int(float(ejec_val)) if pd.notna(ejec_val) else 0
-                except:
-                    ejecucion = 0
-                
-                es_subtotal, es_total = identificar_tipo_registro(descripcion)
-
-                # Se ajusta la condición para incluir siempre subtotales y totales
-                if meta > 0 or ejecucion > 0 or es_subtotal or es_total:
-                    nivel = 0
-                    if es_total:
-                        nivel = 3
-                    elif es_subtotal:
-                        nivel = 2
-                    else:
-                        nivel = 1
-
-                    id_desc = id_descripciones[descripcion]
-
-                    cursor.execute(
-                        """
-                    INSERT OR REPLACE INTO meta_formacion_profesional_integral
-                    (id_descripcion, id_regional, meta, ejecucion, es_subtotal, es_total, nivel_jerarquia)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            id_desc,
-                            id_regional,
-                            meta,
-                            ejecucion,
-                            es_subtotal,
-                            es_total,
-                            nivel,
-                        ),
-                    )
-
-                    contador += 1
-            except Exception as e:
-                continue
+    dimensiones.volcar()
+    print("[OK] Descripciones de metas y regionales insertadas")
 
-        conn.commit()
+    escribir_filas(
+        conn,
+        "meta_formacion_profesional_integral",
+        (
+            "id_descripcion",
+            "id_regional",
+            "meta",
+            "ejecucion",
+            "es_subtotal",
+            "es_total",
+            "nivel_jerarquia",
+            "periodo",
+        ),
+        (
+            (
+                id_descripciones[registro.descripcion],
+                id_regionales[registro.codigo_regional],
+                int(registro.meta),
+                int(registro.ejecucion),
+                bool(registro.es_subtotal),
+                bool(registro.es_total),
+                int(registro.nivel_jerarquia),
+                periodo,
+            )
+            for registro in largo.itertuples(index=False)
+        ),
+        periodo,
+    )
 
-    print(f"[OK] Importados {contador} registros de metas FPI por regional")
+    reportar_errores_celdas(errores)
+    print(f"[OK] Importados {len(largo)} registros de metas FPI por regional")
+    return len(largo)
 
 
-def importar_semaforo(conn, df):
-    """Importa datos de la hoja semáforo"""
-    cursor = conn.cursor()
+def valor_o_nulo(valor):
+    """Retorna None para celdas vacías (NaN) y el valor en otro caso"""
+    return None if pd.isna(valor) else valor
 
-    for _, row in df.iterrows():
-        mes = row.get("mes")
+
+def filas_semaforo(df):
+    """Filas de rangos_categorizacion a partir de la hoja semáforo"""
+    filas = []
+    for row in df.itertuples(index=False):
+        mes = row.mes
         if pd.isna(mes) or str(mes).strip() == "":
             continue
 
-        cursor.execute(
-            """
-        INSERT OR REPLACE INTO rangos_categorizacion
-        (agrupador, nombre_indicador, mes, min_baja, max_baja, min_vulnerable,
-         max_vulnerable, min_buena, max_buena, sobreejecucion_superior_a)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        filas.append(
             (
-                row["agrupador"],
-                row["nombre_de_indicador"],
+                row.agrupador,
+                row.nombre_de_indicador,
                 str(mes).strip(),
-                row["min_baja"] if not pd.isna(row["min_baja"]) else None,
-                row["max_baja"] if not pd.isna(row["max_baja"]) else None,
-                row["min_vulnerable"] if not pd.isna(row["min_vulnerable"]) else None,
-                row["max_vulnerable"] if not pd.isna(row["max_vulnerable"]) else None,
-                row["min_buena"] if not pd.isna(row["min_buena"]) else None,
-                row["max_buena"] if not pd.isna(row["max_buena"]) else None,
-                row["sobreejecucion_superior_a"]
-                if not pd.isna(row["sobreejecucion_superior_a"])
-                else None,
-            ),
+                valor_o_nulo(row.min_baja),
+                valor_o_nulo(row.max_baja),
+                valor_o_nulo(row.min_vulnerable),
+                valor_o_nulo(row.max_vulnerable),
+                valor_o_nulo(row.min_buena),
+                valor_o_nulo(row.max_buena),
+                valor_o_nulo(row.sobreejecucion_superior_a),
+            )
         )
+    return filas
 
-    conn.commit()
-    print(f"[OK] Importados {len(df)} registros de semaforo")
 
+def importar_semaforo(conn, df):
+    """Importa datos de la hoja semáforo (los rangos se identifican por mes)"""
+    with instrumentacion.etapa("conversion") as medida:
+        filas = filas_semaforo(df)
+        medida["filas"] = len(filas)
+
+    escribir_filas(
+        conn,
+        "rangos_categorizacion",
+        (
+            "agrupador",
+            "nombre_indicador",
+            "mes",
+            "min_baja",
+            "max_baja",
+            "min_vulnerable",
+            "max_vulnerable",
+            "min_buena",
+            "max_buena",
+            "sobreejecucion_superior_a",
+        ),
+        filas,
+    )
 
-def importar_formacion_por_nivel(conn, df):
-    """Importa formación por nivel y programa"""
-    cursor = conn.cursor()
+    print(f"[OK] Importados {len(df)} registros de semaforo")
+    return len(filas)
 
+
+def filas_formacion_por_nivel(df):
+    """Filas de formacion_por_nivel_programa a partir de su hoja"""
+    filas = []
     for _, row in df.iterrows():
         nivel = row["nivel_formacion"]
         _, es_total = identificar_tipo_registro(nivel)
 
-        cursor.execute(
-            """
-        INSERT OR REPLACE INTO formacion_por_nivel_programa
-        (nivel_formacion, regular_meta, regular_ejecucion, campesena_meta,
-         campesena_ejecucion, full_popular_meta, full_popular_ejecucion,
-         total_meta, es_total)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+        filas.append(
             (
                 nivel,
                 row.get("regular_meta"),
@@ -400,46 +1042,88 @@ def importar_formacion_por_nivel(conn, df):
                 row.get("full_popular_ejecucion"),
                 row["total_meta_formacion_profesional"],
                 es_total,
-            ),
+            )
         )
+    return filas
+
+
+def importar_formacion_por_nivel(conn, df, periodo=PERIODO):
+    """Importa formación por nivel y programa"""
+    with instrumentacion.etapa("conversion") as medida:
+        filas = filas_formacion_por_nivel(df)
+        medida["filas"] = len(filas)
+
+    escribir_filas(
+        conn,
+        "formacion_por_nivel_programa",
+        (
+            "nivel_formacion",
+            "regular_meta",
+            "regular_ejecucion",
+            "campesena_meta",
+            "campesena_ejecucion",
+            "full_popular_meta",
+            "full_popular_ejecucion",
+            "total_meta",
+            "es_total",
+            "periodo",
+        ),
+        (fila + (periodo,) for fila in filas),
+        periodo,
+    )
 
-    conn.commit()
     print(f"[OK] Importados {len(df)} registros de formacion por nivel")
+    return len(filas)
 
 
-def importar_programas_relevantes(conn, df):
-    """Importa programas relevantes"""
-    cursor = conn.cursor()
+def filas_programas_relevantes(df):
+    """Filas de programa_relevante a partir de su hoja"""
+    return [
+        (row["Metas Programas Relevantes"], row["meta"], row["ejecucion"], row["tipo"])
+        for _, row in df.iterrows()
+    ]
 
-    for _, row in df.iterrows():
-        cursor.execute(
-            """
-        INSERT OR REPLACE INTO programa_relevante
-        (descripcion, meta, ejecucion, tipo)
-        VALUES (?, ?, ?, ?)
-        """,
-            (
-                row["Metas Programas Relevantes"],
-                row["meta"],
-                row["ejecucion"],
-                row["tipo"],
-            ),
-        )
 
-    conn.commit()
+def importar_programas_relevantes(conn, df, periodo=PERIODO):
+    """Importa programas relevantes"""
+    with instrumentacion.etapa("conversion") as medida:
+        filas = filas_programas_relevantes(df)
+        medida["filas"] = len(filas)
+
+    escribir_filas(
+        conn,
+        "programa_relevante",
+        ("descripcion", "meta", "ejecucion", "tipo", "periodo"),
+        (fila + (periodo,) for fila in filas),
+        periodo,
+    )
+
     print(f"[OK] Importados {len(df)} programas relevantes")
+    return len(filas)
 
 
-def importar_otras_metas(conn, df):
-    """Importa otras metas relacionadas con formación profesional"""
-    cursor = conn.cursor()
+def texto_celda(valor):
+    """Texto normalizado de una celda; las celdas vacías retornan cadena vacía"""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return ""
+    return str(valor).strip()
+
+
+def filas_otras_metas(filas):
+    """
+    Filas de metrica_adicional a partir de la hoja de otras metas.
+    filas puede ser un DataFrame o cualquier iterable de filas (por ejemplo
+    el generador de lector_ods.iterar_filas), sin la fila de encabezado.
+    """
+    if isinstance(filas, pd.DataFrame):
+        filas = filas.itertuples(index=False, name=None)
 
+    metricas = []
     categoria_actual = None
 
-    for idx, row in df.iterrows():
-        col0 = str(row.iloc[0]).strip()
-        col1 = str(row.iloc[1]).strip()
-        col2 = str(row.iloc[2]).strip()
+    for row in filas:
+        row = list(row[:3]) + [None] * (3 - len(row))
+        col0, col1, col2 = (texto_celda(valor) for valor in row)
 
         if col1 in ["META", "meta", "Cupos"] and col2 in [
             "EJECUCIÓN",
@@ -449,217 +1133,546 @@ def importar_otras_metas(conn, df):
             categoria_actual = col0
             continue
 
-        if not categoria_actual or col0 == "nan":
+        if not categoria_actual or not col0:
             continue
 
+        meta_val = None
+        ejec_val = None
+
         try:
-            meta_val = None
-            ejec_val = None
-
-            try:
-                meta_val = float(col1) if col1 != "nan" and col1 != "NaN" else None
-            except:
-                pass
-
-            try:
-                ejec_val = float(col2) if col2 != "nan" and col2 != "NaN" else None
-            except:
-                pass
-
-            if meta_val is not None or ejec_val is not None:
-                es_subtotal, es_total = identificar_tipo_registro(col0)
-
-                tipo_dato = "numero"
-                if meta_val is not None and 0 < meta_val < 1:
-                    tipo_dato = "porcentaje"
-
-                cursor.execute(
-                    """
-                INSERT OR REPLACE INTO metrica_adicional
-                (categoria, nombre_metrica, meta, ejecucion, tipo_dato, es_total)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                    (categoria_actual, col0, meta_val, ejec_val, tipo_dato, es_total),
-                )
-        except Exception as e:
+            meta_val = float(col1) if col1 else None
+        except ValueError:
             pass
 
-    conn.commit()
+        try:
+            ejec_val = float(col2) if col2 else None
+        except ValueError:
+            pass
+
+        if meta_val is not None or ejec_val is not None:
+            es_subtotal, es_total = identificar_tipo_registro(col0)
+
+            tipo_dato = "numero"
+            if meta_val is not None and 0 < meta_val < 1:
+                tipo_dato = "porcentaje"
+
+            metricas.append(
+                (categoria_actual, col0, meta_val, ejec_val, tipo_dato, es_total)
+            )
+
+    return metricas
+
+
+def importar_otras_metas(conn, filas, periodo=PERIODO):
+    """Importa otras metas relacionadas con formación profesional"""
+    with instrumentacion.etapa("conversion") as medida:
+        metricas = filas_otras_metas(filas)
+        medida["filas"] = len(metricas)
+
+    escribir_filas(
+        conn,
+        "metrica_adicional",
+        ("categoria", "nombre_metrica", "meta", "ejecucion", "tipo_dato", "es_total", "periodo"),
+        (fila + (periodo,) for fila in metricas),
+        periodo,
+    )
+
     print(f"[OK] Importadas metricas adicionales")
+    return len(metricas)
 
 
 def generar_relaciones_jerarquicas(conn):
-    """Genera las relaciones jerárquicas entre registros"""
-    cursor = conn.cursor()
+    """
+    Genera las relaciones jerárquicas entre registros con una sola inserción
+    basada en conjuntos: cada padre se enlaza con sus hijos de la misma
+    regional y periodo, para todas las regionales y periodos a la vez.
+    La cantidad de consultas no depende de cuántas regionales haya.
+    """
+    definiciones = [
+        (nombre_padre, nombre_hijo, orden)
+        for orden, (nombre_padre, nombre_hijo) in enumerate(
+            (nombre_padre, nombre_hijo)
+            for nombre_padre, hijos in RELACIONES_FPI
+            for nombre_hijo in hijos
+        )
+    ]
 
-    cursor.execute("DELETE FROM relacion_jerarquica")
+    conn.execute("DELETE FROM relacion_jerarquica")
+
+    # Las búsquedas por nombre usan el índice único de descripcion_meta y el
+    # enlace padre-hijo el de (id_descripcion, id_regional, periodo). El WITH
+    # va después del INSERT para que cursor.rowcount cuente las filas.
+    cursor = conn.execute(
+        f"""
+    INSERT INTO relacion_jerarquica
+    (tabla_origen, id_padre, nombre_padre, id_hijo, nombre_hijo, tabla_hijo, operacion)
+    WITH definicion(nombre_padre, nombre_hijo, orden) AS (
+        VALUES {", ".join("(?, ?, ?)" for _ in definiciones)}
+    )
+    SELECT
+        'meta_formacion_profesional_integral',
+        padre.id,
+        d.nombre_padre,
+        hijo.id,
+        d.nombre_hijo,
+        'meta_formacion_profesional_integral',
+        'suma'
+    FROM definicion d
+    JOIN descripcion_meta dp ON dp.descripcion = d.nombre_padre
+    JOIN descripcion_meta dh ON dh.descripcion = d.nombre_hijo
+    JOIN meta_formacion_profesional_integral padre ON padre.id_descripcion = dp.id
+    JOIN meta_formacion_profesional_integral hijo
+        ON hijo.id_descripcion = dh.id
+        AND hijo.id_regional = padre.id_regional
+        AND hijo.periodo = padre.periodo
+    ORDER BY padre.periodo, padre.id_regional, d.orden
+    """,
+        [valor for definicion in definiciones for valor in definicion],
+    )
 
-    relaciones_fpi = [
-        (
-            "SubTotal Tecnólogos ( E)",
-            [
-                "Tecnólogos Regular - Presencial",
-                "Tecnólogos Regular - Virtual",
-                "Tecnólogos Regular - A Distancia",
-                "Tecnólogos CampeSENA",
-                "Tecnólogos Full Popular",
-            ],
-        ),
-        ("EDUCACION SUPERIOR (=E)", ["SubTotal Tecnólogos ( E)"]),
-        (
-            "SubTotal Operarios (B)",
-            ["Operarios Regular", "Operarios CampeSENA", "Operarios Full Popular"],
-        ),
-        (
-            "SubTotal Auxiliares (A)",
-            ["Auxiliares Regular", "Auxiliares CampeSENA", "Auxiliares Full Popular"],
-        ),
-        (
-            "SubTotal Técnico Laboral (C)",
-            [
-                "Técnico Laboral Regular - Presencial",
-                "Técnico Laboral Regular - Virtual",
-                "Técnico Laboral CampeSENA",
-                "Técnico Laboral Full Popular",
-                "Técnico Laboral Articulación con la Media",
-            ],
-        ),
+    print(f"[OK] Generadas {cursor.rowcount} relaciones jerarquicas")
+    return cursor.rowcount
+
+
+def periodos_sin_agregados(conn):
+    """
+    Periodos con metas FPI pero sin agregados materializados, por ejemplo en
+    bases creadas antes de existir las tablas de agregados
+    """
+    return [
+        periodo
+        for (periodo,) in conn.execute("""
+        SELECT DISTINCT periodo FROM meta_formacion_profesional_integral
+        WHERE periodo NOT IN (SELECT periodo FROM agregado_fpi_descripcion)
+        """)
+    ]
+
+
+def actualizar_agregados(conn, periodos):
+    """
+    Recalcula los agregados materializados de los periodos indicados: borra
+    sus filas y las vuelve a insertar con un GROUP BY sobre ese periodo.
+    Los demás periodos no se tocan. Retorna la cantidad de filas escritas.
+    """
+    filas = 0
+    for periodo in sorted(periodos):
+        conn.execute("DELETE FROM agregado_fpi_descripcion WHERE periodo = ?", (periodo,))
+        cursor = conn.execute(
+            """
+        INSERT INTO agregado_fpi_descripcion
+        (periodo, id_descripcion, regionales, meta, ejecucion, porcentaje,
+         es_subtotal, es_total, nivel_jerarquia)
+        SELECT
+            periodo,
+            id_descripcion,
+            COUNT(DISTINCT id_regional),
+            SUM(meta),
+            SUM(ejecucion),
+            ROUND((SUM(ejecucion) * 100.0 / NULLIF(SUM(meta), 0)), 2),
+            MAX(es_subtotal),
+            MAX(es_total),
+            MAX(nivel_jerarquia)
+        FROM meta_formacion_profesional_integral
+        WHERE periodo = ?
+        GROUP BY id_descripcion
+        """,
+            (periodo,),
+        )
+        filas += cursor.rowcount
+
+        conn.execute("DELETE FROM agregado_fpi_regional WHERE periodo = ?", (periodo,))
+        cursor = conn.execute(
+            """
+        INSERT INTO agregado_fpi_regional
+        (periodo, id_regional, descripciones, meta, ejecucion, porcentaje)
+        SELECT
+            periodo,
+            id_regional,
+            COUNT(*),
+            SUM(meta),
+            SUM(ejecucion),
+            ROUND((SUM(ejecucion) * 100.0 / NULLIF(SUM(meta), 0)), 2)
+        FROM meta_formacion_profesional_integral
+        WHERE periodo = ? AND es_subtotal = 0 AND es_total = 0
+        GROUP BY id_regional
+        """,
+            (periodo,),
+        )
+        filas += cursor.rowcount
+
+    if periodos:
+        print(f"[OK] Agregados FPI actualizados para {', '.join(sorted(periodos))}")
+    return filas
+
+
+def huella_hoja(df):
+    """Huella SHA-256 del contenido de una hoja (encabezados y celdas)"""
+    huella = hashlib.sha256(repr(list(df.columns)).encode("utf-8"))
+    huella.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return huella.hexdigest()
+
+
+def huellas_importadas(conn, archivo):
+    """Huellas registradas en el manifiesto para las hojas de un archivo"""
+    cursor = conn.execute(
+        "SELECT hoja, huella FROM manifiesto_importacion WHERE archivo = ?", (archivo,)
+    )
+    return dict(cursor.fetchall())
+
+
+def registrar_en_manifiesto(conn, archivo, hoja, huella, periodo, filas):
+    """Registra (o actualiza) la huella de una hoja importada"""
+    conn.execute(
+        """
+    INSERT INTO manifiesto_importacion
+    (archivo, hoja, huella, periodo, tablas, filas, fecha_importacion)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(archivo, hoja) DO UPDATE SET
+        huella = excluded.huella,
+        periodo = excluded.periodo,
+        tablas = excluded.tablas,
+        filas = excluded.filas,
+        fecha_importacion = excluded.fecha_importacion
+    """,
         (
-            "TOTAL FORMACIÓN LABORAL (D=A+B+C+T)",
-            [
-                "SubTotal Auxiliares (A)",
-                "SubTotal Operarios (B)",
-                "SubTotal Técnico Laboral (C)",
-                "Profundización Técnica (T)",
-            ],
+            archivo,
+            hoja,
+            huella,
+            periodo,
+            ",".join(TABLAS_POR_HOJA[hoja]),
+            filas,
+            datetime.now().isoformat(timespec="seconds"),
         ),
-        (
-            "TOTAL FORMACION TITULADA (F = D+E)",
-            ["TOTAL FORMACIÓN LABORAL (D=A+B+C+T)", "EDUCACION SUPERIOR (=E)"],
+    )
+
+
+def tablas_modificadas_desde(conn, fecha):
+    """
+    Tablas alimentadas por hojas importadas después de `fecha` (ISO 8601),
+    para que los pasos posteriores reconstruyan solo lo que depende de ellas
+    """
+    cursor = conn.execute(
+        "SELECT tablas FROM manifiesto_importacion WHERE fecha_importacion > ?",
+        (fecha,),
+    )
+    return {tabla for (tablas,) in cursor for tabla in tablas.split(",")}
+
+
+def importar_libro(
+    conn,
+    libro,
+    archivo,
+    periodo=PERIODO,
+    forzar=False,
+    generar_jerarquia=True,
+    dimensiones=None,
+):
+    """
+    Importa un libro dentro de la transacción abierta en conn, sin
+    confirmarla: el llamador la confirma una sola vez con publicar_base (o
+    construir_base publica la base en memoria). Ejecuta los importadores de
+    las hojas cuyo contenido cambió desde la última importación del archivo
+    (todas si forzar=True) y luego actualiza los agregados, los estados de
+    semáforo y, con generar_jerarquia=True, las relaciones jerárquicas
+    (con False quedan a cargo del llamador, por ejemplo una vez por lote).
+    libro: diccionario hoja -> DataFrame o iterable de pares (hoja,
+    DataFrame) en cualquier orden, por ejemplo a medida que terminan de
+    leerse en paralelo.
+    dimensiones: caches de claves compartidas entre los libros de un lote
+    (Dimensiones); si no se entrega se crea una para este libro.
+    Retorna (rendimiento, tablas_modificadas), donde rendimiento es
+    tabla -> (filas, segundos) de cada carga.
+    """
+    # Caches de claves compartidas por todos los importadores de la ejecución
+    if dimensiones is None:
+        dimensiones = Dimensiones(conn)
+
+    importadores = {
+        # NUEVA: Formación regional (solo para metas FPI desagregadas)
+        "formacio_regional": functools.partial(
+            importar_formacion_regional, dimensiones=dimensiones, periodo=periodo
         ),
-        (
-            "SubTotal Programa de Bilingüismo (K = I + J)",
-            [
-                "Programa de Bilingüismo - Virtual (I)",
-                "Programa de Bilingüismo - Presencial (J)",
-            ],
+        # ORIGINALES: Las demás hojas como antes
+        "semaforo": importar_semaforo,
+        "profesional_integral_x_programa": functools.partial(
+            importar_formacion_por_nivel, periodo=periodo
         ),
-        (
-            "TOTAL FORMACION COMPLEMENTARIA (N = G+H+K+L+M)",
-            [
-                "Formación Complementaria - Virtual  (Sin Bilingüismo) (G)",
-                "Formación Complementaria - Presencial (Sin Bilingüismo) (H)",
-                "SubTotal Programa de Bilingüismo (K = I + J)",
-                "Formación Complementaria CampeSENA (L)",
-                "Formación Complementaria Full Popular (M)",
-            ],
+        "nacional_seguimiento_relevantes": functools.partial(
+            importar_programas_relevantes, periodo=periodo
         ),
-        (
-            "TOTAL FORMACION PROFESIONAL INTEGRAL (O=N+F)",
-            [
-                "TOTAL FORMACION TITULADA (F = D+E)",
-                "TOTAL FORMACION COMPLEMENTARIA (N = G+H+K+L+M)",
-            ],
+        "nacional_seguimiento_otras_meta": functools.partial(
+            importar_otras_metas, periodo=periodo
         ),
-    ]
+    }
 
-    for nombre_padre, hijos in relaciones_fpi:
-        cursor.execute(
-            """
-        SELECT mfpi.id FROM meta_formacion_profesional_integral mfpi
-        JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
-        WHERE dm.descripcion = ?
-        """,
-            (nombre_padre,),
-        )
+    huellas_previas = {} if forzar else huellas_importadas(conn, archivo)
 
-        padre_result = cursor.fetchone()
-        if not padre_result:
+    rendimiento = {}
+    tablas_modificadas = set()
+    for hoja, df in libro.items() if isinstance(libro, dict) else libro:
+        importador = importadores[hoja]
+        huella = huella_hoja(df)
+        if huellas_previas.get(hoja) == huella:
+            print(f"[INFO] Hoja {hoja} sin cambios, se omite")
             continue
 
-        id_padre = padre_result[0]
-
-        for nombre_hijo in hijos:
-            cursor.execute(
-                """
-            SELECT mfpi.id FROM meta_formacion_profesional_integral mfpi
-            JOIN descripcion_meta dm ON mfpi.id_descripcion = dm.id
-            WHERE dm.descripcion = ?
-            """,
-                (nombre_hijo,),
+        tabla = TABLAS_POR_HOJA[hoja][0]
+        with instrumentacion.etapa(f"carga:{tabla}") as medida:
+            filas = medida["filas"] = importador(conn, df)
+        rendimiento[tabla] = (filas, medida["segundos"])
+
+        registrar_en_manifiesto(conn, archivo, hoja, huella, periodo, filas)
+        tablas_modificadas.update(TABLAS_POR_HOJA[hoja])
+
+    dimensiones.volcar()
+
+    # Agregados materializados del periodo importado (y de los periodos que
+    # aún no los tengan)
+    periodos = set(periodos_sin_agregados(conn))
+    if "meta_formacion_profesional_integral" in tablas_modificadas:
+        periodos.add(periodo)
+    if periodos:
+        with instrumentacion.etapa("agregados_fpi") as medida:
+            filas = medida["filas"] = actualizar_agregados(conn, periodos)
+        rendimiento["agregados_fpi"] = (filas, medida["segundos"])
+        tablas_modificadas.update(TABLAS_AGREGADOS)
+
+    # Estados de semáforo de los periodos con agregados nuevos; si cambiaron
+    # los rangos, de todos los periodos
+    if "rangos_categorizacion" in tablas_modificadas:
+        periodos = set(clasificacion_semaforo.periodos_con_metas(conn))
+    else:
+        periodos |= set(clasificacion_semaforo.periodos_sin_estado(conn))
+    if periodos:
+        with instrumentacion.etapa(TABLA_ESTADOS) as medida:
+            filas = medida["filas"] = clasificacion_semaforo.actualizar_estados_semaforo(
+                conn, periodos
             )
+        rendimiento[TABLA_ESTADOS] = (filas, medida["segundos"])
+        tablas_modificadas.add(TABLA_ESTADOS)
 
-            hijo_result = cursor.fetchone()
-            if not hijo_result:
-                continue
+    # Las relaciones jerárquicas dependen de la hoja FPI: se generan al final
+    if generar_jerarquia and "meta_formacion_profesional_integral" in tablas_modificadas:
+        with instrumentacion.etapa("relacion_jerarquica") as medida:
+            filas = medida["filas"] = generar_relaciones_jerarquicas(conn)
+        rendimiento["relacion_jerarquica"] = (filas, medida["segundos"])
+        with instrumentacion.etapa("consolidacion"):
+            consolidacion_jerarquica.validar_consolidacion(conn, [periodo])
 
-            id_hijo = hijo_result[0]
+    return rendimiento, tablas_modificadas
+
+
+def _leer_hoja_proceso(ods_file, hoja, lector):
+    """Trabajo de cada proceso: lee una sola hoja y mide su tiempo"""
+    inicio = time.perf_counter()
+    if lector == "stream":
+        df = lector_ods.leer_hoja(ods_file, hoja, **HOJAS[hoja])
+    else:
+        df = pd.read_excel(ods_file, sheet_name=hoja, engine="odf", **HOJAS[hoja])
+    return hoja, df, time.perf_counter() - inicio
+
+
+def leer_hojas_en_paralelo(ods_file, tiempos, procesos=None, lector=LECTOR):
+    """
+    Lee las hojas del libro en paralelo, una por proceso, y genera los pares
+    (hoja, DataFrame) a medida que terminan, para que la escritura en SQLite
+    (serializada en el proceso principal) avance mientras se leen las demás.
+    El tiempo de lectura de cada hoja queda en tiempos[hoja] y en la
+    instrumentación activa, como etapa lectura:<hoja>.
+    """
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [
+            pool.submit(_leer_hoja_proceso, ods_file, hoja, lector) for hoja in HOJAS
+        ]
+        for futuro in as_completed(futuros):
+            hoja, df, segundos = futuro.result()
+            tiempos[hoja] = segundos
+            instrumentacion.registrar(f"lectura:{hoja}", len(df), segundos)
+            yield hoja, df
+
+
+def reportar_tiempos_hojas(tiempos_lectura, rendimiento):
+    """Imprime lectura y escritura por hoja y la hoja en la ruta crítica"""
+    print(f"\n{'Hoja':<36}{'Lectura':>10}{'Escritura':>11}")
+    for hoja, lectura in tiempos_lectura.items():
+        _, escritura = rendimiento.get(TABLAS_POR_HOJA[hoja][0], (0, 0.0))
+        print(f"{hoja:<36}{lectura:>9.3f}s{escritura:>10.3f}s")
+
+    # Las lecturas corren en paralelo: la hoja que más tarda en leerse
+    # determina cuándo puede terminar la escritura serializada
+    critica = max(tiempos_lectura, key=tiempos_lectura.get)
+    _, escritura = rendimiento.get(TABLAS_POR_HOJA[critica][0], (0, 0.0))
+    print(
+        f"[INFO] Ruta critica: {critica} "
+        f"(lectura {tiempos_lectura[critica]:.3f}s + escritura {escritura:.3f}s)"
+    )
 
-            cursor.execute(
-                """
-            INSERT INTO relacion_jerarquica
-            (tabla_origen, id_padre, nombre_padre, id_hijo, nombre_hijo, tabla_hijo, operacion)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-                (
-                    "meta_formacion_profesional_integral",
-                    id_padre,
-                    nombre_padre,
-                    id_hijo,
-                    nombre_hijo,
-                    "meta_formacion_profesional_integral",
-                    "suma",
-                ),
-            )
 
+def periodo_de_archivo(ruta):
+    """Deriva el periodo (YYYY_MM) de un archivo seguimiento_metas_YYYY_MM.ods"""
+    coincidencia = PATRON_ARCHIVO.search(os.path.basename(ruta))
+    if not coincidencia:
+        raise ValueError(
+            f"No se puede derivar el periodo de {ruta}: "
+            "se espera el nombre seguimiento_metas_YYYY_MM.ods"
+        )
+    return f"{coincidencia.group(1)}_{coincidencia.group(2)}"
+
+
+def publicar_base(conn):
+    """
+    Actualiza las estadísticas del planificador y confirma la carga, hecha
+    en una sola transacción sobre el archivo
+    """
+    conn.execute("ANALYZE")
     conn.commit()
-    print(f"[OK] Generadas relaciones jerarquicas")
+    conn.close()
 
 
-def main():
-    """Función principal"""
-    print("Iniciando importación de datos...\n")
+def construir_base(libros, db_file=DB_FILE):
+    """
+    Modo de construcción: crea el esquema y carga todos los libros en una
+    base en memoria, crea los índices después de la carga, ejecuta ANALYZE
+    y publica el resultado con VACUUM INTO en un archivo temporal que luego
+    reemplaza a db_file con un rename atómico. Los lectores ven la base
+    anterior o la nueva completa, nunca una a medio construir.
+    libros: iterable de (archivo, periodo, libro).
+    Retorna (rendimiento, tablas_modificadas) acumulados.
+    """
+    for sufijo in ("-journal", "-wal"):
+        if os.path.exists(db_file + sufijo):
+            raise RuntimeError(
+                f"{db_file}{sufijo} existe: hay una transacción pendiente sobre la base"
+            )
 
-    conn = sqlite3.connect(DB_FILE)
+    conn = sqlite3.connect(":memory:")
+    crear_esquema(conn, con_indices=False)
+
+    rendimiento = {}
+    tablas_modificadas = set()
+    dimensiones = Dimensiones(conn)
+    for archivo, periodo, libro in libros:
+        with instrumentacion.etapa(f"periodo:{periodo}"):
+            rendimiento_libro, tablas = importar_libro(
+                conn,
+                libro,
+                archivo,
+                periodo,
+                forzar=True,
+                generar_jerarquia=False,
+                dimensiones=dimensiones,
+            )
+        for tabla, (filas, segundos) in rendimiento_libro.items():
+            filas_previas, segundos_previos = rendimiento.get(tabla, (0, 0.0))
+            rendimiento[tabla] = (filas_previas + filas, segundos_previos + segundos)
+        tablas_modificadas.update(tablas)
+
+    with instrumentacion.etapa("indices") as medida:
+        crear_indices(conn)
+    print(f"[OK] Indices creados en {medida['segundos']:.3f}s")
+
+    # La jerarquía se genera con los índices ya creados porque los usa en sus joins
+    with instrumentacion.etapa("relacion_jerarquica") as medida:
+        filas = medida["filas"] = generar_relaciones_jerarquicas(conn)
+    rendimiento["relacion_jerarquica"] = (filas, medida["segundos"])
+    with instrumentacion.etapa("consolidacion"):
+        consolidacion_jerarquica.validar_consolidacion(conn)
+
+    with instrumentacion.etapa("publicacion"):
+        # Los triggers de versión se crean al final: durante la carga cada
+        # fila insertada habría actualizado version_datos. Así cada tabla
+        # recibe una sola versión nueva al publicar
+        crear_versiones_datos(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
 
-    crear_esquema(conn)
+        temporal = f"{db_file}.tmp-{os.getpid()}"
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        try:
+            conn.execute("VACUUM INTO ?", (temporal,))
+            conn.close()
+            os.replace(temporal, db_file)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+    print(f"[OK] Base de datos publicada atomicamente en {db_file}")
 
-    print("\nImportando datos...")
+    return rendimiento, tablas_modificadas
 
-    # NUEVA: Formación regional (solo para metas FPI desagregadas)
-    df_regional = pd.read_excel(
-        ODS_FILE, sheet_name="formacio_regional", engine="odf", header=None
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "archivo",
+        nargs="?",
+        default=ODS_FILE,
+        help="Archivo seguimiento_metas_YYYY_MM.ods a importar (el periodo se toma del nombre)",
+    )
+    parser.add_argument(
+        "--completo",
+        action="store_true",
+        help="Importa todas las hojas aunque su huella no haya cambiado",
+    )
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=0,
+        help="Lee las hojas en paralelo con N procesos (0: una sola pasada secuencial)",
     )
-    importar_formacion_regional(conn, df_regional)
+    parser.add_argument(
+        "--reconstruir",
+        action="store_true",
+        help="Construye la base desde cero en memoria y la publica de forma atómica",
+    )
+    instrumentacion.agregar_argumentos(parser)
+    args = parser.parse_args(argv)
 
-    # ORIGINALES: Las demás hojas como antes
-    df_semaforo = pd.read_excel(ODS_FILE, sheet_name="semaforo", engine="odf")
-    importar_semaforo(conn, df_semaforo)
+    periodo = periodo_de_archivo(args.archivo)
 
-    df_por_nivel = pd.read_excel(
-        ODS_FILE, sheet_name="profesional_integral_x_programa", engine="odf"
-    )
-    importar_formacion_por_nivel(conn, df_por_nivel)
+    print("Iniciando importación de datos...\n")
+    inicio = time.perf_counter()
+    instrumentos = instrumentacion.iniciar("importar_a_sqlite", args.perfilar)
+
+    tiempos_lectura = {}
+    if args.procesos:
+        libro = leer_hojas_en_paralelo(args.archivo, tiempos_lectura, args.procesos)
+    else:
+        with instrumentacion.etapa("lectura") as medida:
+            libro = cargar_libro(args.archivo)
+            medida["filas"] = sum(len(df) for df in libro.values())
+
+    if args.reconstruir:
+        print(f"Construyendo la base desde cero con el periodo {periodo}...")
+        rendimiento, tablas_modificadas = construir_base(
+            [(os.path.basename(args.archivo), periodo, libro)]
+        )
+    else:
+        conn = sqlite3.connect(DB_FILE)
+        crear_esquema(conn)
 
-    df_programas = pd.read_excel(
-        ODS_FILE,
-        sheet_name="nacional_seguimiento_relevantes",
-        engine="odf",
-    )
-    importar_programas_relevantes(conn, df_programas)
+        print(f"\nImportando datos del periodo {periodo}...")
 
-    df_otras = pd.read_excel(
-        ODS_FILE,
-        sheet_name="nacional_seguimiento_otras_meta",
-        engine="odf",
-    )
-    importar_otras_metas(conn, df_otras)
+        # Una sola transacción para toda la importación
+        with instrumentacion.etapa(f"periodo:{periodo}"):
+            rendimiento, tablas_modificadas = importar_libro(
+                conn, libro, os.path.basename(args.archivo), periodo, forzar=args.completo
+            )
 
-    generar_relaciones_jerarquicas(conn)
+        with instrumentacion.etapa("publicacion"):
+            publicar_base(conn)
 
-    conn.close()
+    instrumentacion.finalizar(instrumentos, args.reporte)
+    if tiempos_lectura:
+        reportar_tiempos_hojas(tiempos_lectura, rendimiento)
+
+    if tablas_modificadas:
+        print(f"\n[INFO] Tablas modificadas: {', '.join(sorted(tablas_modificadas))}")
+    else:
+        print("\n[INFO] Ninguna hoja cambio desde la ultima importacion")
 
-    print("\n[OK] Importacion completada exitosamente")
+    print(f"\n[OK] Importacion completada exitosamente en {time.perf_counter() - inicio:.3f}s")
     print(f"  Base de datos: {DB_FILE}")
 
 
@@ -0,0 +1,153 @@
+"""
+Script para importar en lote varios archivos mensuales seguimiento_metas_YYYY_MM.ods.
+Los libros se parsean en paralelo en un pool de procesos y la escritura en
+SQLite se hace en un único paso, en orden de periodo, sobre una sola base.
+"""
+
+import argparse
+import glob
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import consolidacion_jerarquica
+import importar_a_sqlite as imp
+import instrumentacion
+from cache_dimensiones import Dimensiones
+
+
+def listar_archivos(rutas):
+    """
+    Expande directorios y patrones glob a la lista de archivos mensuales,
+    ordenada por periodo
+    """
+    archivos = set()
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            ruta = os.path.join(ruta, "seguimiento_metas_*.ods")
+        archivos.update(
+            archivo
+            for archivo in glob.glob(ruta)
+            if imp.PATRON_ARCHIVO.search(os.path.basename(archivo))
+        )
+    return sorted(archivos, key=imp.periodo_de_archivo)
+
+
+def leer_archivo(ruta):
+    """Trabajo de cada proceso: parsea un libro completo"""
+    inicio = time.perf_counter()
+    libro = imp.cargar_libro(ruta)
+    return libro, time.perf_counter() - inicio
+
+
+def leer_en_paralelo(archivos, procesos=None):
+    """
+    Parsea los archivos en un pool de procesos y genera (archivo, periodo,
+    libro) en orden de periodo, aunque los libros terminen en otro orden
+    """
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for archivo, (libro, segundos) in zip(archivos, pool.map(leer_archivo, archivos)):
+            print(f"\n[INFO] {os.path.basename(archivo)} parseado en {segundos:.3f}s")
+            instrumentacion.registrar(
+                f"lectura:{os.path.basename(archivo)}",
+                sum(len(df) for df in libro.values()),
+                segundos,
+            )
+            yield os.path.basename(archivo), imp.periodo_de_archivo(archivo), libro
+
+
+def importar_lote(
+    archivos, procesos=None, forzar=False, reconstruir=False, db_file=imp.DB_FILE
+):
+    """
+    Parsea los archivos en paralelo e importa sus datos en un solo paso de
+    escritura. Con reconstruir=True la base se construye desde cero en
+    memoria y se publica de forma atómica (imp.construir_base).
+    Retorna las tablas modificadas.
+    """
+    libros = leer_en_paralelo(archivos, procesos)
+
+    if reconstruir:
+        _, tablas_modificadas = imp.construir_base(libros, db_file)
+        return tablas_modificadas
+
+    conn = sqlite3.connect(db_file)
+    imp.crear_esquema(conn)
+
+    tablas_modificadas = set()
+    dimensiones = Dimensiones(conn)
+    for archivo, periodo, libro in libros:
+        with instrumentacion.etapa(f"periodo:{periodo}"):
+            _, tablas = imp.importar_libro(
+                conn,
+                libro,
+                archivo,
+                periodo,
+                forzar=forzar,
+                generar_jerarquia=False,
+                dimensiones=dimensiones,
+            )
+        tablas_modificadas.update(tablas)
+
+    if "meta_formacion_profesional_integral" in tablas_modificadas:
+        with instrumentacion.etapa("relacion_jerarquica") as medida:
+            medida["filas"] = imp.generar_relaciones_jerarquicas(conn)
+        with instrumentacion.etapa("consolidacion"):
+            consolidacion_jerarquica.validar_consolidacion(conn)
+
+    with instrumentacion.etapa("publicacion"):
+        imp.publicar_base(conn)
+    return tablas_modificadas
+
+
+def main(argv=None):
+    """Función principal"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "rutas",
+        nargs="+",
+        help="Directorios o patrones glob con archivos seguimiento_metas_YYYY_MM.ods",
+    )
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=None,
+        help="Cantidad de procesos para parsear (por defecto, uno por núcleo)",
+    )
+    parser.add_argument(
+        "--completo",
+        action="store_true",
+        help="Importa todas las hojas aunque su huella no haya cambiado",
+    )
+    parser.add_argument(
+        "--reconstruir",
+        action="store_true",
+        help="Construye la base desde cero en memoria y la publica de forma atómica",
+    )
+    instrumentacion.agregar_argumentos(parser)
+    args = parser.parse_args(argv)
+
+    archivos = listar_archivos(args.rutas)
+    if not archivos:
+        parser.error("No se encontraron archivos seguimiento_metas_YYYY_MM.ods")
+
+    print(f"Importando {len(archivos)} archivos en lote...")
+    for archivo in archivos:
+        print(f"  - {imp.periodo_de_archivo(archivo)}: {archivo}")
+
+    inicio = time.perf_counter()
+    instrumentos = instrumentacion.iniciar("importar_lote", args.perfilar)
+    tablas_modificadas = importar_lote(
+        archivos, args.procesos, args.completo, args.reconstruir
+    )
+
+    instrumentacion.finalizar(instrumentos, args.reporte)
+    if tablas_modificadas:
+        print(f"\n[INFO] Tablas modificadas: {', '.join(sorted(tablas_modificadas))}")
+    print(f"\n[OK] Lote importado en {time.perf_counter() - inicio:.3f}s")
+    print(f"  Base de datos: {imp.DB_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Instrumentación por etapas de los importadores y exportadores.
+Cada script crea una Instrumentacion al iniciar (iniciar) y marca sus etapas
+con el administrador de contexto etapa(nombre), que mide el tiempo, las
+filas procesadas (las que el código asigna a medida["filas"]), las filas por
+segundo y el pico de memoria residente de la etapa. Las etapas medidas en
+otro proceso (por ejemplo, la lectura de libros en un pool) se agregan con
+registrar(nombre, filas, segundos). Sin una instrumentación activa, etapa y
+registrar solo miden el tiempo, de modo que las funciones instrumentadas
+pueden llamarse desde otros scripts sin cambios.
+
+Al terminar, el script imprime la tabla de etapas y, solo si se pide con
+--reporte, guarda un reporte JSON de la ejecución. Con perfilar=ETAPA las
+etapas con ese nombre (o con nombres ETAPA:...) se ejecutan bajo cProfile:
+las funciones más costosas se imprimen y se incluyen en el JSON, y el
+perfil queda en un archivo .prof junto al reporte.
+"""
+
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage, el pico de memoria queda nulo
+    resource = None
+
+REPORTES_DIR = "reportes_rendimiento"
+
+# Funciones del perfil que se imprimen y se incluyen en el reporte
+FUNCIONES_PERFIL = 25
+
+# Instrumentación del script en ejecución (ver iniciar)
+_activa = None
+
+
+def pico_rss():
+    """
+    Pico de memoria residente (MB) del proceso: VmHWM de /proc, que puede
+    reiniciarse por etapa, o ru_maxrss si no hay /proc. None si no se puede medir.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+
+def reiniciar_pico_rss():
+    """
+    Lleva el pico de memoria residente al uso actual (Linux 4.0+), para que
+    el pico medido al final de una etapa sea el de esa etapa. Retorna False
+    si no es posible: el pico medido es entonces el del proceso hasta ese punto.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def pico_rss_hijos():
+    """Pico de memoria residente (MB) del mayor proceso hijo terminado, o None"""
+    if resource is None:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+
+def filas_por_segundo(filas, segundos):
+    """Filas por segundo, o None si la etapa no cuenta filas o no tomó tiempo medible"""
+    if filas is None or segundos <= 0:
+        return None
+    return filas / segundos
+
+
+class Instrumentacion:
+    """Etapas medidas de una ejecución, con perfil opcional de una etapa"""
+
+    def __init__(self, script, perfilar=None):
+        self.script = script
+        self.perfilar = perfilar
+        self.fecha = datetime.now()
+        self.inicio = time.perf_counter()
+        self.etapas = []
+        self.abiertas = []
+        self.perfil = cProfile.Profile() if perfilar else None
+        self.perfiladas = 0
+        # Si la etapa perfilada no corre en este proceso el perfil queda vacío
+        self.con_perfil = False
+        # Los reinicios por etapa borran el pico del proceso: se conserva aquí
+        self.pico_maximo = 0.0
+
+    def acumular_pico(self, pico):
+        """Conserva en las etapas abiertas el mayor pico visto en sus etapas internas"""
+        if pico is None:
+            return
+        self.pico_maximo = max(self.pico_maximo, pico)
+        for abierta in self.abiertas:
+            abierta["pico_interno"] = max(abierta.get("pico_interno", pico), pico)
+
+    def perfila(self, nombre):
+        return self.perfil is not None and (
+            nombre == self.perfilar or nombre.startswith(f"{self.perfilar}:")
+        )
+
+    @contextmanager
+    def etapa(self, nombre, filas=None):
+        """
+        Mide una etapa. Retorna el diccionario de la medida: el código de la
+        etapa puede asignar medida["filas"] y, al salir, medida["segundos"]
+        queda disponible para el llamador.
+        """
+        # Las etapas se listan en el orden en que empiezan, con su nivel de anidamiento
+        medida = {"nombre": nombre, "filas": filas, "nivel": len(self.abiertas)}
+        self.etapas.append(medida)
+        # Reiniciar el pico descartaría el de las etapas que contienen a esta
+        self.acumular_pico(pico_rss())
+        reiniciar_pico_rss()
+        self.abiertas.append(medida)
+        perfilada = self.perfila(nombre)
+        if perfilada:
+            self.perfiladas += 1
+            self.con_perfil = True
+            if self.perfiladas == 1:
+                self.perfil.enable()
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        finally:
+            medida["segundos"] = time.perf_counter() - inicio
+            if perfilada:
+                self.perfiladas -= 1
+                if self.perfiladas == 0:
+                    self.perfil.disable()
+            self.abiertas.pop()
+            pico = pico_rss()
+            if pico is not None:
+                pico = max(pico, medida.pop("pico_interno", pico))
+            self.acumular_pico(pico)
+            medida["pico_rss_mb"] = pico
+
+    def pico_proceso(self):
+        """Pico de memoria residente (MB) del proceso en toda la ejecución"""
+        pico = pico_rss()
+        return None if pico is None else max(pico, self.pico_maximo)
+
+    def registrar(self, nombre, filas, segundos):
+        """Agrega una etapa medida en otro proceso (sin pico de memoria)"""
+        self.etapas.append(
+            {
+                "nombre": nombre,
+                "filas": filas,
+                "segundos": segundos,
+                "pico_rss_mb": None,
+                "nivel": len(self.abiertas),
+                "externa": True,
+            }
+        )
+
+    def funciones_perfil(self, cantidad=FUNCIONES_PERFIL):
+        """Funciones con mayor tiempo acumulado en las etapas perfiladas"""
+        estadisticas = pstats.Stats(self.perfil, stream=io.StringIO())
+        funciones = sorted(
+            estadisticas.stats.items(), key=lambda item: item[1][3], reverse=True
+        )
+        return [
+            {
+                "funcion": f"{os.path.basename(archivo)}:{linea}({nombre})",
+                "llamadas": llamadas,
+                "tiempo_propio": round(propio, 6),
+                "tiempo_acumulado": round(acumulado, 6),
+            }
+            for (archivo, linea, nombre), (_, llamadas, propio, acumulado, _) in funciones[
+                :cantidad
+            ]
+        ]
+
+    def reporte(self):
+        """Reporte de la ejecución como diccionario serializable"""
+        segundos = time.perf_counter() - self.inicio
+        reporte = {
+            "script": self.script,
+            "argumentos": sys.argv[1:],
+            "fecha": self.fecha.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "procesadores": os.cpu_count(),
+            "segundos": round(segundos, 6),
+            "pico_rss_mb": self.pico_proceso(),
+            "pico_rss_hijos_mb": pico_rss_hijos(),
+            "etapas": [
+                {
+                    "nombre": medida["nombre"],
+                    "nivel": medida["nivel"],
+                    "filas": medida["filas"],
+                    "segundos": round(medida["segundos"], 6),
+                    "filas_por_segundo": filas_por_segundo(medida["filas"], medida["segundos"]),
+                    "pico_rss_mb": medida["pico_rss_mb"],
+                }
+                for medida in self.etapas
+            ],
+        }
+        if self.con_perfil:
+            reporte["perfil"] = {
+                "etapa": self.perfilar,
+                "funciones": self.funciones_perfil(),
+            }
+        return reporte
+
+    def reportar(self):
+        """Imprime filas, tiempo, filas/s y pico de memoria de cada etapa"""
+        print(f"\n{'Etapa':<48}{'Filas':>9}{'Tiempo':>10}{'Filas/s':>12}{'Pico RSS':>12}")
+        for medida in self.etapas:
+            nombre = "  " * medida["nivel"] + medida["nombre"]
+            filas = "" if medida["filas"] is None else medida["filas"]
+            por_segundo = filas_por_segundo(medida["filas"], medida["segundos"])
+            por_segundo = "" if por_segundo is None else f"{por_segundo:.0f}"
+            pico = "" if medida["pico_rss_mb"] is None else f"{medida['pico_rss_mb']:.1f} MB"
+            print(
+                f"{nombre:<48}{filas:>9}{medida['segundos']:>9.3f}s"
+                f"{por_segundo:>12}{pico:>12}"
+            )
+
+    def guardar(self, ruta=None):
+        """
+        Guarda el reporte JSON en ruta o, si ruta es un directorio (por
+        defecto REPORTES_DIR), dentro de él con el nombre del script y la
+        fecha, y si hubo perfil, el archivo .prof a su lado.
+        Retorna la ruta del reporte.
+        """
+        if ruta is None or ruta == REPORTES_DIR or os.path.isdir(ruta):
+            directorio = ruta or REPORTES_DIR
+            os.makedirs(directorio, exist_ok=True)
+            ruta = os.path.join(
+                directorio, f"{self.script}_{self.fecha.strftime('%Y%m%d_%H%M%S')}.json"
+            )
+        reporte = self.reporte()
+        with open(f"{ruta}.tmp", "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        os.replace(f"{ruta}.tmp", ruta)
+
+        if self.con_perfil:
+            self.perfil.dump_stats(f"{os.path.splitext(ruta)[0]}.prof")
+        return ruta
+
+    def reportar_perfil(self, cantidad=FUNCIONES_PERFIL):
+        """Imprime las funciones con mayor tiempo acumulado de las etapas perfiladas"""
+        if self.perfil is None:
+            return
+        if not self.con_perfil:
+            print(
+                f"\n[WARN] Sin perfil: ninguna etapa {self.perfilar} (o {self.perfilar}:...) "
+                "se ejecuto en este proceso"
+            )
+            perfilables = sorted({
+                medida["nombre"].split(":")[0]
+                for medida in self.etapas
+                if not medida.get("externa")
+            })
+            print(f"[INFO] Etapas que pueden perfilarse: {', '.join(perfilables)}")
+            return
+        print(f"\n[INFO] Perfil de la etapa {self.perfilar} (tiempo acumulado):")
+        pstats.Stats(self.perfil, stream=sys.stdout).sort_stats("cumulative").print_stats(
+            cantidad
+        )
+
+
+def iniciar(script, perfilar=None):
+    """Crea la instrumentación del script y la deja activa para etapa y registrar"""
+    global _activa
+    _activa = Instrumentacion(script, perfilar)
+    return _activa
+
+
+@contextmanager
+def etapa(nombre, filas=None):
+    """Etapa de la instrumentación activa; sin ella solo mide el tiempo"""
+    if _activa is not None:
+        with _activa.etapa(nombre, filas) as medida:
+            yield medida
+        return
+
+    medida = {"nombre": nombre, "filas": filas}
+    inicio = time.perf_counter()
+    try:
+        yield medida
+    finally:
+        medida["segundos"] = time.perf_counter() - inicio
+
+
+def registrar(nombre, filas, segundos):
+    """Agrega a la instrumentación activa una etapa medida en otro proceso"""
+    if _activa is not None:
+        _activa.registrar(nombre, filas, segundos)
+
+
+def agregar_argumentos(parser):
+    """Agrega --reporte y --perfilar a la línea de comandos de un script"""
+    parser.add_argument(
+        "--reporte",
+        nargs="?",
+        const=REPORTES_DIR,
+        default=None,
+        metavar="RUTA",
+        help="Guarda el reporte JSON de rendimiento en RUTA (archivo o directorio; "
+        f"sin RUTA, en {REPORTES_DIR}/). Sin --reporte no se guarda",
+    )
+    parser.add_argument(
+        "--perfilar",
+        metavar="ETAPA",
+        default=None,
+        help="Ejecuta la etapa indicada (o sus etapas ETAPA:...) bajo cProfile",
+    )
+
+
+def finalizar(instrumentacion, ruta=None):
+    """
+    Imprime las etapas y el perfil, guarda el reporte si se indica ruta (ver
+    guardar) y desactiva la instrumentación. Retorna la ruta del reporte o None.
+    """
+    global _activa
+    instrumentacion.reportar()
+    instrumentacion.reportar_perfil()
+    if ruta is not None:
+        ruta = instrumentacion.guardar(ruta)
+        print(f"[OK] Reporte de rendimiento: {ruta}")
+    if _activa is instrumentacion:
+        _activa = None
+    return ruta
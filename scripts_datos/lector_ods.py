@@ -0,0 +1,217 @@
+"""
+Lector por streaming de hojas ODS basado en iterparse.
+Recorre el content.xml del libro sin construir el DOM completo de odfpy:
+las filas se entregan de forma perezosa y se descartan del árbol apenas se
+procesan, de modo que el recorrido no crece con el tamaño del libro. Quien
+convierte las filas en DataFrame (a_dataframe, leer_hojas) sí retiene la hoja
+completa en memoria.
+"""
+
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+NS_TABLE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+NS_OFFICE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+NS_TEXT = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+TABLA = f"{{{NS_TABLE}}}table"
+FILA = f"{{{NS_TABLE}}}table-row"
+CELDA = f"{{{NS_TABLE}}}table-cell"
+CELDA_CUBIERTA = f"{{{NS_TABLE}}}covered-table-cell"
+NOMBRE_TABLA = f"{{{NS_TABLE}}}name"
+FILAS_REPETIDAS = f"{{{NS_TABLE}}}number-rows-repeated"
+COLUMNAS_REPETIDAS = f"{{{NS_TABLE}}}number-columns-repeated"
+TIPO_VALOR = f"{{{NS_OFFICE}}}value-type"
+VALOR = f"{{{NS_OFFICE}}}value"
+VALOR_FECHA = f"{{{NS_OFFICE}}}date-value"
+ANOTACION = f"{{{NS_OFFICE}}}annotation"
+PARRAFO = f"{{{NS_TEXT}}}p"
+ESPACIOS = f"{{{NS_TEXT}}}s"
+CANTIDAD_ESPACIOS = f"{{{NS_TEXT}}}c"
+
+# Elementos que se podan del árbol en cuanto termina su evento "end"
+PODABLES = {TABLA, FILA}
+
+
+def _eventos(ods_file):
+    """
+    Genera los eventos (start/end) del content.xml y poda filas y tablas
+    ya procesadas, manteniendo en memoria solo la fila en curso
+    """
+    with zipfile.ZipFile(ods_file) as libro, libro.open("content.xml") as contenido:
+        pila = []
+        for evento, elem in ET.iterparse(contenido, events=("start", "end")):
+            if evento == "start":
+                pila.append(elem)
+                yield evento, elem
+            else:
+                pila.pop()
+                yield evento, elem
+                if elem.tag in PODABLES and pila:
+                    pila[-1].remove(elem)
+
+
+def _texto(elem):
+    """Texto de un fragmento, expandiendo las secuencias text:s de espacios"""
+    partes = [elem.text or ""]
+    for hijo in elem:
+        if hijo.tag == ESPACIOS:
+            partes.append(" " * int(hijo.get(CANTIDAD_ESPACIOS, 1)))
+        elif hijo.tag != ANOTACION:
+            partes.append(_texto(hijo))
+        partes.append(hijo.tail or "")
+    return "".join(partes)
+
+
+def valor_celda(celda):
+    """Convierte una celda ODS a valor Python (None si está vacía)"""
+    if celda.tag == CELDA_CUBIERTA:
+        return None
+
+    texto = "".join(_texto(p) for p in celda if p.tag == PARRAFO)
+    if texto == "#N/A":
+        return None
+
+    tipo = celda.get(TIPO_VALOR)
+    if tipo is None:
+        return None
+    if tipo == "float":
+        valor = float(celda.get(VALOR))
+        return int(valor) if valor == int(valor) else valor
+    if tipo in ("percentage", "currency"):
+        return float(celda.get(VALOR))
+    if tipo == "boolean":
+        return texto == "TRUE"
+    if tipo == "date":
+        return pd.Timestamp(celda.get(VALOR_FECHA))
+    if tipo == "time":
+        return pd.Timestamp(texto).time()
+    return texto
+
+
+def _valores_fila(fila):
+    """
+    Valores de una fila sin celdas vacías al final. Las celdas vacías
+    repetidas (number-columns-repeated) solo se cuentan y se materializan
+    si aparece un valor después de ellas.
+    """
+    valores = []
+    vacias = 0
+    for celda in fila:
+        if celda.tag not in (CELDA, CELDA_CUBIERTA):
+            continue
+        repeticiones = int(celda.get(COLUMNAS_REPETIDAS, 1))
+        valor = valor_celda(celda)
+        if valor is None:
+            vacias += repeticiones
+        else:
+            valores.extend([None] * vacias)
+            vacias = 0
+            valores.extend([valor] * repeticiones)
+    return valores
+
+
+def _filas_tabla(eventos):
+    """
+    Consume los eventos de una tabla hasta su cierre y genera sus filas.
+    Las filas vacías se acumulan como contador y solo se entregan si hay
+    una fila con datos después, por lo que la lectura termina en la
+    última fila usada.
+    """
+    filas_vacias = 0
+    for evento, elem in eventos:
+        if evento != "end":
+            continue
+        if elem.tag == TABLA:
+            return
+        if elem.tag != FILA:
+            continue
+
+        valores = _valores_fila(elem)
+        repeticiones = int(elem.get(FILAS_REPETIDAS, 1))
+        if not valores:
+            filas_vacias += repeticiones
+            continue
+
+        for _ in range(filas_vacias):
+            yield []
+        filas_vacias = 0
+        for _ in range(repeticiones):
+            yield list(valores)
+
+
+def iterar_hojas(ods_file, hojas=None):
+    """
+    Recorre el libro una sola vez y genera tuplas (nombre_hoja, filas) en
+    el orden del documento, solo para las hojas pedidas (todas si es None).
+    Cada `filas` es un generador que debe consumirse antes de avanzar a la
+    siguiente hoja; si no se consume, se descarta al avanzar.
+    """
+    pendientes = set(hojas) if hojas is not None else None
+    eventos = _eventos(ods_file)
+
+    for evento, elem in eventos:
+        if evento != "start" or elem.tag != TABLA:
+            continue
+
+        nombre = elem.get(NOMBRE_TABLA)
+        if pendientes is not None and nombre not in pendientes:
+            for _ in _filas_tabla(eventos):
+                pass
+            continue
+
+        filas = _filas_tabla(eventos)
+        yield nombre, filas
+        for _ in filas:
+            pass
+
+        if pendientes is not None:
+            pendientes.discard(nombre)
+            if not pendientes:
+                break
+
+    eventos.close()
+
+    if pendientes:
+        raise ValueError(f"Hojas no encontradas en {ods_file}: {sorted(pendientes)}")
+
+
+def iterar_filas(ods_file, hoja):
+    """Genera perezosamente las filas (listas de valores) de una hoja"""
+    for _, filas in iterar_hojas(ods_file, [hoja]):
+        yield from filas
+
+
+def a_dataframe(filas, header=0):
+    """
+    Construye un DataFrame equivalente al de pd.read_excel(engine="odf")
+    a partir de filas del lector
+    """
+    datos = [["" if valor is None else valor for valor in fila] for fila in filas]
+    if not datos:
+        return pd.DataFrame()
+
+    ancho = max(len(fila) for fila in datos)
+    for fila in datos:
+        fila.extend([""] * (ancho - len(fila)))
+
+    return TextParser(datos, header=header, skip_blank_lines=False).read()
+
+
+def leer_hoja(ods_file, hoja, header=0):
+    """Lee una hoja completa como DataFrame sin pasar por el DOM de odfpy"""
+    return a_dataframe(iterar_filas(ods_file, hoja), header=header)
+
+
+def leer_hojas(ods_file, opciones_por_hoja):
+    """
+    Lee varias hojas en una sola pasada sobre el libro.
+    opciones_por_hoja: diccionario hoja -> kwargs de a_dataframe
+    """
+    return {
+        nombre: a_dataframe(filas, **opciones_por_hoja[nombre])
+        for nombre, filas in iterar_hojas(ods_file, opciones_por_hoja)
+    }
@@ -0,0 +1,196 @@
+"""
+Motor de las especificaciones declarativas de exportación.
+Cada conjunto exportado se describe con un diccionario:
+
+    {
+        "consulta": "SELECT ...",       # una sola consulta por conjunto
+        "agrupar": ("categoria",),      # columnas de anidamiento (opcional)
+        "campos": {                     # proyección de cada fila (opcional)
+            "nombre": "nombre_metrica",             # alias de una columna
+            "es_total": ("es_total", bool),         # columna con conversión
+            "componentes": {"meta": "regular_meta"},  # objeto anidado
+        },
+        "valor": "nombre_hijo",         # en lugar de campos: un valor por fila
+        "orden": "primer_id",           # orden de las filas dentro de cada grupo
+        "flujo": True,                  # entrega las filas como generador
+    }
+
+o con "partes": {clave: especificación} para un documento compuesto de varias
+consultas, y "registros": la parte que se cuenta como registros.
+
+El motor ejecuta la consulta una vez y agrupa en memoria en una sola pasada:
+con "agrupar" el resultado es un diccionario anidado por los valores de esas
+columnas (en el orden en que llegan las filas) con la lista de filas en cada
+hoja; las columnas de agrupación no se repiten en las filas. Sin "campos" cada
+fila se entrega con todas sus columnas, con los alias de la consulta.
+
+Una especificación también puede ser una función lector(cursor) que retorna
+(datos, registros), para documentos que no son una proyección de filas.
+
+Con un cache (cache_consultas.CacheConsultas) las consultas que no son de
+flujo se leen del cache cuando ya se ejecutaron sobre la misma versión de los
+datos.
+"""
+
+import contextlib
+import inspect
+import sqlite3
+
+# Filas leídas del cursor por bloque
+FILAS_POR_BLOQUE = 500
+
+# Tablas de control que no se registran como tablas leídas
+TABLAS_CONTROL = {"version_datos"}
+
+# Registros de tablas activos por conexión (pueden anidarse)
+_registros = {}
+
+
+@contextlib.contextmanager
+def registrar_tablas(conn):
+    """
+    Registra las tablas que leen las sentencias preparadas dentro del bloque.
+    Los bloques pueden anidarse: cada tabla se anota en todos los registros
+    activos de la conexión.
+    """
+    tablas = set()
+    activos = _registros.setdefault(id(conn), [])
+    activos.append(tablas)
+
+    def autorizar(accion, tabla, *_):
+        if accion == sqlite3.SQLITE_READ and tabla and tabla not in TABLAS_CONTROL:
+            anotar_tablas(conn, (tabla,))
+        return sqlite3.SQLITE_OK
+
+    if len(activos) == 1:
+        conn.set_authorizer(autorizar)
+    try:
+        yield tablas
+    finally:
+        activos.pop()
+        if not activos:
+            del _registros[id(conn)]
+            conn.set_authorizer(None)
+
+
+def anotar_tablas(conn, tablas):
+    """Anota tablas leídas en los registros activos de la conexión"""
+    for registro in _registros.get(id(conn), ()):
+        registro.update(tablas)
+
+
+def iterar_filas(cursor, tamano=FILAS_POR_BLOQUE):
+    """Genera las filas del cursor como diccionarios, leyéndolas en bloques"""
+    while True:
+        bloque = cursor.fetchmany(tamano)
+        if not bloque:
+            return
+        for row in bloque:
+            yield dict(row)
+
+
+def proyectar(fila, campos):
+    """Construye el objeto de salida de una fila según `campos`"""
+    resultado = {}
+    for nombre, origen in campos.items():
+        if isinstance(origen, dict):
+            resultado[nombre] = proyectar(fila, origen)
+        elif isinstance(origen, tuple):
+            columna, conversion = origen
+            resultado[nombre] = conversion(fila[columna])
+        else:
+            resultado[nombre] = fila[origen]
+    return resultado
+
+
+def transformar(fila, especificacion, excluir=()):
+    """Salida de una fila: un valor, los campos indicados o todas sus columnas"""
+    if "valor" in especificacion:
+        return fila[especificacion["valor"]]
+    if "campos" in especificacion:
+        return proyectar(fila, especificacion["campos"])
+    return {columna: valor for columna, valor in fila.items() if columna not in excluir}
+
+
+def agrupar(filas, especificacion):
+    """
+    Anida las filas por las columnas de especificacion["agrupar"] en una sola
+    pasada. Retorna (diccionario anidado, cantidad de filas).
+    """
+    columnas = especificacion["agrupar"]
+    orden = especificacion.get("orden")
+    excluir = set(columnas) | ({orden} if orden else set())
+
+    grupos = {}
+    hojas = []
+    registros = 0
+    for fila in filas:
+        nodo = grupos
+        for columna in columnas[:-1]:
+            nodo = nodo.setdefault(fila[columna], {})
+        hoja = nodo.get(fila[columnas[-1]])
+        if hoja is None:
+            hoja = nodo[fila[columnas[-1]]] = []
+            hojas.append(hoja)
+        salida = transformar(fila, especificacion, excluir)
+        hoja.append((fila[orden], salida) if orden else salida)
+        registros += 1
+
+    if orden:
+        for hoja in hojas:
+            hoja.sort(key=lambda par: par[0])
+            hoja[:] = [salida for _, salida in hoja]
+    return grupos, registros
+
+
+def ejecutar(cursor, especificacion, parametros=(), cache=None):
+    """
+    Ejecuta una especificación y retorna (datos, registros). Con "flujo" los
+    datos son un generador de filas y registros es None. Con cache, las
+    consultas que no son de flujo se resuelven con cache.consultar.
+    """
+    if callable(especificacion):
+        return especificacion(cursor)
+
+    if "partes" in especificacion:
+        documento = {}
+        cantidades = {}
+        for clave, parte in especificacion["partes"].items():
+            documento[clave], cantidades[clave] = ejecutar(
+                cursor, parte, parametros, cache
+            )
+        return documento, cantidades.get(especificacion.get("registros"), len(documento))
+
+    if cache is not None and not especificacion.get("flujo"):
+        filas = cache.consultar(cursor.connection, especificacion["consulta"], parametros)
+    else:
+        cursor.execute(especificacion["consulta"], parametros)
+        filas = iterar_filas(cursor)
+
+    if "agrupar" in especificacion:
+        return agrupar(filas, especificacion)
+
+    datos = (transformar(fila, especificacion) for fila in filas)
+    if especificacion.get("flujo"):
+        return datos, None
+    datos = list(datos)
+    return datos, len(datos)
+
+
+def huella(especificacion):
+    """
+    Texto estable que describe una especificación, para detectar cambios en
+    su definición (las funciones se describen por su código fuente)
+    """
+    if isinstance(especificacion, dict):
+        return "{" + ", ".join(
+            f"{clave!r}: {huella(valor)}" for clave, valor in especificacion.items()
+        ) + "}"
+    if isinstance(especificacion, tuple):
+        return "(" + ", ".join(huella(valor) for valor in especificacion) + ")"
+    if callable(especificacion):
+        try:
+            return inspect.getsource(especificacion)
+        except (OSError, TypeError):
+            return especificacion.__qualname__
+    return repr(especificacion)
@@ -0,0 +1,6 @@
+"""Configuración de pytest: los scripts de scripts_datos se importan como módulos"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
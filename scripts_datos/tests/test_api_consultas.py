@@ -0,0 +1,41 @@
+"""Pool de conexiones de la API frente a una base reemplazada por otra"""
+
+import os
+import sqlite3
+
+from api_consultas import PoolConexiones, resolver
+
+
+def crear_base(ruta, regionales):
+    conn = sqlite3.connect(ruta)
+    conn.execute("CREATE TABLE regional (id INTEGER PRIMARY KEY, codigo_regional, nombre)")
+    conn.executemany(
+        "INSERT INTO regional (codigo_regional, nombre) VALUES (?, ?)",
+        [(codigo, f"REGIONAL {codigo}") for codigo in regionales],
+    )
+    conn.commit()
+    conn.close()
+
+
+def codigos(pool):
+    with pool.conexion() as conn:
+        return [fila["codigo"] for fila in resolver(conn, "regionales", {})]
+
+
+def test_pool_lee_la_base_publicada_con_os_replace(tmp_path):
+    db_file = str(tmp_path / "seguimiento_metas.db")
+    crear_base(db_file, ["05"])
+    pool = PoolConexiones(db_file, tamano=2)
+    try:
+        assert codigos(pool) == ["05"]
+        assert codigos(pool) == ["05"]
+
+        # Publicación como la de --reconstruir: otro archivo toma el nombre
+        crear_base(f"{db_file}.nueva", ["05", "08"])
+        os.replace(f"{db_file}.nueva", db_file)
+
+        # Todas las conexiones del pool pasan a leer el archivo nuevo
+        assert codigos(pool) == ["05", "08"]
+        assert codigos(pool) == ["05", "08"]
+    finally:
+        pool.cerrar()
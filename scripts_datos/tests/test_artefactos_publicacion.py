@@ -0,0 +1,37 @@
+"""Publicación con hash: la generación anterior se conserva una publicación más"""
+
+import json
+import os
+
+from artefactos_publicacion import MANIFIESTO, publicar_artefactos
+
+
+def publicar(directorio, contenido):
+    with open(os.path.join(directorio, "metas_fpi.json"), "w", encoding="utf-8") as f:
+        json.dump(contenido, f)
+    manifiesto, _, eliminados = publicar_artefactos(str(directorio))
+    return manifiesto["archivos"]["metas_fpi.json"]["archivo"], eliminados
+
+
+def test_generacion_anterior_se_conserva_hasta_la_siguiente(tmp_path):
+    destino = tmp_path / "publicado"
+    primera, _ = publicar(tmp_path, [1])
+    segunda, eliminados = publicar(tmp_path, [2])
+    assert primera != segunda
+    assert eliminados == []
+    assert (destino / primera).exists() and (destino / f"{primera}.gz").exists()
+
+    tercera, eliminados = publicar(tmp_path, [3])
+    assert f"{primera}.gz" in eliminados
+    assert all(archivo.startswith(primera) for archivo in eliminados)
+    assert not (destino / primera).exists()
+    assert (destino / segunda).exists() and (destino / tercera).exists()
+    with open(destino / MANIFIESTO, encoding="utf-8") as f:
+        assert json.load(f)["archivos"]["metas_fpi.json"]["archivo"] == tercera
+
+
+def test_publicacion_sin_cambios_no_elimina(tmp_path):
+    primera, _ = publicar(tmp_path, [1])
+    misma, eliminados = publicar(tmp_path, [1])
+    assert misma == primera
+    assert eliminados == []
@@ -0,0 +1,71 @@
+"""Asignación de rangos por mes y versión de estado_semaforo"""
+
+import contextlib
+import io
+import sqlite3
+
+import pandas as pd
+
+import importar_a_sqlite as imp
+from clasificacion_semaforo import (
+    actualizar_estados_semaforo,
+    asignar_rangos,
+    rangos_solo_posteriores,
+)
+
+
+def rangos(*meses):
+    return pd.DataFrame({
+        "id_rango": range(1, len(meses) + 1),
+        "nombre_indicador": "Tecnólogos",
+        "mes": [mes for mes, _ in meses],
+        "numero_mes": [numero for _, numero in meses],
+        "min_vulnerable": 0.7,
+        "min_buena": 0.9,
+        "sobreejecucion_superior_a": 1.05,
+    })
+
+
+def rango_asignado(periodo, tabla_rangos):
+    cumplimientos = pd.DataFrame({
+        "periodo": [periodo], "descripcion": ["Tecnólogos"], "meta": [10], "ejecucion": [9],
+    })
+    return asignar_rangos(cumplimientos, tabla_rangos)["id_rango"].iloc[0]
+
+
+def test_usa_el_rango_del_mes_del_periodo():
+    assert rango_asignado("2025_09", rangos(("Agosto", 8), ("Septiembre", 9), ("Octubre", 10))) == 2
+
+
+def test_sin_rango_del_mes_usa_el_ultimo_anterior():
+    assert rango_asignado("2025_09", rangos(("Julio", 7), ("Agosto", 8), ("Octubre", 10))) == 2
+
+
+def test_un_rango_posterior_no_clasifica():
+    assert pd.isna(rango_asignado("2025_09", rangos(("Octubre", 10), ("Noviembre", 11))))
+
+
+def test_rango_posterior_avisa_por_indicador():
+    datos = asignar_rangos(
+        pd.DataFrame({"periodo": ["2025_09"] * 2, "descripcion": ["Tecnólogos"] * 2}),
+        rangos(("Noviembre", 11), ("Octubre", 10)),
+    )
+    assert rangos_solo_posteriores(datos, rangos(("Noviembre", 11), ("Octubre", 10))) == [
+        ("2025_09", "Tecnólogos", ["Octubre", "Noviembre"]),
+    ]
+
+
+def test_estado_semaforo_renueva_su_version_una_vez_por_escritura():
+    conn = sqlite3.connect(":memory:")
+    with contextlib.redirect_stdout(io.StringIO()):
+        imp.crear_esquema(conn)
+        consulta = "SELECT version FROM version_datos WHERE tabla = 'estado_semaforo'"
+        anterior = conn.execute(consulta).fetchone()[0]
+        conn.execute(
+            "INSERT INTO estado_semaforo (periodo, id_descripcion, id_regional, estado) "
+            "VALUES ('2025_09', 1, 1, 'bajo')"
+        )
+        assert conn.execute(consulta).fetchone()[0] == anterior
+
+        actualizar_estados_semaforo(conn, ["2025_09"])
+        assert conn.execute(consulta).fetchone()[0] != anterior
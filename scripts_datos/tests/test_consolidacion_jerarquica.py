@@ -0,0 +1,27 @@
+"""Validación de totales: cada nivel se compara con sus componentes importados"""
+
+import pandas as pd
+
+from consolidacion_jerarquica import sumar_hijos
+
+# 1 = 2 + 3 y 3 = 4 + 5, para un periodo y una regional
+ARISTAS = {1: {2, 3}, 3: {4, 5}}
+
+
+def matriz(valores):
+    columnas = pd.MultiIndex.from_tuples([("meta", "2025_09", 1)])
+    return pd.DataFrame({columnas[0]: valores}).set_axis(columnas, axis=1)
+
+
+def test_componente_con_error_solo_afecta_a_su_padre():
+    # El componente 4 debería valer 30 (3 = 40): solo el total 3 difiere
+    importado = matriz({1: 100.0, 2: 60.0, 3: 40.0, 4: 29.0, 5: 10.0})
+    suma = sumar_hijos(ARISTAS, importado)
+    diferencia = (suma - importado.loc[suma.index]).iloc[:, 0]
+    assert diferencia.to_dict() == {1: 0.0, 3: -1.0}
+
+
+def test_hijos_sin_dato_cuentan_como_cero():
+    importado = matriz({1: 60.0, 2: 60.0})
+    suma = sumar_hijos({1: {2, 3}}, importado)
+    assert suma.iloc[0, 0] == 60.0
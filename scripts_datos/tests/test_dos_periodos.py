@@ -0,0 +1,107 @@
+"""
+Importación y exportación con dos periodos: los conjuntos de un solo periodo
+deben tener las mismas filas que con un solo libro, sin multiplicarse por la
+cantidad de periodos importados.
+"""
+
+import contextlib
+import io
+import json
+import os
+
+import pytest
+
+import exportar_a_json
+import generar_libros_sinteticos as sinteticos
+import generar_referencias_json
+import importar_lote
+
+# Volumen reducido: basta con que cada periodo aporte filas a todas las tablas
+VOLUMEN = {"regionales": 4, "metas": 24, "categorias": 2, "metricas": 3}
+
+
+def importar_y_exportar(directorio, libros, monkeypatch):
+    """
+    Importa los libros en una base nueva en `directorio`, exporta todos los
+    conjuntos y extrae las referencias. Retorna (registros por conjunto,
+    documentos JSON por archivo, referencias).
+    """
+    db_file = os.path.join(directorio, "seguimiento_metas.db")
+    salida = os.path.join(directorio, "datos_json")
+    os.makedirs(salida)
+    monkeypatch.setattr(generar_referencias_json, "DB_FILE", db_file)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        importar_lote.importar_lote(libros, procesos=1, db_file=db_file)
+        resultados, _ = exportar_a_json.exportar(
+            db_file, salida, procesos=1, completo=True
+        )
+        referencias = generar_referencias_json.extraer_referencias()
+
+    registros = {nombre: cantidad for nombre, _, cantidad, *_ in resultados}
+    documentos = {}
+    for archivo in os.listdir(salida):
+        if archivo.endswith(".json") and not archivo.startswith("."):
+            with open(os.path.join(salida, archivo), encoding="utf-8") as f:
+                documentos[archivo] = json.load(f)
+    return registros, documentos, referencias
+
+
+@pytest.fixture(scope="module")
+def libros(tmp_path_factory):
+    """Dos libros sintéticos consecutivos; el último es el periodo vigente"""
+    directorio = tmp_path_factory.mktemp("libros")
+    with contextlib.redirect_stdout(io.StringIO()):
+        return sinteticos.generar_libros(str(directorio), periodos=2, **VOLUMEN)
+
+
+@pytest.fixture
+def exportaciones(libros, tmp_path, monkeypatch):
+    """Exportación con solo el último libro y con los dos periodos"""
+    os.makedirs(tmp_path / "uno")
+    os.makedirs(tmp_path / "dos")
+    uno = importar_y_exportar(str(tmp_path / "uno"), libros[-1:], monkeypatch)
+    dos = importar_y_exportar(str(tmp_path / "dos"), libros, monkeypatch)
+    return uno, dos
+
+
+# Conjuntos que cubren todos los periodos, con el mes o periodo en cada fila
+CONJUNTOS_HISTORICOS = ("rangos_semaforo",)
+
+
+def test_registros_por_conjunto_no_se_multiplican(exportaciones):
+    (registros_uno, documentos_uno, _), (registros_dos, documentos_dos, _) = exportaciones
+    for nombre in CONJUNTOS_HISTORICOS:
+        registros_uno.pop(nombre)
+        registros_dos.pop(nombre)
+    assert registros_dos == registros_uno
+    for archivo in ("metas_fpi.json", "jerarquias.json", "formacion_por_nivel.json"):
+        assert len(documentos_dos[archivo]) == len(documentos_uno[archivo]) > 0
+
+
+def test_dashboard_del_periodo_vigente(exportaciones):
+    (_, documentos_uno, _), (_, documentos_dos, _) = exportaciones
+    assert documentos_dos["dashboard.json"] == documentos_uno["dashboard.json"]
+
+
+def test_referencias_del_periodo_vigente(libros, exportaciones):
+    (_, _, referencias_uno), (_, _, referencias_dos) = exportaciones
+    vigente = os.path.basename(libros[-1])[len("seguimiento_metas_") : -len(".ods")]
+    assert referencias_dos["periodo"] == referencias_uno["periodo"] == vigente
+
+    totales_uno = referencias_uno["totales"]
+    totales_dos = referencias_dos["totales"]
+    assert totales_dos.keys() == totales_uno.keys()
+    for nombre in totales_uno:
+        assert len(totales_dos[nombre]) == len(totales_uno[nombre]), nombre
+    assert len(referencias_dos["programas_especiales"]) == len(
+        referencias_uno["programas_especiales"]
+    )
+
+
+def test_rangos_semaforo_una_fila_por_mes(exportaciones):
+    _, (_, documentos_dos, _) = exportaciones
+    rangos = documentos_dos["rangos_semaforo.json"]
+    claves = {(rango["agrupador"], rango["nombreIndicador"], rango["mes"]) for rango in rangos}
+    assert len(claves) == len(rangos)
+    assert len({rango["mes"] for rango in rangos}) == 2
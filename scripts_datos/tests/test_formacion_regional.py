@@ -0,0 +1,33 @@
+"""Lectura de los bloques Cupos / Ejecución / % Ejecución de formacio_regional"""
+
+import os
+
+import pandas as pd
+
+import importar_a_sqlite as imp
+
+LIBRO = os.path.join(os.path.dirname(os.path.dirname(__file__)), imp.ODS_FILE)
+
+
+def test_ejecucion_del_libro_real():
+    libro = imp.cargar_libro(LIBRO)
+    largo, _, errores = imp.reshape_formacion_regional(libro["formacio_regional"])
+    fila = largo[
+        (largo["codigo_regional"] == "5")
+        & (largo["descripcion"] == "Tecnologos Regular - Presencial")
+    ].iloc[0]
+    assert fila["meta"] == 44382
+    assert fila["ejecucion"] == 40783
+    assert errores == []
+
+
+def test_error_de_celda_reporta_la_columna_de_ejecucion():
+    df = pd.DataFrame([
+        ["CÓDIGO REGIONAL", "NOMBRE REGIONAL", "Tecnólogos", None, None],
+        [None, None, "Cupos", "Ejecución", "% Ejecución"],
+        ["5", "REGIONAL ANTIOQUIA", 100, "n/d", 0.5],
+    ])
+    _, _, errores = imp.reshape_formacion_regional(df)
+    assert [(error["campo"], error["columna"], error["valor"]) for error in errores] == [
+        ("ejecucion", 3, "n/d")
+    ]
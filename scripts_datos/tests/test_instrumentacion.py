@@ -0,0 +1,34 @@
+"""Instrumentación con perfil de una etapa"""
+
+import json
+
+import instrumentacion
+
+
+def test_perfil_de_etapa_que_no_corre_en_el_proceso(tmp_path, capsys):
+    instrumentos = instrumentacion.iniciar("prueba", perfilar="noexiste")
+    with instrumentacion.etapa("consulta:regionales"):
+        sum(range(1000))
+    instrumentacion.registrar("lectura:hoja", 10, 0.1)
+
+    ruta = instrumentacion.finalizar(instrumentos, str(tmp_path / "reporte.json"))
+
+    salida = capsys.readouterr().out
+    assert "[WARN] Sin perfil" in salida
+    assert "Etapas que pueden perfilarse: consulta\n" in salida
+    with open(ruta, encoding="utf-8") as f:
+        reporte = json.load(f)
+    assert "perfil" not in reporte
+    assert not (tmp_path / "reporte.prof").exists()
+
+
+def test_perfil_de_etapa_ejecutada(tmp_path):
+    instrumentos = instrumentacion.iniciar("prueba", perfilar="consulta")
+    with instrumentacion.etapa("consulta:regionales"):
+        sorted(range(1000), reverse=True)
+
+    ruta = instrumentacion.finalizar(instrumentos, str(tmp_path / "reporte.json"))
+
+    with open(ruta, encoding="utf-8") as f:
+        assert json.load(f)["perfil"]["funciones"]
+    assert (tmp_path / "reporte.prof").exists()
@@ -0,0 +1,122 @@
+"""
+Planes de consulta de la exportación y las referencias. Sobre una base
+construida con libros sintéticos de varios periodos (con ANALYZE, como tras
+una importación), ejecuta la lectura de la exportación y
+extraer_referencias capturando sus consultas y revisa el EXPLAIN QUERY PLAN
+de cada una: ninguna debe recorrer una tabla completa sin índice ni
+ordenar/agrupar todo su resultado en un B-tree temporal. Se permite "RIGHT
+PART OF ORDER BY": el índice entrega el prefijo del orden y solo se ordenan
+las filas que comparten ese prefijo.
+"""
+
+import contextlib
+import io
+import re
+import sqlite3
+
+import pytest
+
+import exportar_a_json
+import generar_libros_sinteticos as sinteticos
+import generar_referencias_json
+import importar_a_sqlite as imp
+import importar_lote
+
+# Varios periodos para que el periodo vigente sea una fracción de cada tabla
+VOLUMEN = {"regionales": 12, "metas": 64, "categorias": 4, "metricas": 5, "periodos": 12}
+
+# Pasos del plan que indican una regresión
+PASOS_PROHIBIDOS = [
+    (re.compile(r"^SCAN (?!\()(?!CONSTANT ROW)(?!.*\bUSING\b)"), "recorrido completo sin índice"),
+    (re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)"), "B-tree temporal"),
+]
+
+
+@pytest.fixture(scope="module")
+def base(tmp_path_factory):
+    """Base importada de libros sintéticos de VOLUMEN["periodos"] periodos"""
+    directorio = tmp_path_factory.mktemp("planes")
+    db_file = str(directorio / "seguimiento_metas.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        libros = sinteticos.generar_libros(str(directorio), **VOLUMEN)
+        importar_lote.importar_lote(libros, procesos=1, db_file=db_file)
+    return db_file
+
+
+@pytest.fixture(scope="module")
+def consultas(base):
+    """
+    Consultas SELECT distintas, en orden, que ejecutan la lectura de la
+    exportación y extraer_referencias, con el texto tal como llega a SQLite
+    """
+    trazas = []
+    conectar = sqlite3.connect
+
+    def conectar_con_traza(*args, **kwargs):
+        conn = conectar(*args, **kwargs)
+        conn.set_trace_callback(trazas.append)
+        return conn
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(sqlite3, "connect", conectar_con_traza)
+        monkeypatch.setattr(generar_referencias_json, "DB_FILE", base)
+        with contextlib.redirect_stdout(io.StringIO()):
+            exportar_a_json.leer_instantanea(base)
+            generar_referencias_json.extraer_referencias()
+
+    distintas = []
+    for consulta in trazas:
+        consulta = consulta.strip()
+        if consulta.upper().startswith(("SELECT", "WITH")) and consulta not in distintas:
+            distintas.append(consulta)
+    return distintas
+
+
+@pytest.fixture(scope="module")
+def planes(base, consultas):
+    """Pasos del EXPLAIN QUERY PLAN de cada consulta capturada"""
+    conn = sqlite3.connect(base)
+    try:
+        return {
+            consulta: [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {consulta}")]
+            for consulta in consultas
+        }
+    finally:
+        conn.close()
+
+
+def resumen_consulta(consulta, largo=90):
+    """Primera parte de la consulta en una sola línea"""
+    texto = " ".join(consulta.split())
+    return texto if len(texto) <= largo else texto[: largo - 3] + "..."
+
+
+def test_ninguna_consulta_recorre_ni_ordena_sin_indice(planes):
+    problemas = [
+        f"{resumen_consulta(consulta)}: {motivo}: {paso}"
+        for consulta, pasos in planes.items()
+        for paso in pasos
+        for patron, motivo in PASOS_PROHIBIDOS
+        if patron.search(paso)
+    ]
+    assert len(planes) > 20
+    assert not problemas, "\n".join(problemas)
+
+
+@pytest.mark.parametrize(
+    "nombre",
+    [nombre for nombre, _, columnas, _ in imp.INDICES_CONSULTA if "(" in columnas],
+)
+def test_indices_de_expresion_en_uso(planes, nombre):
+    """
+    SQLite solo usa un índice de expresión si la consulta repite la misma
+    expresión: un cambio de texto en la consulta del dashboard lo deja sin uso
+    y la consulta pasa a ordenar con un B-tree temporal
+    """
+    patron = re.compile(rf"\bINDEX {nombre}\b")
+    usan = [
+        consulta
+        for consulta, pasos in planes.items()
+        if any(patron.search(paso) for paso in pasos)
+    ]
+    assert usan, f"Ninguna consulta usa el índice {nombre}"